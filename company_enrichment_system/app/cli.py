@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from multiprocessing.context import BaseContext
+from multiprocessing.sharedctypes import SynchronizedArray
+from typing import AsyncIterator
+
+from fastapi import HTTPException, UploadFile
+
+from app.config import get_settings
+from app.jobs.job_manager import JobManager, render_csv_header, render_results
+from app.jobs.processor import JobProcessor
+from app.jobs.scheduler import get_job_scheduler
+from app.models import CompanyResult, ExportFormat, JobStatus
+from app.services.cache import get_enrichment_cache
+from app.services.candidate_stats import get_candidate_stats
+from app.services.dns_resolver import get_dns_resolver
+from app.services.http_client import get_http_clients
+from app.services.rate_limiter import RateLimiterRegistry, create_shared_rate_states
+from app.utils.file_loader import name_fingerprint, open_company_name_stream
+from app.utils.validators import canonicalize_company_name
+
+# Headless bulk enrichment: `python -m app.cli companies.csv -o results.csv --workers 8`.
+#
+# The parent process parses the input with the same loader as /upload and hands out batches
+# of names on one shared queue, so busy workers simply take fewer batches. Each worker process
+# runs its own event loop with a JobProcessor, and all of them draw from one token bucket per
+# provider in shared memory, so the configured rates are global. Workers send rendered rows
+# back as they finish and the parent appends them to the output file, which is also the
+# checkpoint: running the same command again skips every company already in it.
+
+OUTPUT_FLUSH_ROWS = 200
+OUTPUT_FLUSH_SECONDS = 0.5
+QUEUE_POLL_SECONDS = 1.0
+PROGRESS_EVERY_SECONDS = 10.0
+
+
+class _ForwardingJobManager(JobManager):
+    # Results leave the worker as soon as they are ready instead of piling up in memory.
+
+    def __init__(self, output_format: ExportFormat, results: multiprocessing.Queue) -> None:
+        super().__init__()
+        self.output_format = output_format
+        self.results = results
+        self._pending: list[CompanyResult] = []
+        self._pending_since = 0.0
+
+    async def append_result(self, job_id: str, result: CompanyResult, input_position: int | None = None) -> None:
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append(result)
+        if len(self._pending) >= OUTPUT_FLUSH_ROWS:
+            self.send()
+
+    def send(self) -> None:
+        if self._pending:
+            rows, self._pending = self._pending, []
+            successes = sum(1 for row in rows if row.status == 'SUCCESS')
+            self.results.put(('rows', render_results(rows, self.output_format), len(rows), successes))
+
+    async def send_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(OUTPUT_FLUSH_SECONDS / 2)
+            if self._pending and time.monotonic() - self._pending_since >= OUTPUT_FLUSH_SECONDS:
+                self.send()
+
+
+def _worker_main(
+    index: int,
+    inputs: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    rate_states: dict[str, SynchronizedArray],
+    output_format: ExportFormat,
+) -> None:
+    # Ctrl-C goes to the whole process group; the parent decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        error = asyncio.run(_run_worker(inputs, results, rate_states, output_format))
+    except Exception as exc:  # report instead of dying silently; the parent stops the run
+        error = repr(exc)
+    results.put(('error', index, error) if error else ('done', index))
+
+
+async def _run_worker(
+    inputs: multiprocessing.Queue,
+    results: multiprocessing.Queue,
+    rate_states: dict[str, SynchronizedArray],
+    output_format: ExportFormat,
+) -> str | None:
+    settings = get_settings()
+    manager = _ForwardingJobManager(output_format, results)
+    scheduler = get_job_scheduler()
+    http_clients = get_http_clients()
+    processor = JobProcessor(
+        settings=settings,
+        manager=manager,
+        cache=get_enrichment_cache(),
+        dns_resolver=get_dns_resolver(),
+        rate_limiters=RateLimiterRegistry(settings, shared_states=rate_states),
+        scheduler=scheduler,
+        http_clients=http_clients,
+        candidate_stats=get_candidate_stats(),
+    )
+    await scheduler.start()
+    sender = asyncio.create_task(manager.send_periodically())
+    try:
+        metadata = await manager.create_job()
+        await processor.start(metadata.job_id, _iter_batches(inputs))
+        job = await manager.get_job(metadata.job_id)
+        return job.metadata.error if job.metadata.status == JobStatus.FAILED else None
+    finally:
+        sender.cancel()
+        manager.send()
+        await scheduler.stop()
+        await http_clients.close()
+        get_enrichment_cache().close()
+        get_dns_resolver().close()
+        get_candidate_stats().save()
+
+
+async def _iter_batches(inputs: multiprocessing.Queue) -> AsyncIterator[str]:
+    while True:
+        batch = await asyncio.to_thread(inputs.get)
+        if batch is None:
+            return
+        for company in batch:
+            yield company
+
+
+def read_checkpoint(path: str, output_format: ExportFormat) -> set[int]:
+    # Fingerprints of the companies already in an earlier run's output. A row cut off by a crash
+    # is removed first, so appending continues on a clean line.
+    with open(path, 'rb+') as handle:
+        data = handle.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            handle.truncate(end)
+    text = data[:end].decode('utf-8', errors='ignore')
+    if output_format == ExportFormat.NDJSON:
+        companies = (json.loads(line).get('company') for line in text.splitlines() if line.strip())
+    else:
+        rows = csv.reader(io.StringIO(text))
+        next(rows, None)  # header
+        companies = (row[0] for row in rows if row)
+    return {name_fingerprint(canonicalize_company_name(company)) for company in companies if company}
+
+
+def _put(target: multiprocessing.Queue, item: object, stopping: threading.Event) -> None:
+    while not stopping.is_set():
+        try:
+            target.put(item, timeout=QUEUE_POLL_SECONDS)
+            return
+        except queue.Full:
+            continue
+
+
+async def _feed(
+    companies: AsyncIterator[str],
+    inputs: multiprocessing.Queue,
+    done: set[int],
+    batch_size: int,
+    workers: int,
+    stopping: threading.Event,
+) -> tuple[int, int]:
+    queued = skipped = 0
+    batch: list[str] = []
+    async for company in companies:
+        if stopping.is_set():
+            break
+        if done and name_fingerprint(canonicalize_company_name(company)) in done:
+            skipped += 1
+            continue
+        batch.append(company)
+        if len(batch) >= batch_size:
+            await asyncio.to_thread(_put, inputs, batch, stopping)
+            queued += len(batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(_put, inputs, batch, stopping)
+        queued += len(batch)
+    for _ in range(workers):
+        await asyncio.to_thread(_put, inputs, None, stopping)
+    return queued, skipped
+
+
+async def run(args: argparse.Namespace, context: BaseContext) -> int:
+    output_format = ExportFormat(args.format or ('ndjson' if args.output.endswith('.ndjson') else 'csv'))
+    resuming = os.path.exists(args.output) and os.path.getsize(args.output) > 0 and not args.restart
+    done = read_checkpoint(args.output, output_format) if resuming else set()
+
+    try:
+        source = open(args.input, 'rb')
+    except OSError as exc:
+        print(f'error: {exc}', file=sys.stderr)
+        return 2
+    try:
+        companies = await open_company_name_stream(UploadFile(source, filename=os.path.basename(args.input)))
+    except HTTPException as exc:
+        source.close()
+        print(f'error: {exc.detail}', file=sys.stderr)
+        return 2
+
+    inputs = context.Queue(maxsize=args.workers * 2)
+    results = context.Queue()
+    rate_states = create_shared_rate_states(context)
+    processes = [
+        context.Process(
+            target=_worker_main,
+            args=(index, inputs, results, rate_states, output_format),
+            name=f'enrich-worker-{index}',
+            daemon=True,
+        )
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    stopping = threading.Event()
+    feeder = asyncio.create_task(_feed(companies, inputs, done, args.batch_size, args.workers, stopping))
+    started = time.monotonic()
+    last_report = last_sync = started
+    written = successes = 0
+    finished: set[int] = set()
+    errors: list[str] = []
+    with open(args.output, 'ab' if resuming else 'wb') as handle:
+        if not resuming and output_format == ExportFormat.CSV:
+            handle.write(render_csv_header())
+        try:
+            while len(finished) < len(processes):
+                try:
+                    message = await asyncio.to_thread(results.get, timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    if feeder.done() and feeder.exception() is not None:
+                        break
+                    crashed = [
+                        index
+                        for index, process in enumerate(processes)
+                        if index not in finished and not process.is_alive()
+                    ]
+                    if crashed:
+                        errors.extend(f'worker {index} exited with code {processes[index].exitcode}' for index in crashed)
+                        break
+                    continue
+                if message[0] == 'rows':
+                    _, payload, rows, row_successes = message
+                    handle.write(payload)
+                    handle.flush()
+                    written += rows
+                    successes += row_successes
+                elif message[0] == 'done':
+                    finished.add(message[1])
+                else:
+                    finished.add(message[1])
+                    errors.append(f'worker {message[1]}: {message[2]}')
+                    break
+
+                now = time.monotonic()
+                if now - last_sync >= args.checkpoint_seconds:
+                    os.fsync(handle.fileno())
+                    last_sync = now
+                if now - last_report >= PROGRESS_EVERY_SECONDS:
+                    print(f'{written:,} written ({written / (now - started):.1f}/s)', file=sys.stderr)
+                    last_report = now
+        finally:
+            handle.flush()
+            os.fsync(handle.fileno())
+            stopping.set()
+            if errors or len(finished) < len(processes):
+                for process in processes:
+                    process.terminate()
+            for process in processes:
+                process.join()
+
+    queued = skipped = 0
+    try:
+        queued, skipped = await feeder
+    except Exception as exc:  # a file that breaks mid-way; its first rows may already be done
+        errors.append(f'reading {args.input} failed: {exc!r}')
+    elapsed = time.monotonic() - started
+    print(
+        f'{written:,} of {queued:,} companies written to {args.output} in {elapsed:.1f}s '
+        f'({written / elapsed if elapsed else 0:.1f}/s, {written - successes:,} failed); '
+        f'{skipped:,} already done',
+        file=sys.stderr,
+    )
+    for error in errors:
+        print(f'error: {error}', file=sys.stderr)
+    if errors:
+        print('Run the same command again to resume.', file=sys.stderr)
+    return 1 if errors else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description='Enrich a CSV/XLSX file without the API.')
+    parser.add_argument('input', help='.csv or .xlsx file; the first column holds company names')
+    parser.add_argument('-o', '--output', required=True, help='results file; an existing one is resumed')
+    parser.add_argument('--format', choices=[item.value for item in ExportFormat], help='default: from the output suffix')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--batch-size', type=int, default=500, help='companies handed to a worker at a time')
+    parser.add_argument('--checkpoint-seconds', type=float, default=5.0, help='how often the output is synced to disk')
+    parser.add_argument('--restart', action='store_true', help='overwrite the output instead of resuming it')
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error('--workers and --batch-size must be at least 1')
+    # Workers start from a clean interpreter, so nothing from the parent's event loop leaks in.
+    context = multiprocessing.get_context('spawn')
+    try:
+        return asyncio.run(run(args, context))
+    except KeyboardInterrupt:
+        print('Interrupted; run the same command again to resume.', file=sys.stderr)
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
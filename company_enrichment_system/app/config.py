@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,11 +11,82 @@ class Settings(BaseSettings):
     app_name: str = 'company_enrichment_system'
     app_version: str = '1.0.0'
 
+    # Per-job bound on queued company work items waiting for a scheduler worker
     batch_size: int = Field(default=100, ge=50, le=100)
+    # Whole-company retries, only for unexpected errors; stages that already finished are reused
     max_retries: int = 3
+    # Provider calls retry transient failures (timeouts, transport errors, 429, 5xx) on their own,
+    # with full-jitter exponential backoff
+    stage_max_attempts: int = Field(default=3, ge=1)
+    stage_retry_base_delay_seconds: float = Field(default=0.25, ge=0)
+    stage_retry_max_delay_seconds: float = Field(default=5.0, ge=0)
+    # Per-provider circuit breakers: open once circuit_failure_rate_threshold of the last
+    # circuit_window_size calls failed (with at least circuit_min_calls seen), reject calls for
+    # circuit_open_seconds, then let circuit_half_open_max_calls trial calls decide
+    circuit_failure_rate_threshold: float = Field(default=0.5, gt=0, le=1)
+    circuit_window_size: int = Field(default=20, ge=1)
+    circuit_min_calls: int = Field(default=10, ge=1)
+    circuit_open_seconds: float = Field(default=30.0, ge=0)
+    circuit_half_open_max_calls: int = Field(default=3, ge=1)
     request_timeout_seconds: float = 8.0
     rate_limit_per_second: int = 10
+    rate_limit_burst: int = Field(default=5, ge=1)
+    # Upper bound on how long a 429/503 (or its Retry-After) may pause a provider
+    rate_limit_max_backoff_seconds: float = 60.0
+    # Starting limit on companies in flight across all jobs (the fixed limit when adaptive concurrency is off)
     max_concurrency: int = 20
+    # Adaptive concurrency: the limit moves between floor and ceiling from observed company latency
+    # and the share of timeouts / 429s / 5xx responses
+    adaptive_concurrency_enabled: bool = True
+    concurrency_floor: int = Field(default=4, ge=1)
+    concurrency_ceiling: int = Field(default=400, ge=1)
+    concurrency_backoff_ratio: float = Field(default=0.7, gt=0, lt=1)
+    # Window latency may grow to this multiple of the long-run average before the limit shrinks
+    concurrency_latency_tolerance: float = Field(default=2.0, ge=1)
+    concurrency_overload_threshold: float = Field(default=0.05, ge=0, le=1)
+    # Worker tasks in the shared job scheduler; defaults to the concurrency ceiling
+    scheduler_workers: int | None = Field(default=None, ge=1)
+
+    # Per-provider token buckets, shared by every job in the process; unset values fall back to
+    # rate_limit_per_second / rate_limit_burst
+    domain_probe_rate_per_second: float | None = None
+    domain_probe_burst: int | None = None
+    serpapi_rate_per_second: float | None = None
+    serpapi_burst: int | None = None
+    search_api_rate_per_second: float | None = None
+    search_api_burst: int | None = None
+    google_places_rate_per_second: float | None = None
+    google_places_burst: int | None = None
+
+    # Domain-guess probing: 'sequential' checks .com/.in/.co.in one by one, 'concurrent' probes them all at once
+    domain_probe_mode: Literal['sequential', 'concurrent'] = 'sequential'
+    # Learned candidate ordering: hit rates per TLD (overall and per name shape) reorder the guesses
+    # and skip ones that almost never answer, once every TLD has candidate_min_samples attempts.
+    # The stats are saved to candidate_stats_path (unset keeps them in memory only).
+    candidate_ordering_enabled: bool = True
+    candidate_stats_path: str | None = 'candidate_stats.json'
+    candidate_stats_save_interval_seconds: float = Field(default=60.0, gt=0)
+    candidate_min_samples: int = Field(default=200, ge=1)
+    candidate_prune_hit_rate: float = Field(default=0.01, ge=0, le=1)
+    # Pruned guesses are still probed (last) for this share of lookups so their rate can recover
+    candidate_explore_rate: float = Field(default=0.05, ge=0, le=1)
+    # A name shape's own counts are blended with the overall rate, weighted as this many samples
+    candidate_prior_weight: float = Field(default=20.0, ge=0)
+    # Counts are halved past this many attempts so old outcomes fade
+    candidate_max_samples: int = Field(default=10_000, ge=2)
+    # Concurrent mode only: start the search-API fallback after this delay instead of waiting for every probe to fail
+    search_fallback_delay_seconds: float | None = Field(default=None, ge=0)
+    # Liveness probes: 'head' sends HEAD and falls back to a GET when the site rejects it; 'get' skips HEAD.
+    # Either way the GET is streamed and closed after the headers.
+    probe_method: Literal['head', 'get'] = 'head'
+    probe_max_redirects: int = Field(default=5, ge=0)
+    # Small bodies (Content-Length up to this) are drained so the keep-alive connection can be reused
+    probe_drain_max_bytes: int = Field(default=16 * 1024, ge=0)
+    # Optional contact extraction from a found website: scans at most page_contacts_max_bytes of the
+    # homepage (and one contact page) for tel:/mailto: links and phone/email text. No provider quota.
+    page_contacts_enabled: bool = False
+    page_contacts_max_bytes: int = Field(default=256 * 1024, ge=1024)
+    page_contacts_follow_contact_page: bool = True
 
     # Optional generic official search provider
     search_api_url: str | None = None
@@ -26,6 +98,68 @@ class Settings(BaseSettings):
 
     google_places_api_key: str | None = None
 
+    # Shared HTTP pools (created in the app lifespan). HTTP/2 needs the optional `h2` package.
+    http2_enabled: bool = False
+    # 'api' pool: SerpApi / search API / Google Places - few hosts, long-lived connections
+    api_pool_max_connections: int = Field(default=50, ge=1)
+    api_pool_max_keepalive: int = Field(default=20, ge=0)
+    api_pool_keepalive_expiry_seconds: float = Field(default=60.0, ge=0)
+    api_pool_per_host_limit: int = Field(default=20, ge=1)
+    # 'probe' pool: domain-guess checks - many hosts, each visited once or twice
+    probe_pool_max_connections: int = Field(default=200, ge=1)
+    probe_pool_max_keepalive: int = Field(default=50, ge=0)
+    probe_pool_keepalive_expiry_seconds: float = Field(default=5.0, ge=0)
+    probe_pool_per_host_limit: int = Field(default=4, ge=1)
+
+    # DNS pre-resolution in front of domain probes; candidates that don't resolve skip HTTP entirely
+    dns_prefilter_enabled: bool = True
+    dns_resolver_threads: int = Field(default=16, ge=1)
+    dns_timeout_seconds: float = 3.0
+    dns_positive_ttl_seconds: int = 3600
+    dns_negative_ttl_seconds: int = 600
+    dns_cache_max_entries: int = Field(default=100_000, ge=1)
+
+    # Durable job store (SQLite in WAL mode); unset keeps jobs in memory only.
+    # Writes are batched every flush interval or once flush batch size rows are pending.
+    job_store_path: str | None = 'jobs.sqlite3'
+    job_store_flush_interval_seconds: float = Field(default=0.5, gt=0)
+    job_store_flush_batch_size: int = Field(default=500, ge=1)
+
+    # Multi-process mode (uvicorn --workers N): every worker reads job state from the job store and
+    # claims pending companies from it. Claims whose worker dies are retried once the lease expires.
+    shared_job_queue: bool = False
+    shared_claim_batch_size: int = Field(default=50, ge=1)
+    shared_claim_lease_seconds: float = Field(default=300.0, gt=0)
+    shared_poll_interval_seconds: float = Field(default=0.5, gt=0)
+
+    # /job/{id}/events (Server-Sent Events): at most one progress update per min interval, a
+    # keep-alive comment after heartbeat seconds of silence, and up to max rows per `rows` event
+    job_events_min_interval_seconds: float = Field(default=0.5, gt=0)
+    job_events_heartbeat_seconds: float = Field(default=15.0, gt=0)
+    job_events_max_rows: int = Field(default=1000, ge=1)
+
+    # /job/{id}/profile: per-company span timelines (stage calls, rate-limiter waits, retry backoffs)
+    # for a profile_sample_rate share of companies. Each job keeps stage totals plus the
+    # profile_max_companies slowest timelines; the last profile_max_jobs jobs are kept per process.
+    # When off, a stage call pays one ContextVar lookup.
+    profiling_enabled: bool = False
+    profile_sample_rate: float = Field(default=1.0, gt=0, le=1)
+    profile_max_companies: int = Field(default=50, ge=1)
+    profile_max_spans_per_company: int = Field(default=200, ge=1)
+    profile_max_jobs: int = Field(default=20, ge=1)
+
+    # Cross-job lookup cache (local SQLite file), keyed by normalized company name
+    cache_enabled: bool = True
+    cache_path: str = 'enrichment_cache.sqlite3'
+    cache_domain_ttl_seconds: int = 7 * 24 * 3600
+    cache_contact_ttl_seconds: int = 7 * 24 * 3600
+    cache_negative_ttl_seconds: int = 24 * 3600
+    cache_max_entries: int = Field(default=500_000, ge=1)
+
+    # Re-enrichment (/upload with previous_job_id or previous_results): successful rows whose
+    # lookups are younger than this are carried over instead of looked up again
+    reuse_max_age_seconds: int = Field(default=30 * 24 * 3600, gt=0)
+
 
 @lru_cache
 def get_settings() -> Settings:
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator
+
+from app.jobs.job_manager import TERMINAL_STATUSES, JobManager
+from app.models import ExportFormat, JobProgressEvent
+
+
+async def iter_job_events(
+    manager: JobManager,
+    job_id: str,
+    include_rows: bool,
+    offset: int,
+    min_interval_seconds: float,
+    heartbeat_seconds: float,
+    max_rows: int,
+) -> AsyncIterator[bytes]:
+    # Server-Sent Events for one job: `progress` whenever the snapshot changed (at most once per
+    # min interval, however many results landed in between), `rows` with newly appended results
+    # as NDJSON lines when requested (the event id is the next offset, so a reconnect can resume
+    # from Last-Event-ID), and a final `end` once the job is finished and every row was sent.
+    changed = manager.subscribe(job_id)
+    try:
+        last_progress: JobProgressEvent | None = None
+        while True:
+            changed.clear()
+            job = await manager.get_job(job_id)
+            if job is None:
+                yield _event('error', '{"detail": "Job not found"}')
+                return
+            progress = JobProgressEvent.model_validate(job.metadata, from_attributes=True)
+            if progress != last_progress:
+                yield _event('progress', progress.model_dump_json())
+                last_progress = progress
+
+            if include_rows and offset < progress.processed:
+                stop = min(progress.processed, offset + max_rows)
+                async for chunk in manager.iter_result_chunks(job_id, offset, stop, ExportFormat.NDJSON):
+                    # Rows end in '\n'; splitlines() would also break on \x85 or \u2028 inside a name.
+                    lines = chunk.decode('utf-8').split('\n')[:-1]
+                    offset += len(lines)
+                    yield _event('rows', '\n'.join(lines), event_id=offset)
+
+            backlog = include_rows and offset < progress.processed
+            if progress.status in TERMINAL_STATUSES and not backlog:
+                yield _event('end', progress.model_dump_json())
+                return
+
+            await asyncio.sleep(min_interval_seconds)
+            if backlog or changed.is_set() or not manager.notifies_changes:
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield b': keep-alive\n\n'
+    finally:
+        manager.unsubscribe(job_id, changed)
+
+
+def _event(name: str, data: str, event_id: int | None = None) -> bytes:
+    lines = [f'event: {name}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.extend(f'data: {line}' for line in data.split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
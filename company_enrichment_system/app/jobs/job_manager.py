@@ -1,27 +1,90 @@
 from __future__ import annotations
 
 import asyncio
+import csv
 import io
 import uuid
-from typing import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Iterable
 
-import csv
+from app.jobs.job_store import SqliteJobStore, StoreBatch
+from app.jobs.result_store import CompactResultStore
+from app.jobs.reuse import PreviousResults
+from app.models import CompanyResult, ExportFormat, JobMetadata, JobStatus
+
+RESULT_COLUMNS = ['company', 'website', 'website_found', 'phone', 'phone_found', 'email', 'email_found', 'source', 'status', 'enriched_at']
+DOWNLOAD_CHUNK_ROWS = 1000
+RESUME_INPUT_PAGE_SIZE = 5000
+INGEST_PROGRESS_EVERY = 1000
+RESUMABLE_STATUSES = {JobStatus.PENDING, JobStatus.PROCESSING}
+TERMINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED, JobStatus.PARTIAL}
 
-from app.models import CompanyResult, JobMetadata, JobRecord, JobStatus
+
+@dataclass
+class JobRecord:
+    metadata: JobMetadata
+    results: CompactResultStore = field(default_factory=CompactResultStore)
 
 
 class JobManager:
-    def __init__(self) -> None:
+    # Whether subscribe() events fire for every change; the shared variant can't see other processes.
+    notifies_changes = True
+
+    def __init__(
+        self,
+        store: SqliteJobStore | None = None,
+        flush_interval_seconds: float = 0.5,
+        flush_batch_size: int = 500,
+    ) -> None:
         self._jobs: dict[str, JobRecord] = {}
         self._lock = asyncio.Lock()
 
-    async def create_job(self, companies: list[str]) -> JobMetadata:
-        metadata = JobMetadata(job_id=str(uuid.uuid4()), total=len(companies), status=JobStatus.PENDING)
+        # Persistence is write-behind: mutations are buffered here and written to the store in
+        # one transaction per flush, so per-result durability never waits on disk I/O.
+        self._store = store
+        self._flush_interval_seconds = flush_interval_seconds
+        self._flush_batch_size = flush_batch_size
+        self._batch = StoreBatch()
+        self._input_counts: dict[str, int] = {}
+        self._unloaded_results: set[str] = set()
+        self._flush_wanted = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task[None] | None = None
+        self._subscribers: dict[str, set[asyncio.Event]] = {}
+
+    async def create_job(
+        self,
+        companies: list[str] | None = None,
+        deadline_at: float | None = None,
+        max_paid_calls: int | None = None,
+        previous_job_id: str | None = None,
+    ) -> JobMetadata:
+        # Without a company list the input is still streaming in; set_total fills in the count.
+        metadata = JobMetadata(
+            job_id=str(uuid.uuid4()),
+            total=len(companies) if companies is not None else 0,
+            ingest_complete=companies is not None,
+            status=JobStatus.PENDING,
+            deadline_at=deadline_at,
+            max_paid_calls=max_paid_calls,
+            previous_job_id=previous_job_id,
+        )
         async with self._lock:
             self._jobs[metadata.job_id] = JobRecord(metadata=metadata)
+            if self._store is not None:
+                self._batch.new_jobs.append(metadata.model_copy())
+                self._schedule_flush()
+        for company in companies or ():
+            self.record_input(metadata.job_id, company)
         return metadata
 
     async def get_job(self, job_id: str) -> JobRecord | None:
+        if job_id in self._unloaded_results and self._store is not None:
+            results = await asyncio.to_thread(self._load_results, job_id)
+            if job_id in self._unloaded_results:
+                self._unloaded_results.discard(job_id)
+                self._jobs[job_id].results = results
         async with self._lock:
             return self._jobs.get(job_id)
 
@@ -30,50 +93,366 @@ class JobManager:
             job = self._jobs[job_id]
             job.metadata.status = status
             job.metadata.error = error
+            self._stage_fields(job_id, status=status, error=error)
+            self._notify(job_id)
 
-    async def append_result(self, job_id: str, result: CompanyResult) -> None:
+    async def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        error: str | None = None,
+        stop_reason: str | None = None,
+    ) -> bool:
+        # Moves a job to a final status unless it already has one, so a job cancelled while its
+        # last items finish stays CANCELLED. Returns whether the status changed.
         async with self._lock:
             job = self._jobs[job_id]
-            job.results.append(result)
-            job.metadata.processed += 1
-            if result.status == 'SUCCESS':
-                job.metadata.success_count += 1
-            else:
-                job.metadata.failure_count += 1
+            if job.metadata.status in TERMINAL_STATUSES:
+                return False
+            job.metadata.status = status
+            job.metadata.error = error
+            job.metadata.stop_reason = stop_reason
+            self._stage_fields(job_id, status=status, error=error, stop_reason=stop_reason)
+            self._notify(job_id)
+            return True
 
-    async def to_csv_bytes(self, job_id: str) -> bytes:
+    async def set_total(self, job_id: str, total: int, ingest_complete: bool) -> None:
         async with self._lock:
             job = self._jobs[job_id]
-            rows = list(job.results)
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['company', 'website', 'website_found', 'phone', 'phone_found', 'email', 'email_found', 'source', 'status'])
-
-        for item in rows:
-            writer.writerow(
-                [
-                    item.company,
-                    item.website,
-                    item.website_found,
-                    item.phone,
-                    item.phone_found,
-                    item.email,
-                    item.email_found,
-                    item.source,
-                    item.status,
-                ]
-            )
-
-        return output.getvalue().encode('utf-8')
-
-
-def chunked(data: Iterable[str], size: int) -> Iterable[list[str]]:
-    bucket: list[str] = []
-    for entry in data:
-        bucket.append(entry)
-        if len(bucket) == size:
-            yield bucket
-            bucket = []
-    if bucket:
-        yield bucket
+            job.metadata.total = total
+            job.metadata.ingest_complete = ingest_complete
+            self._stage_fields(job_id, total=total, ingest_complete=ingest_complete)
+            self._notify(job_id)
+
+    def record_input(self, job_id: str, company: str) -> int | None:
+        if self._store is None:
+            return None
+        position = self._input_counts.get(job_id, 0)
+        self._input_counts[job_id] = position + 1
+        self._batch.inputs.append((job_id, position, company))
+        self._request_flush_if_full()
+        return position
+
+    async def track_ingest(
+        self,
+        job_id: str,
+        companies: AsyncIterable[str],
+        previous: PreviousResults | None = None,
+    ) -> AsyncIterator[str]:
+        # With a previous run, companies whose old row is still fresh get that row as their
+        # result right away; only the rest are passed on to be looked up.
+        total = 0
+        reuse_counts: dict[str, int] = {}
+        async for company in companies:
+            total += 1
+            kind, carried = previous.match(company) if previous is not None else (None, None)
+            if kind is not None:
+                reuse_counts[kind] = reuse_counts.get(kind, 0) + 1
+            if carried is not None:
+                await self.carry_result(job_id, company, carried)
+            else:
+                self.record_input(job_id, company)
+            if total % INGEST_PROGRESS_EVERY == 0:
+                await self._record_reuse_counts(job_id, reuse_counts)
+                await self.set_total(job_id, total, ingest_complete=False)
+            if carried is None:
+                yield company
+        await self._record_reuse_counts(job_id, reuse_counts)
+        await self.set_total(job_id, total, ingest_complete=True)
+
+    async def append_result(self, job_id: str, result: CompanyResult, input_position: int | None = None) -> None:
+        async with self._lock:
+            self._add_result(job_id, result, input_position)
+
+    async def carry_result(self, job_id: str, company: str, result: CompanyResult) -> None:
+        # The input and its result are staged together, so a shared-queue worker never sees the
+        # input as open work.
+        async with self._lock:
+            self._add_result(job_id, result, self.record_input(job_id, company))
+
+    async def load_results(self, job_id: str) -> CompactResultStore | None:
+        job = await self.get_job(job_id)
+        return job.results if job is not None else None
+
+    async def record_cache_lookup(self, job_id: str, hit: bool) -> None:
+        await self._increment(job_id, 'cache_hits' if hit else 'cache_misses')
+
+    async def record_coalesced_lookup(self, job_id: str) -> None:
+        await self._increment(job_id, 'coalesced_lookups')
+
+    async def record_stage_failure(self, job_id: str) -> None:
+        await self._increment(job_id, 'stage_failures')
+
+    async def record_paid_calls(self, job_id: str, calls: int) -> None:
+        await self._increment(job_id, 'paid_calls', calls)
+
+    def subscribe(self, job_id: str) -> asyncio.Event:
+        # The event is set whenever the job's metadata or results change; the subscriber clears it
+        # before reading, so any number of changes between two reads collapse into one wake-up.
+        event = asyncio.Event()
+        self._subscribers.setdefault(job_id, set()).add(event)
+        return event
+
+    def unsubscribe(self, job_id: str, event: asyncio.Event) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(event)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    async def restore(self) -> list[str]:
+        # Load persisted jobs and return the ids of those that were still running at shutdown.
+        if self._store is None:
+            return []
+
+        resumable: list[str] = []
+        for metadata in await asyncio.to_thread(self._store.load_jobs):
+            job_id = metadata.job_id
+            self._input_counts[job_id] = await asyncio.to_thread(self._store.count_inputs, job_id)
+            record = JobRecord(metadata=metadata)
+            if metadata.status in RESUMABLE_STATUSES:
+                record.results = await asyncio.to_thread(self._load_results, job_id)
+                resumable.append(job_id)
+            else:
+                self._unloaded_results.add(job_id)
+            async with self._lock:
+                self._jobs[job_id] = record
+                if metadata.status in RESUMABLE_STATUSES and not metadata.ingest_complete:
+                    # The upload was cut off mid-parse; finish with the rows that were received.
+                    metadata.total = self._input_counts[job_id]
+                    metadata.ingest_complete = True
+                    self._stage_fields(job_id, total=metadata.total, ingest_complete=True)
+        return resumable
+
+    async def iter_unprocessed_inputs(self, job_id: str) -> AsyncIterator[str]:
+        if self._store is None:
+            return
+        done = set(self._jobs[job_id].results.companies())
+        after_position = -1
+        while True:
+            rows = await asyncio.to_thread(self._store.load_inputs, job_id, after_position, RESUME_INPUT_PAGE_SIZE)
+            if not rows:
+                return
+            for _, company in rows:
+                if company not in done:
+                    yield company
+            after_position = rows[-1][0]
+
+    async def flush(self) -> None:
+        if self._store is None:
+            return
+        async with self._flush_lock:
+            async with self._lock:
+                batch, self._batch = self._batch, StoreBatch()
+            if batch.is_empty():
+                return
+            try:
+                await asyncio.to_thread(self._store.write_batch, batch)
+            except Exception:
+                # Keep the batch for the next flush rather than dropping it.
+                async with self._lock:
+                    batch.absorb(self._batch)
+                    self._batch = batch
+                raise
+
+    async def close(self) -> None:
+        flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+        await self.flush()
+        if self._store is not None:
+            self._store.close()
+
+    async def iter_result_chunks(
+        self,
+        job_id: str,
+        start: int,
+        stop: int,
+        output_format: ExportFormat = ExportFormat.CSV,
+    ) -> AsyncIterator[bytes]:
+        if output_format == ExportFormat.CSV and start == 0:
+            yield render_csv_header()
+
+        for offset in range(start, stop, DOWNLOAD_CHUNK_ROWS):
+            chunk = await self._result_slice(job_id, offset, min(offset + DOWNLOAD_CHUNK_ROWS, stop))
+            yield render_results(chunk, output_format)
+            await asyncio.sleep(0)
+
+    async def _result_slice(self, job_id: str, start: int, stop: int) -> list[CompanyResult]:
+        # Results are append-only, so slicing a fixed window needs no lock and stays consistent
+        # while the job keeps appending behind it.
+        return self._jobs[job_id].results.slice(start, stop)
+
+    def _add_result(self, job_id: str, result: CompanyResult, input_position: int | None) -> None:
+        job = self._jobs[job_id]
+        job.results.append(result)
+        job.metadata.processed += 1
+        if result.status == 'SUCCESS':
+            job.metadata.success_count += 1
+        else:
+            job.metadata.failure_count += 1
+        if self._store is not None:
+            self._batch.results.append((job_id, input_position, result))
+            self._request_flush_if_full()
+        self._notify(job_id)
+
+    async def _record_reuse_counts(self, job_id: str, reuse_counts: dict[str, int]) -> None:
+        for kind, amount in reuse_counts.items():
+            await self._increment(job_id, f'{kind}_count', amount)
+        reuse_counts.clear()
+
+    def _load_results(self, job_id: str) -> CompactResultStore:
+        results = CompactResultStore()
+        while True:
+            page = self._store.load_results(job_id, len(results), len(results) + RESUME_INPUT_PAGE_SIZE)
+            results.extend(page)
+            if len(page) < RESUME_INPUT_PAGE_SIZE:
+                return results
+
+    def _stage_fields(self, job_id: str, **fields: object) -> None:
+        if self._store is None:
+            return
+        self._batch.job_fields.setdefault(job_id, {}).update(fields)
+        self._schedule_flush()
+
+    async def _increment(self, job_id: str, counter: str, amount: int = 1) -> None:
+        async with self._lock:
+            metadata = self._jobs[job_id].metadata
+            setattr(metadata, counter, getattr(metadata, counter) + amount)
+            self._stage_counter(job_id, counter, amount)
+            self._notify(job_id)
+
+    def _notify(self, job_id: str) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers:
+            for event in subscribers:
+                event.set()
+
+    def _stage_counter(self, job_id: str, counter: str, amount: int = 1) -> None:
+        if self._store is None:
+            return
+        self._batch.add_counters(job_id, {counter: amount})
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flush_wanted = asyncio.Event()
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def _request_flush_if_full(self) -> None:
+        self._schedule_flush()
+        if len(self._batch) >= self._flush_batch_size:
+            self._flush_wanted.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), timeout=self._flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            try:
+                await self.flush()
+            except Exception:  # disk hiccups are retried on the next tick
+                pass
+
+
+class SharedJobManager(JobManager):
+    # Multi-process variant: the store is the source of truth for every job, so any worker
+    # process can report status, serve downloads and record results for work it claimed.
+    notifies_changes = False
+
+    def __init__(
+        self,
+        store: SqliteJobStore,
+        flush_interval_seconds: float = 0.5,
+        flush_batch_size: int = 500,
+    ) -> None:
+        super().__init__(store=store, flush_interval_seconds=flush_interval_seconds, flush_batch_size=flush_batch_size)
+        self.store = store
+
+    async def get_job(self, job_id: str) -> JobRecord | None:
+        metadata = await asyncio.to_thread(self.store.load_job, job_id)
+        return JobRecord(metadata=metadata) if metadata else None
+
+    async def ingest(
+        self,
+        job_id: str,
+        companies: AsyncIterable[str],
+        previous: PreviousResults | None = None,
+    ) -> None:
+        # Queue the job's inputs in the store; whichever workers are idle claim and process them.
+        await self.set_status(job_id, JobStatus.PROCESSING)
+        try:
+            async for _ in self.track_ingest(job_id, companies, previous):
+                pass
+        except Exception as exc:
+            await self.set_status(job_id, JobStatus.FAILED, error=str(exc))
+        await self.flush()
+
+    async def load_results(self, job_id: str) -> CompactResultStore | None:
+        if await self.get_job(job_id) is None:
+            return None
+        return await asyncio.to_thread(self._load_results, job_id)
+
+    def _add_result(self, job_id: str, result: CompanyResult, input_position: int | None) -> None:
+        self._batch.results.append((job_id, input_position, result))
+        self._request_flush_if_full()
+
+    async def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        error: str | None = None,
+        stop_reason: str | None = None,
+    ) -> bool:
+        # The job may belong to another process, so the check-and-set happens in the store.
+        await self.flush()
+        return await asyncio.to_thread(self.store.finish_job, job_id, status, error, stop_reason)
+
+    async def _increment(self, job_id: str, counter: str, amount: int = 1) -> None:
+        async with self._lock:
+            self._stage_counter(job_id, counter, amount)
+
+    async def restore(self) -> list[str]:
+        # Interrupted work is recovered through expiring claims instead.
+        return []
+
+    async def _result_slice(self, job_id: str, start: int, stop: int) -> list[CompanyResult]:
+        return await asyncio.to_thread(self.store.load_results, job_id, start, stop)
+
+
+def render_csv_header() -> bytes:
+    return _render_csv([RESULT_COLUMNS])
+
+
+def render_results(results: Iterable[CompanyResult], output_format: ExportFormat) -> bytes:
+    if output_format == ExportFormat.NDJSON:
+        return ''.join(item.model_dump_json() + '\n' for item in results).encode('utf-8')
+    return _render_csv(_csv_row(item) for item in results)
+
+
+def _csv_row(item: CompanyResult) -> list:
+    return [
+        item.company,
+        item.website,
+        item.website_found,
+        item.phone,
+        item.phone_found,
+        item.email,
+        item.email_found,
+        item.source,
+        item.status,
+        _iso_timestamp(item.enriched_at),
+    ]
+
+
+def _iso_timestamp(value: float | None) -> str | None:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat(timespec='seconds') if value is not None else None
+
+
+def _render_csv(rows: Iterable[list]) -> bytes:
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue().encode('utf-8')
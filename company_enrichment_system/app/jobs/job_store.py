@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app.models import CompanyResult, JobMetadata, JobStatus
+
+_METADATA_COLUMNS = (
+    'job_id',
+    'status',
+    'total',
+    'ingest_complete',
+    'processed',
+    'success_count',
+    'failure_count',
+    'cache_hits',
+    'cache_misses',
+    'coalesced_lookups',
+    'stage_failures',
+    'paid_calls',
+    'deadline_at',
+    'max_paid_calls',
+    'stop_reason',
+    'previous_job_id',
+    'reused_count',
+    'refreshed_count',
+    'new_count',
+    'error',
+)
+_RESULT_COLUMNS = (
+    'company',
+    'website',
+    'website_found',
+    'phone',
+    'phone_found',
+    'email',
+    'email_found',
+    'source',
+    'status',
+    'enriched_at',
+)
+# Metadata fields owned by whichever process drives the job; counters are only ever applied as deltas.
+UPDATABLE_JOB_FIELDS = {'status', 'error', 'total', 'ingest_complete', 'stop_reason'}
+COUNTER_COLUMNS = (
+    'cache_hits',
+    'cache_misses',
+    'coalesced_lookups',
+    'stage_failures',
+    'paid_calls',
+    'reused_count',
+    'refreshed_count',
+    'new_count',
+)
+# Statuses that keep a job's inputs claimable
+_ACTIVE_STATUSES = (JobStatus.PENDING.value, JobStatus.PROCESSING.value)
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS jobs ('
+    'job_id TEXT PRIMARY KEY, status TEXT NOT NULL, total INTEGER NOT NULL, ingest_complete INTEGER NOT NULL, '
+    'processed INTEGER NOT NULL, success_count INTEGER NOT NULL, failure_count INTEGER NOT NULL, '
+    'cache_hits INTEGER NOT NULL, cache_misses INTEGER NOT NULL, coalesced_lookups INTEGER NOT NULL DEFAULT 0, '
+    'stage_failures INTEGER NOT NULL DEFAULT 0, paid_calls INTEGER NOT NULL DEFAULT 0, deadline_at REAL, '
+    'max_paid_calls INTEGER, stop_reason TEXT, previous_job_id TEXT, reused_count INTEGER NOT NULL DEFAULT 0, '
+    'refreshed_count INTEGER NOT NULL DEFAULT 0, new_count INTEGER NOT NULL DEFAULT 0, '
+    'error TEXT, updated_at REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS job_inputs ('
+    'job_id TEXT NOT NULL, position INTEGER NOT NULL, company TEXT NOT NULL, '
+    'done INTEGER NOT NULL DEFAULT 0, claimed_by TEXT, claimed_until REAL, PRIMARY KEY (job_id, position))',
+    'CREATE TABLE IF NOT EXISTS job_results ('
+    'job_id TEXT NOT NULL, position INTEGER NOT NULL, input_position INTEGER, company TEXT NOT NULL, website TEXT, '
+    'website_found INTEGER NOT NULL, phone TEXT, phone_found INTEGER NOT NULL, email TEXT, '
+    'email_found INTEGER NOT NULL, source TEXT, status TEXT NOT NULL, enriched_at REAL, '
+    'PRIMARY KEY (job_id, position))',
+)
+
+_INDEXES = ('CREATE INDEX IF NOT EXISTS idx_job_inputs_pending ON job_inputs (done, position)',)
+
+
+@dataclass
+class StoreBatch:
+    new_jobs: list[JobMetadata] = field(default_factory=list)
+    job_fields: dict[str, dict[str, object]] = field(default_factory=dict)
+    # job_id -> {counter column: increment}
+    counter_deltas: dict[str, dict[str, int]] = field(default_factory=dict)
+    inputs: list[tuple[str, int, str]] = field(default_factory=list)
+    # (job_id, input position when the work item came from the shared queue, result)
+    results: list[tuple[str, int | None, CompanyResult]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.inputs) + len(self.results)
+
+    def is_empty(self) -> bool:
+        return not (self.new_jobs or self.job_fields or self.counter_deltas or self.inputs or self.results)
+
+    def absorb(self, later: StoreBatch) -> None:
+        self.new_jobs.extend(later.new_jobs)
+        for job_id, fields in later.job_fields.items():
+            self.job_fields.setdefault(job_id, {}).update(fields)
+        for job_id, counters in later.counter_deltas.items():
+            self.add_counters(job_id, counters)
+        self.inputs.extend(later.inputs)
+        self.results.extend(later.results)
+
+    def add_counters(self, job_id: str, counters: dict[str, int]) -> None:
+        delta = self.counter_deltas.setdefault(job_id, {})
+        for column, amount in counters.items():
+            delta[column] = delta.get(column, 0) + amount
+
+
+class SqliteJobStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def write_batch(self, batch: StoreBatch) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    f'INSERT OR IGNORE INTO jobs ({", ".join(_METADATA_COLUMNS)}, updated_at) '
+                    f'VALUES ({", ".join("?" * (len(_METADATA_COLUMNS) + 1))})',
+                    ((*(_metadata_value(meta, column) for column in _METADATA_COLUMNS), now) for meta in batch.new_jobs),
+                )
+                for job_id, fields in batch.job_fields.items():
+                    columns = [column for column in fields if column in UPDATABLE_JOB_FIELDS]
+                    conn.execute(
+                        f'UPDATE jobs SET {", ".join(f"{column} = ?" for column in columns)}, updated_at = ? WHERE job_id = ?',
+                        (*(_db_value(fields[column]) for column in columns), now, job_id),
+                    )
+                conn.executemany(
+                    'INSERT INTO job_inputs (job_id, position, company) VALUES (?, ?, ?) '
+                    'ON CONFLICT (job_id, position) DO NOTHING',
+                    batch.inputs,
+                )
+                conn.executemany(
+                    'UPDATE jobs SET updated_at = ? WHERE job_id = ?',
+                    ((now, job_id) for job_id in {job_id for job_id, _, _ in batch.inputs}),
+                )
+                for job_id, counters in batch.counter_deltas.items():
+                    columns = [column for column in counters if column in COUNTER_COLUMNS]
+                    conn.execute(
+                        f'UPDATE jobs SET {", ".join(f"{column} = {column} + ?" for column in columns)} WHERE job_id = ?',
+                        (*(counters[column] for column in columns), job_id),
+                    )
+                touched = self._apply_results(conn, batch.results, now) | set(batch.job_fields)
+                conn.executemany(
+                    'UPDATE jobs SET status = ? '
+                    'WHERE job_id = ? AND status = ? AND ingest_complete = 1 AND processed >= total',
+                    ((JobStatus.COMPLETED.value, job_id, JobStatus.PROCESSING.value) for job_id in touched),
+                )
+
+    def _apply_results(
+        self,
+        conn: sqlite3.Connection,
+        results: list[tuple[str, int | None, CompanyResult]],
+        now: float,
+    ) -> set[str]:
+        tallies: dict[str, list[int]] = {}
+        for job_id, input_position, result in results:
+            if input_position is not None:
+                # A work item whose lease expired may have been finished by another worker too;
+                # only the first result for an input counts.
+                claimed = conn.execute(
+                    'UPDATE job_inputs SET done = 1 WHERE job_id = ? AND position = ? AND done = 0',
+                    (job_id, input_position),
+                )
+                if claimed.rowcount == 0:
+                    continue
+            conn.execute(
+                f'INSERT INTO job_results (job_id, position, input_position, {", ".join(_RESULT_COLUMNS)}) '
+                f'SELECT ?, COALESCE(MAX(position) + 1, 0), ?, {", ".join("?" * len(_RESULT_COLUMNS))} '
+                'FROM job_results WHERE job_id = ?',
+                (job_id, input_position, *_result_values(result), job_id),
+            )
+            tally = tallies.setdefault(job_id, [0, 0])
+            tally[0 if result.status == 'SUCCESS' else 1] += 1
+
+        for job_id, (succeeded, failed) in tallies.items():
+            conn.execute(
+                'UPDATE jobs SET processed = processed + ?, success_count = success_count + ?, '
+                'failure_count = failure_count + ?, updated_at = ? WHERE job_id = ?',
+                (succeeded + failed, succeeded, failed, now, job_id),
+            )
+        return set(tallies)
+
+    def load_jobs(self) -> list[JobMetadata]:
+        with self._lock:
+            rows = self._connect().execute(
+                f'SELECT {", ".join(_METADATA_COLUMNS)} FROM jobs ORDER BY updated_at'
+            ).fetchall()
+        return [JobMetadata(**dict(zip(_METADATA_COLUMNS, row))) for row in rows]
+
+    def load_job(self, job_id: str) -> JobMetadata | None:
+        with self._lock:
+            row = self._connect().execute(
+                f'SELECT {", ".join(_METADATA_COLUMNS)} FROM jobs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        return JobMetadata(**dict(zip(_METADATA_COLUMNS, row))) if row else None
+
+    def load_results(self, job_id: str, start: int = 0, stop: int | None = None) -> list[CompanyResult]:
+        with self._lock:
+            rows = self._connect().execute(
+                f'SELECT {", ".join(_RESULT_COLUMNS)} FROM job_results '
+                'WHERE job_id = ? AND position >= ? AND position < ? ORDER BY position',
+                (job_id, start, stop if stop is not None else 2**62),
+            ).fetchall()
+        return [_result_from_row(row) for row in rows]
+
+    def count_inputs(self, job_id: str) -> int:
+        with self._lock:
+            (count,) = self._connect().execute(
+                'SELECT COUNT(*) FROM job_inputs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        return count
+
+    def load_inputs(self, job_id: str, after_position: int, limit: int) -> list[tuple[int, str]]:
+        with self._lock:
+            return self._connect().execute(
+                'SELECT position, company FROM job_inputs WHERE job_id = ? AND position > ? ORDER BY position LIMIT ?',
+                (job_id, after_position, limit),
+            ).fetchall()
+
+    def claim_inputs(self, worker_id: str, limit: int, lease_seconds: float) -> list[tuple[str, int, str]]:
+        # Ordering by position interleaves every active job, so claims are round-robin across jobs.
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(
+                    'UPDATE job_inputs SET claimed_by = ?, claimed_until = ? WHERE rowid IN ('
+                    'SELECT job_inputs.rowid FROM job_inputs JOIN jobs ON jobs.job_id = job_inputs.job_id '
+                    'WHERE job_inputs.done = 0 AND (job_inputs.claimed_until IS NULL OR job_inputs.claimed_until < ?) '
+                    'AND jobs.status IN (?, ?) AND (jobs.deadline_at IS NULL OR jobs.deadline_at > ?) '
+                    'AND (jobs.max_paid_calls IS NULL OR jobs.paid_calls < jobs.max_paid_calls) '
+                    'ORDER BY job_inputs.position LIMIT ?'
+                    ') RETURNING job_id, position, company',
+                    (worker_id, now + lease_seconds, now, *_ACTIVE_STATUSES, now, limit),
+                ).fetchall()
+
+    def finalize_stale_ingests(self, stale_seconds: float) -> None:
+        # An uploader that died mid-parse never marks its ingest complete; close such jobs out
+        # with the rows that made it into the store so they can still finish.
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    'UPDATE jobs SET ingest_complete = 1, '
+                    'total = (SELECT COUNT(*) FROM job_inputs WHERE job_inputs.job_id = jobs.job_id), updated_at = ? '
+                    'WHERE ingest_complete = 0 AND status IN (?, ?) AND updated_at < ?',
+                    (now, JobStatus.PENDING.value, JobStatus.PROCESSING.value, now - stale_seconds),
+                )
+                conn.execute(
+                    'UPDATE jobs SET status = ? WHERE status = ? AND ingest_complete = 1 AND processed >= total',
+                    (JobStatus.COMPLETED.value, JobStatus.PROCESSING.value),
+                )
+
+    def finish_job(self, job_id: str, status: JobStatus, error: str | None, stop_reason: str | None) -> bool:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, stop_reason = ?, updated_at = ? '
+                    'WHERE job_id = ? AND status IN (?, ?)',
+                    (status.value, error, stop_reason, time.time(), job_id, *_ACTIVE_STATUSES),
+                ).rowcount > 0
+
+    def stop_limited_jobs(self) -> None:
+        # Shared-queue deadlines and paid-call budgets are enforced when inputs are claimed; jobs
+        # that ran into one end here as PARTIAL.
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, stop_reason = CASE WHEN deadline_at IS NOT NULL AND deadline_at <= ? "
+                    "THEN 'deadline' ELSE 'budget' END, updated_at = ? WHERE status IN (?, ?) AND "
+                    '((deadline_at IS NOT NULL AND deadline_at <= ?) OR (max_paid_calls IS NOT NULL AND paid_calls >= max_paid_calls))',
+                    (JobStatus.PARTIAL.value, now, now, *_ACTIVE_STATUSES, now),
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Several processes may share the file; wait on their write locks instead of failing.
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            for statement in _INDEXES:
+                conn.execute(statement)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+
+def _db_value(value: object) -> object:
+    if isinstance(value, JobStatus):
+        return value.value
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _metadata_value(meta: JobMetadata, column: str) -> object:
+    return _db_value(getattr(meta, column))
+
+
+def _result_values(result: CompanyResult) -> tuple:
+    return (
+        result.company,
+        result.website,
+        int(result.website_found),
+        result.phone,
+        int(result.phone_found),
+        result.email,
+        int(result.email_found),
+        result.source,
+        result.status,
+        result.enriched_at,
+    )
+
+
+def _result_from_row(row: tuple) -> CompanyResult:
+    company, website, website_found, phone, phone_found, email, email_found, source, status, enriched_at = row
+    return CompanyResult(
+        company=company,
+        website=website,
+        website_found=bool(website_found),
+        phone=phone,
+        phone_found=bool(phone_found),
+        email=email,
+        email_found=bool(email_found),
+        source=source,
+        status=status,
+        enriched_at=enriched_at,
+    )
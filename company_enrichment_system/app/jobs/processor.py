@@ -1,61 +1,277 @@
 from __future__ import annotations
 
 import asyncio
-
-import httpx
+import time
+from functools import partial
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable
 
 from app.config import Settings
-from app.jobs.job_manager import JobManager, chunked
-from app.models import CompanyResult, JobStatus
+from app.jobs.job_manager import TERMINAL_STATUSES, JobManager
+from app.jobs.reuse import PreviousResults
+from app.jobs.scheduler import JobScheduler, JobStoppedError, get_job_scheduler
+from app.models import CompanyResult, ContactLookupResult, DomainLookupResult, JobStatus
+from app.services.budget import BudgetExhaustedError, CallBudget, PaidCallTally, current_paid_calls
+from app.services.cache import EnrichmentCache
+from app.services.candidate_stats import CandidateStats
+from app.services.concurrency import AdaptiveConcurrencyLimiter, get_concurrency_limiter
 from app.services.contact_service import ContactService
-from app.services.website_service import WebsiteService
+from app.services.dns_resolver import DnsResolver
+from app.services.http_client import HttpClients, get_http_clients
+from app.services.page_contacts import PageContactExtractor
+from app.services.profiler import JobProfiler, get_job_profiler
+from app.services.rate_limiter import RateLimiterRegistry
+from app.services.resilience import CircuitBreakerRegistry, StageFailedError, get_circuit_breakers, retry_delay
+from app.services.singleflight import SingleFlight, get_lookup_singleflight
+from app.services.website_service import ProbeCounters, WebsiteService
+from app.utils.metrics import COMPANIES_PROCESSED, COMPANY_RETRIES, CONCURRENCY_WAIT
+from app.utils.tracing import RETRY_SPAN_SUFFIX, current_trace, record_span, trace_span
+from app.utils.validators import canonicalize_company_name
+
+WEBSITE_LOOKUP = 'website'
+CONTACT_LOOKUP = 'contact'
+COMPANY_RETRY_SPAN = f'company{RETRY_SPAN_SUFFIX}'
+
+STOP_CANCELLED = 'cancelled'
+STOP_DEADLINE = 'deadline'
+STOP_BUDGET = 'budget'
 
 
 class JobProcessor:
-    def __init__(self, settings: Settings, manager: JobManager) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        manager: JobManager,
+        cache: EnrichmentCache | None = None,
+        dns_resolver: DnsResolver | None = None,
+        rate_limiters: RateLimiterRegistry | None = None,
+        scheduler: JobScheduler | None = None,
+        probe_counters: ProbeCounters | None = None,
+        http_clients: HttpClients | None = None,
+        singleflight: SingleFlight | None = None,
+        concurrency_limiter: AdaptiveConcurrencyLimiter | None = None,
+        breakers: CircuitBreakerRegistry | None = None,
+        candidate_stats: CandidateStats | None = None,
+        profiler: JobProfiler | None = None,
+    ) -> None:
         self.settings = settings
+        self.http_clients = http_clients or get_http_clients()
+        self.singleflight = singleflight or get_lookup_singleflight()
         self.manager = manager
-        self.website_service = WebsiteService(settings)
-        self.contact_service = ContactService(settings)
-        self._semaphore = asyncio.Semaphore(settings.max_concurrency)
+        self.scheduler = scheduler or get_job_scheduler()
+        self.cache = cache if settings.cache_enabled else None
+        self.rate_limiters = rate_limiters or RateLimiterRegistry(settings)
+        self.breakers = breakers or get_circuit_breakers()
+        self.website_service = WebsiteService(
+            settings,
+            dns_resolver=dns_resolver,
+            rate_limiters=self.rate_limiters,
+            probe_counters=probe_counters,
+            breakers=self.breakers,
+            candidate_stats=candidate_stats,
+        )
+        self.contact_service = ContactService(settings, rate_limiters=self.rate_limiters, breakers=self.breakers)
+        self.page_contacts = PageContactExtractor(settings, rate_limiters=self.rate_limiters)
+        self.concurrency_limiter = concurrency_limiter or get_concurrency_limiter()
+        self.profiler = profiler or get_job_profiler()
+        self._budgets: dict[str, CallBudget] = {}
 
-    async def start(self, job_id: str, companies: list[str]) -> None:
+    async def start(
+        self,
+        job_id: str,
+        companies: Iterable[str] | AsyncIterable[str],
+        previous: PreviousResults | None = None,
+    ) -> None:
+        job = await self.manager.get_job(job_id)
+        if job is None or job.metadata.status in TERMINAL_STATUSES:
+            # Cancelled before it got going.
+            self.scheduler.clear_pending_stop(job_id)
+            return
         await self.manager.set_status(job_id, JobStatus.PROCESSING)
+        metadata = job.metadata
+        if isinstance(companies, AsyncIterable) and not metadata.ingest_complete:
+            companies = self.manager.track_ingest(job_id, companies, previous)
+
+        budget = CallBudget(
+            metadata.max_paid_calls,
+            # Companies already running may finish; they just can't make further paid calls.
+            on_exhausted=partial(self.scheduler.cancel_job, job_id, STOP_BUDGET, cancel_in_flight=False),
+        )
+        budget.used = metadata.paid_calls
+        self._budgets[job_id] = budget
+        deadline = None
+        if metadata.deadline_at is not None:
+            remaining = max(0.0, metadata.deadline_at - time.time())
+            deadline = asyncio.get_running_loop().call_later(remaining, self.scheduler.cancel_job, job_id, STOP_DEADLINE)
         try:
-            async with httpx.AsyncClient() as client:
-                for company_batch in chunked(companies, self.settings.batch_size):
-                    tasks = [self._process_company(job_id, client, company) for company in company_batch]
-                    await asyncio.gather(*tasks)
+            await self.http_clients.start()
+            await self.scheduler.run_job(job_id, companies, partial(self._process_company, job_id))
 
-            await self.manager.set_status(job_id, JobStatus.COMPLETED)
+            await self.manager.finish(job_id, JobStatus.COMPLETED)
+        except JobStoppedError as exc:
+            status = JobStatus.CANCELLED if exc.reason == STOP_CANCELLED else JobStatus.PARTIAL
+            await self.manager.finish(job_id, status, stop_reason=exc.reason)
         except Exception as exc:  # defensive terminal fallback for job lifecycle
-            await self.manager.set_status(job_id, JobStatus.FAILED, error=str(exc))
+            await self.manager.finish(job_id, JobStatus.FAILED, error=str(exc))
+        finally:
+            if deadline is not None:
+                deadline.cancel()
+            self._budgets.pop(job_id, None)
 
-    async def _process_company(self, job_id: str, client: httpx.AsyncClient, company: str) -> None:
-        async with self._semaphore:
+    async def process_claimed(self, job_id: str, item: tuple[int, str]) -> None:
+        position, company = item
+        await self._process_company(job_id, company, input_position=position)
+
+    async def _process_company(
+        self,
+        job_id: str,
+        company: str,
+        input_position: int | None = None,
+    ) -> None:
+        # Paid calls are charged to the job's budget through a contextvar, so the services don't
+        # need to know which job they work for. Shared-queue jobs only count here; their budget
+        # is enforced when inputs are claimed.
+        tally = PaidCallTally(self._budgets.get(job_id) or CallBudget())
+        token = current_paid_calls.set(tally)
+        trace = self.profiler.start(job_id, company) if self.profiler.enabled else None
+        trace_token = current_trace.set(trace) if trace is not None else None
+        status = 'CANCELLED'
+        try:
+            status = await self._run_company(job_id, company, input_position, tally)
+        finally:
+            current_paid_calls.reset(token)
+            if trace is not None:
+                current_trace.reset(trace_token)
+                self.profiler.finish(job_id, trace, status)
+            if tally.calls:
+                await self.manager.record_paid_calls(job_id, tally.calls)
+
+    async def _run_company(
+        self,
+        job_id: str,
+        company: str,
+        input_position: int | None,
+        tally: PaidCallTally,
+    ) -> str:
+        # Returns the status the company ended with, for its trace.
+        queued_at = time.perf_counter()
+        async with self.concurrency_limiter.lease():
+            waited = time.perf_counter() - queued_at
+            CONCURRENCY_WAIT.observe(waited)
+            record_span('concurrency_wait', queued_at, waited)
+            # Lookups that already finished are kept across retries, so a retry only redoes
+            # the stage that failed.
+            website_lookup: DomainLookupResult | None = None
+            contact: ContactLookupResult | None = None
             for attempt in range(1, self.settings.max_retries + 1):
                 try:
-                    website_lookup = await self.website_service.detect_website(client, company)
-                    result = CompanyResult(
-                        company=company,
-                        website=website_lookup.website_url,
-                        website_found=website_lookup.website_found,
-                        source=website_lookup.source,
+                    if website_lookup is None:
+                        website_lookup = await self._lookup_website(job_id, company)
+                    if not website_lookup.website_found and contact is None:
+                        contact = await self._lookup_contact(job_id, company)
+                    result = self._build_result(company, website_lookup, contact)
+                    await self.manager.append_result(job_id, result, input_position)
+                    COMPANIES_PROCESSED.labels(result.status).inc()
+                    return result.status
+                except StageFailedError:
+                    # The stage already retried (or its circuit is open); repeating it here
+                    # would only multiply the load on a failing provider.
+                    await self.manager.record_stage_failure(job_id)
+                    return await self._record_failure(job_id, company, input_position)
+                except Exception as exc:  # recoverable per-item failures
+                    if isinstance(exc, BudgetExhaustedError) and exc.budget is tally.budget:
+                        # The job is out of paid calls and is being stopped; leave this company
+                        # without a result rather than recording a failure.
+                        return 'STOPPED'
+                    # Another job's budget running out in a shared lookup lands here too; the
+                    # retry repeats the lookup under this job's budget.
+                    if attempt >= self.settings.max_retries:
+                        return await self._record_failure(job_id, company, input_position)
+                    COMPANY_RETRIES.inc()
+                    delay = retry_delay(
+                        attempt,
+                        self.settings.stage_retry_base_delay_seconds,
+                        self.settings.stage_retry_max_delay_seconds,
                     )
+                    record_span(COMPANY_RETRY_SPAN, time.perf_counter(), delay, type(exc).__name__)
+                    await asyncio.sleep(delay)
 
-                    if not website_lookup.website_found:
-                        contact = await self.contact_service.lookup_contact(client, company)
-                        result.phone = contact.phone
-                        result.phone_found = contact.phone_found
-                        result.email = contact.email
-                        result.email_found = contact.email_found
-                        result.source = contact.source
-
-                    await self.manager.append_result(job_id, result)
-                    return
-                except Exception:  # recoverable per-item failures
-                    if attempt >= self.settings.max_retries:
-                        failed = CompanyResult(company=company, status='FAILED')
-                        await self.manager.append_result(job_id, failed)
-                        return
-                    await asyncio.sleep(0.5 * attempt)
+    @staticmethod
+    def _build_result(
+        company: str,
+        website_lookup: DomainLookupResult,
+        contact: ContactLookupResult | None,
+    ) -> CompanyResult:
+        # A row is as old as its oldest lookup; cached lookups keep the time they were made. A cache
+        # entry from before lookups were dated leaves the row undated, so re-enrichment refreshes it.
+        checked = [lookup.checked_at for lookup in (website_lookup, contact) if lookup is not None]
+        result = CompanyResult(
+            company=company,
+            website=website_lookup.website_url,
+            website_found=website_lookup.website_found,
+            source=website_lookup.source,
+            phone=website_lookup.phone,
+            phone_found=website_lookup.phone is not None,
+            email=website_lookup.email,
+            email_found=website_lookup.email is not None,
+            enriched_at=None if None in checked else min(checked),
+        )
+        if contact is not None:
+            result.phone = contact.phone
+            result.phone_found = contact.phone_found
+            result.email = contact.email
+            result.email_found = contact.email_found
+            result.source = contact.source
+        return result
+
+    async def _record_failure(self, job_id: str, company: str, input_position: int | None) -> str:
+        failed = CompanyResult(company=company, status='FAILED', enriched_at=time.time())
+        await self.manager.append_result(job_id, failed, input_position)
+        COMPANIES_PROCESSED.labels(failed.status).inc()
+        return failed.status
+
+    async def _lookup_website(self, job_id: str, company: str) -> DomainLookupResult:
+        if self.cache is not None:
+            with trace_span('cache'):
+                cached = await self.cache.get_domain(company)
+            await self.manager.record_cache_lookup(job_id, hit=cached is not None)
+            if cached is not None:
+                return cached
+        return await self._coalesced(job_id, (WEBSITE_LOOKUP, company), partial(self._fetch_website, company))
+
+    async def _lookup_contact(self, job_id: str, company: str) -> ContactLookupResult:
+        if self.cache is not None:
+            with trace_span('cache'):
+                cached = await self.cache.get_contact(company)
+            await self.manager.record_cache_lookup(job_id, hit=cached is not None)
+            if cached is not None:
+                return cached
+        return await self._coalesced(job_id, (CONTACT_LOOKUP, company), partial(self._fetch_contact, company))
+
+    async def _coalesced(self, job_id: str, key: tuple[str, str], fetch: Callable[[], Awaitable[Any]]) -> Any:
+        # Another job may already be looking up the same company; wait for its answer instead
+        # of spending API quota twice.
+        kind, company = key
+        started = time.perf_counter()
+        result, shared = await self.singleflight.do((kind, canonicalize_company_name(company)), fetch)
+        if shared:
+            # The call's own spans land in the trace of the company that started it.
+            record_span('coalesced_wait', started, time.perf_counter() - started, kind)
+            await self.manager.record_coalesced_lookup(job_id)
+        return result
+
+    async def _fetch_website(self, company: str) -> DomainLookupResult:
+        lookup = await self.website_service.detect_website(self.http_clients, company)
+        if lookup.website_found and self.settings.page_contacts_enabled:
+            page = await self.page_contacts.extract(self.http_clients, lookup.website_url)
+            lookup.phone, lookup.email = page.phone, page.email
+        lookup.checked_at = time.time()
+        if self.cache is not None:
+            await self.cache.set_domain(company, lookup)
+        return lookup
+
+    async def _fetch_contact(self, company: str) -> ContactLookupResult:
+        contact = await self.contact_service.lookup_contact(self.http_clients, company)
+        contact.checked_at = time.time()
+        if self.cache is not None:
+            await self.cache.set_contact(company, contact)
+        return contact
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Iterable, Iterator
+
+from app.models import CompanyResult
+
+# Per-row flag bits. The *_SET bits tell an empty string apart from a missing value.
+WEBSITE_FOUND = 1 << 0
+PHONE_FOUND = 1 << 1
+EMAIL_FOUND = 1 << 2
+WEBSITE_SET = 1 << 3
+PHONE_SET = 1 << 4
+EMAIL_SET = 1 << 5
+
+
+class _StringColumn:
+    # UTF-8 bytes of every value back to back, plus the end offset of each row.
+
+    def __init__(self) -> None:
+        self._data = bytearray()
+        self._ends = array('Q')
+
+    def append(self, value: str) -> None:
+        self._data += value.encode('utf-8')
+        self._ends.append(len(self._data))
+
+    def get(self, index: int) -> str:
+        start = self._ends[index - 1] if index else 0
+        return self._data[start:self._ends[index]].decode('utf-8')
+
+    def nbytes(self) -> int:
+        return len(self._data) + self._ends.itemsize * len(self._ends)
+
+
+class _InternedColumn:
+    # Small vocabularies (source, status) stored as one code per row; code 0 is None.
+
+    def __init__(self) -> None:
+        self._values: list[str | None] = [None]
+        self._codes: dict[str | None, int] = {None: 0}
+        self._rows = array('B')
+
+    def append(self, value: str | None) -> None:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            if code > 0xFF and self._rows.typecode == 'B':
+                self._rows = array('H', self._rows)
+            self._values.append(value)
+            self._codes[value] = code
+        self._rows.append(code)
+
+    def get(self, index: int) -> str | None:
+        return self._values[self._rows[index]]
+
+    def nbytes(self) -> int:
+        return self._rows.itemsize * len(self._rows)
+
+
+class CompactResultStore:
+    # Append-only, column-oriented result list for one job. Rows are kept as packed bytes and
+    # codes; CompanyResult objects are only built when a caller reads them back.
+
+    def __init__(self, results: Iterable[CompanyResult] = ()) -> None:
+        self._companies = _StringColumn()
+        self._websites = _StringColumn()
+        self._phones = _StringColumn()
+        self._emails = _StringColumn()
+        self._sources = _InternedColumn()
+        self._statuses = _InternedColumn()
+        # NaN stands for "unknown"
+        self._enriched_at = array('d')
+        self._flags = array('B')
+        self.extend(results)
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def __iter__(self) -> Iterator[CompanyResult]:
+        return (self._row(index) for index in range(len(self)))
+
+    def __getitem__(self, index: int) -> CompanyResult:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('result index out of range')
+        return self._row(index)
+
+    def append(self, result: CompanyResult) -> None:
+        flags = 0
+        if result.website_found:
+            flags |= WEBSITE_FOUND
+        if result.phone_found:
+            flags |= PHONE_FOUND
+        if result.email_found:
+            flags |= EMAIL_FOUND
+        if result.website is not None:
+            flags |= WEBSITE_SET
+        if result.phone is not None:
+            flags |= PHONE_SET
+        if result.email is not None:
+            flags |= EMAIL_SET
+
+        self._companies.append(result.company)
+        self._websites.append(result.website or '')
+        self._phones.append(result.phone or '')
+        self._emails.append(result.email or '')
+        self._sources.append(result.source)
+        self._statuses.append(result.status)
+        self._enriched_at.append(math.nan if result.enriched_at is None else result.enriched_at)
+        # Flags go last: a row only counts towards len() once every column has it.
+        self._flags.append(flags)
+
+    def extend(self, results: Iterable[CompanyResult]) -> None:
+        for result in results:
+            self.append(result)
+
+    def slice(self, start: int, stop: int) -> list[CompanyResult]:
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return [self._row(index) for index in range(start, stop)]
+
+    def companies(self) -> Iterator[str]:
+        return (self._companies.get(index) for index in range(len(self)))
+
+    def nbytes(self) -> int:
+        columns = (self._companies, self._websites, self._phones, self._emails, self._sources, self._statuses)
+        return (
+            sum(column.nbytes() for column in columns)
+            + self._enriched_at.itemsize * len(self._enriched_at)
+            + len(self._flags)
+        )
+
+    def _row(self, index: int) -> CompanyResult:
+        flags = self._flags[index]
+        enriched_at = self._enriched_at[index]
+        return CompanyResult.model_construct(
+            company=self._companies.get(index),
+            website=self._websites.get(index) if flags & WEBSITE_SET else None,
+            website_found=bool(flags & WEBSITE_FOUND),
+            phone=self._phones.get(index) if flags & PHONE_SET else None,
+            phone_found=bool(flags & PHONE_FOUND),
+            email=self._emails.get(index) if flags & EMAIL_SET else None,
+            email_found=bool(flags & EMAIL_FOUND),
+            source=self._sources.get(index),
+            status=self._statuses.get(index),
+            enriched_at=None if math.isnan(enriched_at) else enriched_at,
+        )
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import time
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator
+
+from app.jobs.result_store import CompactResultStore
+from app.models import CompanyResult
+from app.utils.file_loader import name_fingerprint
+from app.utils.validators import canonicalize_company_name
+
+# How a company of a re-upload relates to the previous run
+REUSED = 'reused'
+REFRESHED = 'refreshed'
+NEW = 'new'
+
+PREVIOUS_RESULT_SUFFIXES = {'.csv', '.ndjson'}
+
+
+class PreviousResults:
+    # An earlier run's rows by canonical company name. A company keeps its old row when that row
+    # succeeded and its lookups are younger than max_age_seconds; failed, stale and undated rows
+    # are looked up again.
+
+    def __init__(self, results: CompactResultStore, max_age_seconds: float) -> None:
+        self.results = results
+        self.oldest_allowed = time.time() - max_age_seconds
+        # Later rows win, so a company that was retried in the previous run uses its last answer.
+        self._rows = {
+            name_fingerprint(canonicalize_company_name(company)): index
+            for index, company in enumerate(results.companies())
+        }
+
+    def match(self, company: str) -> tuple[str, CompanyResult | None]:
+        index = self._rows.get(name_fingerprint(canonicalize_company_name(company)))
+        if index is None:
+            return NEW, None
+        row = self.results[index]
+        if row.status != 'SUCCESS' or row.enriched_at is None or row.enriched_at < self.oldest_allowed:
+            return REFRESHED, None
+        # Carried over under the spelling of the new upload.
+        row.company = company
+        return REUSED, row
+
+
+def read_previous_results(source: BinaryIO, filename: str) -> CompactResultStore:
+    # Parses a results file as /download (or the batch CLI) wrote it. Raises ValueError with a
+    # message fit for the client when the file can't be used.
+    suffix = filename[filename.rfind('.'):].lower() if '.' in filename else ''
+    if suffix not in PREVIOUS_RESULT_SUFFIXES:
+        raise ValueError('Previous results must be a .csv or .ndjson results download')
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', errors='ignore', newline='')
+    rows = _iter_ndjson(text) if suffix == '.ndjson' else _iter_csv(text)
+    results = CompactResultStore()
+    for row in rows:
+        company = _text(row.get('company'))
+        if company:
+            results.append(
+                CompanyResult(
+                    company=company,
+                    website=_text(row.get('website')),
+                    website_found=_flag(row.get('website_found')),
+                    phone=_text(row.get('phone')),
+                    phone_found=_flag(row.get('phone_found')),
+                    email=_text(row.get('email')),
+                    email_found=_flag(row.get('email_found')),
+                    source=_text(row.get('source')),
+                    status=_text(row.get('status')) or '',
+                    enriched_at=_timestamp(row.get('enriched_at')),
+                )
+            )
+    if not results:
+        raise ValueError('No rows with a company found in the previous results')
+    return results
+
+
+def _iter_csv(text: io.TextIOWrapper) -> Iterator[dict]:
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or 'company' not in reader.fieldnames:
+        raise ValueError('Previous results need a company column')
+    return reader
+
+
+def _iter_ndjson(text: io.TextIOWrapper) -> Iterator[dict]:
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ValueError(f'Previous results line {number} is not valid JSON') from None
+        if isinstance(row, dict):
+            yield row
+
+
+def _text(value: object) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _flag(value: object) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('true', '1', 'yes')
+
+
+def _timestamp(value: object) -> float | None:
+    # Unix seconds (NDJSON) or ISO 8601 (CSV); anything else counts as unknown.
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable
+
+from app.config import get_settings
+from app.models import SchedulerStats
+from app.services.concurrency import concurrency_bounds
+
+# Work items are company names, or (input position, company) pairs for shared-queue claims.
+WorkHandler = Callable[[Any], Awaitable[None]]
+
+
+class JobStoppedError(Exception):
+    # Raised by run_job when cancel_job stopped the job before all of its work ran.
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f'job stopped: {reason}')
+        self.reason = reason
+
+
+class _JobLane:
+    def __init__(self, job_id: str, handler: WorkHandler, queue_size: int) -> None:
+        self.job_id = job_id
+        self.handler = handler
+        self.queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=queue_size)
+        self.in_flight = 0
+        self.fed_all = False
+        self.stop_reason: str | None = None
+        self.tasks: set[asyncio.Task[None]] = set()
+        # In-flight items cancel_job cancelled; any other cancellation is the worker's own.
+        self.cancelled_tasks: set[asyncio.Task[None]] = set()
+        self.done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    @property
+    def accepting(self) -> bool:
+        return self.stop_reason is None and not self.done.done()
+
+    def settle(self, error: BaseException | None = None) -> None:
+        if self.done.done():
+            return
+        if error is not None:
+            self.done.set_exception(error)
+            self._drain()
+        elif self.stop_reason is not None:
+            # Queued work is dropped at once; the job ends when the items already running have.
+            self._drain()
+            if self.in_flight == 0:
+                self.done.set_exception(JobStoppedError(self.stop_reason))
+        elif self.fed_all and self.queue.empty() and self.in_flight == 0:
+            self.done.set_result(None)
+
+    def _drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class JobScheduler:
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.worker_count = max(workers, 1)
+        self.queue_size = max(queue_size, 1)
+        self._lanes: deque[_JobLane] = deque()
+        self._workers: list[asyncio.Task[None]] = []
+        self._work_available = asyncio.Event()
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started_at = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Stops requested before the job's lane existed; run_job applies them on entry.
+        self._pending_stops: dict[str, str] = {}
+        self.items_processed = 0
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._workers and self._loop is loop:
+            return
+        # Either the first start, or the previous event loop is gone (e.g. a test client restart).
+        self._loop = loop
+        self._lanes.clear()
+        self._work_available = asyncio.Event()
+        self._busy = 0
+        self._started_at = time.monotonic()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Cancelling (rather than failing) the lanes leaves their jobs resumable after a restart.
+        for lane in list(self._lanes):
+            lane.done.cancel()
+
+    async def run_job(
+        self,
+        job_id: str,
+        companies: Iterable[Any] | AsyncIterable[Any],
+        handler: WorkHandler,
+    ) -> None:
+        await self.start()
+        lane = _JobLane(job_id, handler, self.queue_size)
+        lane.stop_reason = self._pending_stops.pop(job_id, None)
+        self._lanes.append(lane)
+        try:
+            # Feeding happens in the caller's task, so a full lane queue back-pressures the producer.
+            if isinstance(companies, AsyncIterable):
+                async for company in companies:
+                    if not await self._enqueue(lane, company):
+                        break
+            else:
+                for company in companies:
+                    if not await self._enqueue(lane, company):
+                        break
+            lane.fed_all = True
+            lane.settle()
+            await lane.done
+        finally:
+            if lane in self._lanes:
+                self._lanes.remove(lane)
+
+    def cancel_job(self, job_id: str, reason: str, cancel_in_flight: bool = True, pending: bool = True) -> bool:
+        # Stops feeding the job and drops its queued work. In-flight items are cancelled too unless
+        # cancel_in_flight is False, in which case they finish first. run_job then raises
+        # JobStoppedError. Returns False when the job has no lane here; with `pending` the stop
+        # is then applied as soon as the job's lane is created.
+        found = False
+        for lane in list(self._lanes):
+            if lane.job_id != job_id or lane.done.done():
+                continue
+            found = True
+            if lane.stop_reason is None:
+                lane.stop_reason = reason
+            if cancel_in_flight:
+                for task in lane.tasks:
+                    lane.cancelled_tasks.add(task)
+                    task.cancel()
+            lane.settle()
+        if not found and pending:
+            self._pending_stops[job_id] = reason
+        return found
+
+    def clear_pending_stop(self, job_id: str) -> None:
+        self._pending_stops.pop(job_id, None)
+
+    def stats(self) -> SchedulerStats:
+        now = time.monotonic()
+        uptime = now - self._started_at if self._started_at else 0.0
+        return SchedulerStats(
+            workers=self.worker_count,
+            busy_workers=self._busy,
+            utilization=round(self._busy_seconds / (uptime * self.worker_count), 4) if uptime else 0.0,
+            queue_depth=sum(lane.queue.qsize() for lane in self._lanes),
+            queue_capacity_per_job=self.queue_size,
+            active_jobs=len(self._lanes),
+            items_processed=self.items_processed,
+        )
+
+    async def _enqueue(self, lane: _JobLane, company: Any) -> bool:
+        # False once the lane failed or was stopped, so the producer stops reading its input.
+        if not lane.accepting:
+            return False
+        await lane.queue.put(company)
+        self._work_available.set()
+        return True
+
+    async def _next_item(self) -> tuple[_JobLane, Any]:
+        while True:
+            # Round-robin: every pick rotates the lane to the back, so each active job gets a turn.
+            for _ in range(len(self._lanes)):
+                lane = self._lanes[0]
+                self._lanes.rotate(-1)
+                if not lane.queue.empty():
+                    return lane, lane.queue.get_nowait()
+            self._work_available.clear()
+            await self._work_available.wait()
+
+    async def _worker(self) -> None:
+        while True:
+            lane, company = await self._next_item()
+            if not lane.accepting:
+                # Queued just before the lane was stopped.
+                lane.settle()
+                continue
+            lane.in_flight += 1
+            self._busy += 1
+            started = time.monotonic()
+            # Each item runs in its own task so cancel_job can cancel it without killing the worker.
+            task = asyncio.ensure_future(lane.handler(company))
+            lane.tasks.add(task)
+            try:
+                await task
+            except asyncio.CancelledError:
+                # Only the item was cancelled (by cancel_job): the worker carries on with the next one.
+                if task not in lane.cancelled_tasks:
+                    raise
+            except Exception as exc:  # a handler failure fails its job, not the worker
+                lane.settle(exc)
+            finally:
+                lane.tasks.discard(task)
+                lane.cancelled_tasks.discard(task)
+                self._busy -= 1
+                self._busy_seconds += time.monotonic() - started
+                lane.in_flight -= 1
+                self.items_processed += 1
+                lane.settle()
+
+
+@lru_cache
+def get_job_scheduler() -> JobScheduler:
+    settings = get_settings()
+    # Workers only hold items; the concurrency limiter decides how many run, so allow up to its ceiling.
+    workers = settings.scheduler_workers or concurrency_bounds(settings)[1]
+    return JobScheduler(workers=workers, queue_size=settings.batch_size)
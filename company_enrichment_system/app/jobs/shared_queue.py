@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import uuid
+from collections import defaultdict
+from functools import partial
+from typing import Callable
+
+from app.config import Settings
+from app.jobs.job_manager import SharedJobManager
+from app.jobs.processor import JobProcessor
+from app.jobs.scheduler import JobScheduler
+
+# How many poll cycles pass between sweeps for uploads whose process died mid-parse.
+STALE_INGEST_SWEEP_EVERY_POLLS = 20
+
+
+class _ClaimedBatch:
+    # Claimed items of one job not yet handed back to the puller's outstanding count.
+    __slots__ = ('unreleased',)
+
+    def __init__(self, size: int) -> None:
+        self.unreleased = size
+
+
+class SharedWorkPuller:
+    def __init__(
+        self,
+        settings: Settings,
+        manager: SharedJobManager,
+        scheduler: JobScheduler,
+        processor_factory: Callable[[], JobProcessor],
+    ) -> None:
+        self.settings = settings
+        self.manager = manager
+        self.scheduler = scheduler
+        self.processor_factory = processor_factory
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        # Claim at most two rounds of work ahead of the local workers so leases don't lapse in the queue.
+        self.max_outstanding = scheduler.worker_count * 2
+        self._outstanding = 0
+        self._capacity_freed = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [task for task in [self._task, *self._batches] if task is not None]
+        self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self) -> None:
+        processor = self.processor_factory()
+        store = self.manager.store
+        polls = 0
+        await processor.http_clients.start()
+        while True:
+            room = self.max_outstanding - self._outstanding
+            if room <= 0:
+                self._capacity_freed.clear()
+                await self._capacity_freed.wait()
+                continue
+
+            polls += 1
+            if polls % STALE_INGEST_SWEEP_EVERY_POLLS == 0:
+                await asyncio.to_thread(store.finalize_stale_ingests, self.settings.shared_claim_lease_seconds)
+                await asyncio.to_thread(store.stop_limited_jobs)
+
+            claimed = await asyncio.to_thread(
+                store.claim_inputs,
+                self.worker_id,
+                min(room, self.settings.shared_claim_batch_size),
+                self.settings.shared_claim_lease_seconds,
+            )
+            if not claimed:
+                await asyncio.sleep(self.settings.shared_poll_interval_seconds)
+                continue
+
+            by_job: dict[str, list[tuple[int, str]]] = defaultdict(list)
+            for job_id, position, company in claimed:
+                by_job[job_id].append((position, company))
+            for job_id, items in by_job.items():
+                self._outstanding += len(items)
+                batch = asyncio.create_task(self._run_batch(processor, job_id, items))
+                self._batches.add(batch)
+                batch.add_done_callback(self._batches.discard)
+
+    async def _run_batch(
+        self,
+        processor: JobProcessor,
+        job_id: str,
+        items: list[tuple[int, str]],
+    ) -> None:
+        batch = _ClaimedBatch(len(items))
+        try:
+            await self.scheduler.run_job(job_id, items, partial(self._process_item, processor, job_id, batch))
+        except Exception:  # unfinished items keep their claim until the lease expires, then get retried
+            pass
+        finally:
+            # Items the scheduler dropped (a stopped or failed job's queued and unfed work, or a
+            # task cancelled before it ran) never reach _process_item; release them here.
+            self._release(batch, batch.unreleased)
+
+    async def _process_item(
+        self,
+        processor: JobProcessor,
+        job_id: str,
+        batch: _ClaimedBatch,
+        item: tuple[int, str],
+    ) -> None:
+        try:
+            await processor.process_claimed(job_id, item)
+        finally:
+            self._release(batch, 1)
+
+    def _release(self, batch: _ClaimedBatch, count: int) -> None:
+        # Clamped: an item still running when its batch was given up (puller stop) is released once.
+        count = min(count, batch.unreleased)
+        if count > 0:
+            batch.unreleased -= count
+            self._outstanding -= count
+            self._capacity_freed.set()
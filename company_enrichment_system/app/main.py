@@ -1,11 +1,51 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 
 from app.config import get_settings
+from app.jobs.scheduler import get_job_scheduler
+from app.jobs.job_manager import SharedJobManager
+from app.jobs.shared_queue import SharedWorkPuller
+from app.routers.jobs import get_job_processor, job_manager, resume_interrupted_jobs
 from app.routers.jobs import router as jobs_router
+from app.routers.metrics import router as metrics_router
+from app.routers.stats import router as stats_router
+from app.services.cache import get_enrichment_cache
+from app.services.candidate_stats import get_candidate_stats
+from app.services.dns_resolver import get_dns_resolver
+from app.services.http_client import get_http_clients
 
 settings = get_settings()
-app = FastAPI(title=settings.app_name, version=settings.app_version)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    http_clients = get_http_clients()
+    await http_clients.start()
+    scheduler = get_job_scheduler()
+    await scheduler.start()
+    puller: SharedWorkPuller | None = None
+    if isinstance(job_manager, SharedJobManager):
+        puller = SharedWorkPuller(settings, job_manager, scheduler, get_job_processor)
+        await puller.start()
+    else:
+        await resume_interrupted_jobs()
+    yield
+    if puller is not None:
+        await puller.stop()
+    await scheduler.stop()
+    await job_manager.close()
+    await http_clients.close()
+    get_enrichment_cache().close()
+    get_dns_resolver().close()
+    get_candidate_stats().save()
+
+
+app = FastAPI(title=settings.app_name, version=settings.app_version, lifespan=lifespan)
 app.include_router(jobs_router)
+app.include_router(stats_router)
+app.include_router(metrics_router)
 
 
 @app.get('/health')
@@ -11,6 +11,15 @@ class JobStatus(str, Enum):
     PROCESSING = 'PROCESSING'
     COMPLETED = 'COMPLETED'
     FAILED = 'FAILED'
+    # Stopped by DELETE /job/{id}
+    CANCELLED = 'CANCELLED'
+    # Stopped by its deadline or paid-call budget; the results so far are kept
+    PARTIAL = 'PARTIAL'
+
+
+class ExportFormat(str, Enum):
+    CSV = 'csv'
+    NDJSON = 'ndjson'
 
 
 class CompanyResult(BaseModel):
@@ -23,43 +32,132 @@ class CompanyResult(BaseModel):
     email_found: bool = False
     source: str | None = None
     status: str = 'SUCCESS'
+    # Unix time of the lookups behind this row (the older one when there were two)
+    enriched_at: float | None = None
 
 
 class JobMetadata(BaseModel):
     job_id: str
     status: JobStatus = JobStatus.PENDING
     total: int
+    ingest_complete: bool = True
     processed: int = 0
     success_count: int = 0
     failure_count: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    coalesced_lookups: int = 0
+    stage_failures: int = 0
+    paid_calls: int = 0
+    # Optional per-job limits: unix time after which the job stops, and paid provider calls allowed
+    deadline_at: float | None = None
+    max_paid_calls: int | None = None
+    # 'cancelled', 'deadline' or 'budget' once the job was stopped early
+    stop_reason: str | None = None
+    # Incremental re-enrichment: the job whose rows were reused (None when a results file was
+    # uploaded instead), and how the input split between carried-over, re-looked-up and new rows
+    previous_job_id: str | None = None
+    reused_count: int = 0
+    refreshed_count: int = 0
+    new_count: int = 0
     error: str | None = None
 
 
-class JobRecord(BaseModel):
-    metadata: JobMetadata
-    results: list[CompanyResult] = Field(default_factory=list)
-
-
 class UploadResponse(BaseModel):
     job_id: str
     total: int
+    ingest_complete: bool = True
     status: JobStatus
+    deadline_at: float | None = None
+    max_paid_calls: int | None = None
+    previous_job_id: str | None = None
 
 
 class JobStatusResponse(BaseModel):
     job_id: str
     status: JobStatus
     total: int
+    ingest_complete: bool = True
     processed: int
     success_count: int
     failure_count: int
+    cache_hits: int = 0
+    cache_misses: int = 0
+    coalesced_lookups: int = 0
+    # Companies that failed because a provider stage ran out of retries or its circuit was open
+    stage_failures: int = 0
+    # Current circuit breaker state per provider: closed, open or half_open
+    circuit_breakers: dict[str, str] = Field(default_factory=dict)
+    paid_calls: int = 0
+    deadline_at: float | None = None
+    max_paid_calls: int | None = None
+    stop_reason: str | None = None
+    previous_job_id: str | None = None
+    reused_count: int = 0
+    refreshed_count: int = 0
+    new_count: int = 0
     error: str | None = None
 
 
+class JobProgressEvent(BaseModel):
+    job_id: str
+    status: JobStatus
+    total: int
+    ingest_complete: bool
+    processed: int
+    success_count: int
+    failure_count: int
+    stop_reason: str | None = None
+    error: str | None = None
+
+
+class TraceSpan(BaseModel):
+    stage: str
+    # Milliseconds since the company started (including its wait for a concurrency slot)
+    start_ms: float
+    duration_ms: float
+    outcome: str
+
+
+class CompanyProfile(BaseModel):
+    company: str
+    status: str
+    duration_ms: float
+    # Backoff sleeps before a provider call or the whole company was tried again
+    retries: int
+    stage_ms: dict[str, float]
+    spans: list[TraceSpan]
+    dropped_spans: int = 0
+
+
+class StageProfile(BaseModel):
+    stage: str
+    calls: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+
+
+class JobProfileResponse(BaseModel):
+    job_id: str
+    sample_rate: float
+    companies_seen: int
+    companies_traced: int
+    avg_company_ms: float
+    # Summed over the traced companies; concurrent spans (parallel probes) overlap
+    stages: list[StageProfile]
+    slowest: list[CompanyProfile]
+
+
 class DomainLookupResult(BaseModel):
     website_found: bool
     website_url: str | None = None
     source: str | None = None
+    # Contacts read from the website itself (PAGE_CONTACTS_ENABLED)
+    phone: str | None = None
+    email: str | None = None
+    # Unix time of the lookup; cached copies keep it, so reused answers age correctly
+    checked_at: float | None = None
 
 
 class ContactLookupResult(BaseModel):
@@ -68,8 +166,126 @@ class ContactLookupResult(BaseModel):
     phone_found: bool = False
     email_found: bool = False
     source: str | None = None
+    checked_at: float | None = None
 
 
 class SearchCandidate(BaseModel):
     website: str | None = None
     metadata: dict[str, Any] = Field(default_factory=dict)
+
+
+class DnsResolverStats(BaseModel):
+    lookups: int
+    cache_hits: int
+    resolved: int
+    nxdomain: int
+    errors: int
+    http_probes_skipped: int
+    cache_size: int
+
+
+class RateLimiterStats(BaseModel):
+    name: str
+    rate_per_second: float
+    effective_rate_per_second: float
+    burst: int
+    waits: int
+    delayed_waits: int
+    total_wait_seconds: float
+    avg_wait_seconds: float
+    max_wait_seconds: float
+    throttled: int
+
+
+class SchedulerStats(BaseModel):
+    workers: int
+    busy_workers: int
+    utilization: float
+    queue_depth: int
+    queue_capacity_per_job: int
+    active_jobs: int
+    items_processed: int
+
+
+class ConcurrencyStats(BaseModel):
+    limit: int
+    floor: int
+    ceiling: int
+    in_flight: int
+    waiting: int
+    increases: int
+    decreases: int
+    window_latency_ms: float
+    long_latency_ms: float
+    last_overload_ratio: float
+
+
+class CircuitBreakerStats(BaseModel):
+    name: str
+    state: str
+    window_calls: int
+    window_failure_rate: float
+    times_opened: int
+    rejected_calls: int
+
+
+class WebsiteProbeStats(BaseModel):
+    probes: int
+    requests: int
+    head_requests: int
+    get_fallbacks: int
+    redirects_followed: int
+    redirect_limit_hits: int
+    header_bytes: int
+    body_bytes: int
+    avg_bytes_per_probe: float
+    avg_latency_ms: float
+    max_latency_ms: float
+    # Domain-guess lookups, and HTTP probes they sent on average
+    lookups: int
+    avg_probes_per_lookup: float
+
+
+class CandidatePatternStats(BaseModel):
+    tld: str
+    attempts: int
+    hits: int
+    hit_rate: float
+    pruned: bool
+
+
+class CandidateOrderingStats(BaseModel):
+    enabled: bool
+    # True until every TLD has enough samples; the default order is used meanwhile
+    learning: bool
+    shapes: int
+    plans: int
+    candidates_pruned: int
+    candidates_explored: int
+    patterns: list[CandidatePatternStats]
+    # How lookups ended: the TLD that answered, 'search_api' or 'not_found'
+    outcomes: dict[str, int]
+
+
+class HttpPoolStats(BaseModel):
+    name: str
+    http2: bool
+    max_connections: int
+    per_host_limit: int
+    requests: int
+    active_requests: int
+    per_host_waits: int
+    hosts_in_use: int
+    open_connections: int
+    idle_connections: int
+
+
+class ServiceStatsResponse(BaseModel):
+    dns: DnsResolverStats | None = None
+    rate_limiters: list[RateLimiterStats] = Field(default_factory=list)
+    scheduler: SchedulerStats | None = None
+    concurrency: ConcurrencyStats | None = None
+    website_probes: WebsiteProbeStats | None = None
+    candidate_ordering: CandidateOrderingStats | None = None
+    http_pools: list[HttpPoolStats] = Field(default_factory=list)
+    circuit_breakers: list[CircuitBreakerStats] = Field(default_factory=list)
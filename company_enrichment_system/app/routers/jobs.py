@@ -1,30 +1,137 @@
 from __future__ import annotations
 
 import asyncio
+import time
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, UploadFile
 from fastapi.responses import StreamingResponse
 
 from app.config import Settings, get_settings
-from app.jobs.job_manager import JobManager
-from app.jobs.processor import JobProcessor
-from app.models import JobStatusResponse, UploadResponse
-from app.utils.file_loader import load_company_names
+from app.jobs.events import iter_job_events
+from app.jobs.job_manager import TERMINAL_STATUSES, JobManager, SharedJobManager
+from app.jobs.job_store import SqliteJobStore
+from app.jobs.processor import STOP_CANCELLED, JobProcessor
+from app.jobs.reuse import PreviousResults, read_previous_results
+from app.jobs.scheduler import get_job_scheduler
+from app.models import ExportFormat, JobProfileResponse, JobStatus, JobStatusResponse, UploadResponse
+from app.services.cache import get_enrichment_cache
+from app.services.candidate_stats import get_candidate_stats
+from app.services.concurrency import get_concurrency_limiter
+from app.services.dns_resolver import get_dns_resolver
+from app.services.http_client import get_http_clients
+from app.services.profiler import get_job_profiler
+from app.services.rate_limiter import get_rate_limiter_registry
+from app.services.resilience import get_circuit_breakers
+from app.services.singleflight import get_lookup_singleflight
+from app.services.website_service import get_probe_counters
+from app.utils.file_loader import open_company_name_stream
 
 router = APIRouter()
-job_manager = JobManager()
 
 
-def get_job_processor(settings: Settings = Depends(get_settings)) -> JobProcessor:
-    return JobProcessor(settings=settings, manager=job_manager)
+def _build_job_manager(settings: Settings) -> JobManager:
+    store = SqliteJobStore(settings.job_store_path) if settings.job_store_path else None
+    if settings.shared_job_queue:
+        if store is None:
+            raise ValueError('SHARED_JOB_QUEUE requires JOB_STORE_PATH to point at a file all workers can reach')
+        return SharedJobManager(
+            store=store,
+            flush_interval_seconds=settings.job_store_flush_interval_seconds,
+            flush_batch_size=settings.job_store_flush_batch_size,
+        )
+    return JobManager(
+        store=store,
+        flush_interval_seconds=settings.job_store_flush_interval_seconds,
+        flush_batch_size=settings.job_store_flush_batch_size,
+    )
+
+
+job_manager = _build_job_manager(get_settings())
+
+
+def get_job_processor() -> JobProcessor:
+    return JobProcessor(
+        settings=get_settings(),
+        manager=job_manager,
+        cache=get_enrichment_cache(),
+        dns_resolver=get_dns_resolver(),
+        rate_limiters=get_rate_limiter_registry(),
+        scheduler=get_job_scheduler(),
+        probe_counters=get_probe_counters(),
+        http_clients=get_http_clients(),
+        singleflight=get_lookup_singleflight(),
+        concurrency_limiter=get_concurrency_limiter(),
+        breakers=get_circuit_breakers(),
+        candidate_stats=get_candidate_stats(),
+        profiler=get_job_profiler(),
+    )
+
+
+async def resume_interrupted_jobs() -> None:
+    for job_id in await job_manager.restore():
+        processor = get_job_processor()
+        asyncio.create_task(processor.start(job_id, job_manager.iter_unprocessed_inputs(job_id)))
 
 
 @router.post('/upload', response_model=UploadResponse)
-async def upload_file(file: UploadFile, processor: JobProcessor = Depends(get_job_processor)) -> UploadResponse:
-    company_names = await load_company_names(file)
-    metadata = await job_manager.create_job(company_names)
-    asyncio.create_task(processor.start(metadata.job_id, company_names))
-    return UploadResponse(job_id=metadata.job_id, total=metadata.total, status=metadata.status)
+async def upload_file(
+    file: UploadFile,
+    deadline_seconds: float | None = Form(default=None, gt=0),
+    max_paid_calls: int | None = Form(default=None, ge=0),
+    previous_job_id: str | None = Form(default=None),
+    previous_results: UploadFile | None = File(default=None),
+    max_age_seconds: float | None = Form(default=None, gt=0),
+    processor: JobProcessor = Depends(get_job_processor),
+    settings: Settings = Depends(get_settings),
+) -> UploadResponse:
+    company_names = await open_company_name_stream(file)
+    previous = await _load_previous_results(
+        previous_job_id,
+        previous_results,
+        max_age_seconds or settings.reuse_max_age_seconds,
+    )
+    metadata = await job_manager.create_job(
+        deadline_at=time.time() + deadline_seconds if deadline_seconds is not None else None,
+        max_paid_calls=max_paid_calls,
+        previous_job_id=previous_job_id,
+    )
+    if isinstance(job_manager, SharedJobManager):
+        asyncio.create_task(job_manager.ingest(metadata.job_id, company_names, previous))
+    else:
+        asyncio.create_task(processor.start(metadata.job_id, company_names, previous))
+    return UploadResponse(
+        job_id=metadata.job_id,
+        total=metadata.total,
+        ingest_complete=metadata.ingest_complete,
+        status=metadata.status,
+        deadline_at=metadata.deadline_at,
+        max_paid_calls=metadata.max_paid_calls,
+        previous_job_id=metadata.previous_job_id,
+    )
+
+
+async def _load_previous_results(
+    previous_job_id: str | None,
+    previous_results: UploadFile | None,
+    max_age_seconds: float,
+) -> PreviousResults | None:
+    if previous_job_id and previous_results is not None:
+        raise HTTPException(status_code=400, detail='Pass previous_job_id or previous_results, not both')
+    if previous_job_id:
+        results = await job_manager.load_results(previous_job_id)
+        if results is None:
+            raise HTTPException(status_code=404, detail='Previous job not found')
+    elif previous_results is not None:
+        try:
+            results = await asyncio.to_thread(
+                read_previous_results, previous_results.file, previous_results.filename or ''
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from None
+    else:
+        return None
+    # Indexing a large previous run takes a moment; keep it off the event loop.
+    return await asyncio.to_thread(PreviousResults, results, max_age_seconds)
 
 
 @router.get('/job/{job_id}', response_model=JobStatusResponse)
@@ -37,23 +144,108 @@ async def get_job_status(job_id: str) -> JobStatusResponse:
         job_id=m.job_id,
         status=m.status,
         total=m.total,
+        ingest_complete=m.ingest_complete,
         processed=m.processed,
         success_count=m.success_count,
         failure_count=m.failure_count,
+        cache_hits=m.cache_hits,
+        cache_misses=m.cache_misses,
+        coalesced_lookups=m.coalesced_lookups,
+        stage_failures=m.stage_failures,
+        paid_calls=m.paid_calls,
+        deadline_at=m.deadline_at,
+        max_paid_calls=m.max_paid_calls,
+        stop_reason=m.stop_reason,
+        previous_job_id=m.previous_job_id,
+        reused_count=m.reused_count,
+        refreshed_count=m.refreshed_count,
+        new_count=m.new_count,
+        circuit_breakers=get_circuit_breakers().states(),
         error=m.error,
     )
 
 
+@router.delete('/job/{job_id}', response_model=JobStatusResponse)
+async def cancel_job(job_id: str) -> JobStatusResponse:
+    job = await job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Job not found')
+    if job.metadata.status in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f'Job already {job.metadata.status.value}')
+    # Locally this stops feeding the job and cancels its in-flight companies. With the shared
+    # queue the store status below stops further claims; other workers finish what they hold.
+    shared = isinstance(job_manager, SharedJobManager)
+    get_job_scheduler().cancel_job(job_id, STOP_CANCELLED, pending=not shared)
+    await job_manager.finish(job_id, JobStatus.CANCELLED, stop_reason=STOP_CANCELLED)
+    return await get_job_status(job_id)
+
+
+@router.get('/job/{job_id}/events')
+async def stream_job_events(
+    job_id: str,
+    rows: bool = False,
+    offset: int = Query(default=0, ge=0),
+    last_event_id: str | None = Header(default=None),
+    settings: Settings = Depends(get_settings),
+) -> StreamingResponse:
+    if not await job_manager.get_job(job_id):
+        raise HTTPException(status_code=404, detail='Job not found')
+    # EventSource reconnects send the id of the last `rows` event, which is the next offset.
+    if last_event_id is not None and last_event_id.isdigit():
+        offset = int(last_event_id)
+    return StreamingResponse(
+        iter_job_events(
+            job_manager,
+            job_id,
+            include_rows=rows,
+            offset=offset,
+            min_interval_seconds=settings.job_events_min_interval_seconds,
+            heartbeat_seconds=settings.job_events_heartbeat_seconds,
+            max_rows=settings.job_events_max_rows,
+        ),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get('/job/{job_id}/profile', response_model=JobProfileResponse)
+async def get_job_profile(job_id: str, top: int = Query(default=10, ge=1)) -> JobProfileResponse:
+    if not await job_manager.get_job(job_id):
+        raise HTTPException(status_code=404, detail='Job not found')
+    # Traces live in the process that ran the companies; with SHARED_JOB_QUEUE=true that is only
+    # the share of the job this worker claimed.
+    profile = get_job_profiler().get(job_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail='No profile for this job; set PROFILING_ENABLED=true before it runs')
+    return profile.report(job_id, top)
+
+
 @router.get('/download/{job_id}')
-async def download_results(job_id: str) -> StreamingResponse:
+async def download_results(
+    job_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int | None = Query(default=None, ge=1),
+    format: ExportFormat = ExportFormat.CSV,
+) -> StreamingResponse:
     job = await job_manager.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail='Job not found')
 
-    csv_bytes = await job_manager.to_csv_bytes(job_id)
-    filename = f'company_enrichment_{job_id}.csv'
+    # The window is fixed when the request arrives; clients tail a running job by calling
+    # again with offset=X-Next-Offset.
+    stop = job.metadata.processed
+    if limit is not None:
+        stop = min(stop, offset + limit)
+    start = min(offset, stop)
+
+    extension, media_type = ('ndjson', 'application/x-ndjson') if format == ExportFormat.NDJSON else ('csv', 'text/csv')
+    filename = f'company_enrichment_{job_id}.{extension}'
     return StreamingResponse(
-        iter([csv_bytes]),
-        media_type='text/csv',
-        headers={'Content-Disposition': f'attachment; filename={filename}'},
+        job_manager.iter_result_chunks(job_id, start, stop, format),
+        media_type=media_type,
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Next-Offset': str(stop),
+            'X-Job-Status': job.metadata.status.value,
+        },
     )
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.jobs.scheduler import get_job_scheduler
+from app.services.candidate_stats import ALL_SHAPES, CANDIDATE_TLDS, get_candidate_stats
+from app.services.http_client import get_http_clients
+from app.utils.metrics import (
+    CONTENT_TYPE,
+    DOMAIN_CANDIDATE_HIT_RATE,
+    HTTP_POOL_ACTIVE_REQUESTS,
+    HTTP_POOL_OPEN_CONNECTIONS,
+    REGISTRY,
+    SCHEDULER_ACTIVE_JOBS,
+    SCHEDULER_BUSY_WORKERS,
+    SCHEDULER_QUEUE_DEPTH,
+)
+
+router = APIRouter()
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    # Pipeline gauges are sampled at scrape time; everything else is updated in the hot paths.
+    scheduler = get_job_scheduler().stats()
+    SCHEDULER_QUEUE_DEPTH.set(scheduler.queue_depth)
+    SCHEDULER_BUSY_WORKERS.set(scheduler.busy_workers)
+    SCHEDULER_ACTIVE_JOBS.set(scheduler.active_jobs)
+    for pool in get_http_clients().stats():
+        HTTP_POOL_ACTIVE_REQUESTS.labels(pool.name).set(pool.active_requests)
+        HTTP_POOL_OPEN_CONNECTIONS.labels(pool.name).set(pool.open_connections)
+    candidate_stats = get_candidate_stats()
+    for tld in CANDIDATE_TLDS:
+        DOMAIN_CANDIDATE_HIT_RATE.labels(tld).set(round(candidate_stats.hit_rate(ALL_SHAPES, tld), 4))
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
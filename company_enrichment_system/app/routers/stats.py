@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.config import Settings, get_settings
+from app.jobs.scheduler import get_job_scheduler
+from app.models import ServiceStatsResponse
+from app.services.candidate_stats import get_candidate_stats
+from app.services.concurrency import get_concurrency_limiter
+from app.services.dns_resolver import get_dns_resolver
+from app.services.http_client import get_http_clients
+from app.services.rate_limiter import get_rate_limiter_registry
+from app.services.resilience import get_circuit_breakers
+from app.services.website_service import get_probe_counters
+
+router = APIRouter()
+
+
+@router.get('/stats', response_model=ServiceStatsResponse)
+async def get_service_stats(settings: Settings = Depends(get_settings)) -> ServiceStatsResponse:
+    return ServiceStatsResponse(
+        dns=get_dns_resolver().stats() if settings.dns_prefilter_enabled else None,
+        rate_limiters=get_rate_limiter_registry().stats(),
+        scheduler=get_job_scheduler().stats(),
+        concurrency=get_concurrency_limiter().stats(),
+        website_probes=get_probe_counters().stats(),
+        candidate_ordering=get_candidate_stats().stats(),
+        http_pools=get_http_clients().stats(),
+        circuit_breakers=get_circuit_breakers().stats(),
+    )
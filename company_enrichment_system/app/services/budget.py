@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import Callable
+
+
+class BudgetExhaustedError(Exception):
+    def __init__(self, budget: CallBudget) -> None:
+        super().__init__(f'paid call budget of {budget.limit} exhausted')
+        self.budget = budget
+
+
+class CallBudget:
+    # Paid provider calls (SerpApi, search API, Google Places) allowed for one job. `limit=None`
+    # only counts. The first call past the limit fires `on_exhausted` once and every call past
+    # it raises BudgetExhaustedError before any request is sent.
+
+    def __init__(self, limit: int | None = None, on_exhausted: Callable[[], None] | None = None) -> None:
+        self.limit = limit
+        self.used = 0
+        self.on_exhausted = on_exhausted
+        self.exhausted = False
+
+    def charge(self) -> None:
+        if self.limit is not None and self.used >= self.limit:
+            if not self.exhausted:
+                self.exhausted = True
+                if self.on_exhausted is not None:
+                    self.on_exhausted()
+            raise BudgetExhaustedError(self)
+        self.used += 1
+
+
+class PaidCallTally:
+    # Per-company view of a job's budget, so the processor can add the company's calls to the
+    # job's counters once it is done.
+
+    __slots__ = ('budget', 'calls')
+
+    def __init__(self, budget: CallBudget) -> None:
+        self.budget = budget
+        self.calls = 0
+
+    def charge(self) -> None:
+        self.budget.charge()
+        self.calls += 1
+
+
+current_paid_calls: ContextVar[PaidCallTally | None] = ContextVar('current_paid_calls', default=None)
+
+
+def charge_paid_call() -> None:
+    tally = current_paid_calls.get()
+    if tally is not None:
+        tally.charge()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+from app.config import Settings, get_settings
+from app.models import ContactLookupResult, DomainLookupResult
+from app.utils.validators import canonicalize_company_name
+
+DOMAIN_KIND = 'domain'
+CONTACT_KIND = 'contact'
+
+# Eviction scans the table, so it only runs every N writes; the cache can overshoot
+# cache_max_entries by at most this many rows in between.
+EVICT_EVERY_WRITES = 500
+
+
+class EnrichmentCache:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._writes_since_evict = 0
+
+    async def get_domain(self, company: str) -> DomainLookupResult | None:
+        payload = await asyncio.to_thread(self._get, DOMAIN_KIND, canonicalize_company_name(company))
+        if payload is None:
+            return None
+        return DomainLookupResult.model_validate_json(payload)
+
+    async def set_domain(self, company: str, result: DomainLookupResult) -> None:
+        ttl = self.settings.cache_domain_ttl_seconds if result.website_found else self.settings.cache_negative_ttl_seconds
+        await asyncio.to_thread(
+            self._set, DOMAIN_KIND, canonicalize_company_name(company), result.model_dump_json(), ttl
+        )
+
+    async def get_contact(self, company: str) -> ContactLookupResult | None:
+        payload = await asyncio.to_thread(self._get, CONTACT_KIND, canonicalize_company_name(company))
+        if payload is None:
+            return None
+        return ContactLookupResult.model_validate_json(payload)
+
+    async def set_contact(self, company: str, result: ContactLookupResult) -> None:
+        # A missing API key is a deployment issue, not an answer about the company.
+        if result.source == 'not_configured':
+            return
+        found = result.phone_found or result.email_found
+        ttl = self.settings.cache_contact_ttl_seconds if found else self.settings.cache_negative_ttl_seconds
+        await asyncio.to_thread(
+            self._set, CONTACT_KIND, canonicalize_company_name(company), result.model_dump_json(), ttl
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.settings.cache_path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS lookup_cache ('
+                'kind TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, stored_at REAL NOT NULL, PRIMARY KEY (kind, key))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_lookup_cache_stored_at ON lookup_cache (stored_at)')
+            self._conn = conn
+            self._evict(conn)
+        return self._conn
+
+    def _get(self, kind: str, key: str) -> str | None:
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT payload FROM lookup_cache WHERE kind = ? AND key = ? AND expires_at > ?',
+                (kind, key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, kind: str, key: str, payload: str, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO lookup_cache (kind, key, payload, expires_at, stored_at) VALUES (?, ?, ?, ?, ?)',
+                (kind, key, payload, now + ttl_seconds, now),
+            )
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= EVICT_EVERY_WRITES:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        self._writes_since_evict = 0
+        conn.execute('DELETE FROM lookup_cache WHERE expires_at <= ?', (time.time(),))
+        (count,) = conn.execute('SELECT COUNT(*) FROM lookup_cache').fetchone()
+        overflow = count - self.settings.cache_max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM lookup_cache WHERE rowid IN (SELECT rowid FROM lookup_cache ORDER BY stored_at LIMIT ?)',
+                (overflow,),
+            )
+
+
+@lru_cache
+def get_enrichment_cache() -> EnrichmentCache:
+    return EnrichmentCache(get_settings())
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves still merge, but without a cross-process lock
+    fcntl = None
+
+from app.config import Settings, get_settings
+from app.models import CandidateOrderingStats, CandidatePatternStats
+
+# Domain-guess candidates in their default preference order.
+CANDIDATE_TLDS = ('.com', '.in', '.co.in')
+OUTCOME_SEARCH = 'search_api'
+OUTCOME_NOT_FOUND = 'not_found'
+ALL_SHAPES = '*'
+_FORMAT_VERSION = 1
+
+
+def name_shape(canonical: str) -> str:
+    # Coarse buckets on purpose: few enough that every shape gathers samples quickly.
+    words = len(canonical.split())
+    slug_length = len(canonical) - canonical.count(' ')
+    length = 'short' if slug_length <= 8 else 'mid' if slug_length <= 16 else 'long'
+    shape = f'w{min(words, 3)}{"+" if words > 3 else ""}-{length}'
+    return shape if canonical.isascii() else f'{shape}-idn'
+
+
+@dataclass
+class CandidatePlan:
+    shape: str
+    # TLDs to probe, most promising first
+    tlds: list[str]
+    pruned: list[str] = field(default_factory=list)
+    explored: list[str] = field(default_factory=list)
+
+
+class CandidateStats:
+    # Which domain guesses actually answer, overall and per name shape, learned from every lookup.
+    # Each (shape, TLD) keeps [attempts, hits]; a shape's hit rate is blended with the overall
+    # rate for that TLD as if the overall rate were `candidate_prior_weight` extra samples.
+    # Until every TLD has `candidate_min_samples` attempts the default order is used unchanged.
+    #
+    # Several processes (uvicorn or CLI workers) may share one file, so a save never overwrites
+    # it: under a file lock, the counts recorded since the last save are added to what is on disk,
+    # and the merged result becomes this process's view too.
+
+    def __init__(self, settings: Settings, path: str | None = None) -> None:
+        self.settings = settings
+        self.path = path
+        self._patterns: dict[str, dict[str, list[int]]] = {}
+        self._outcomes: dict[str, dict[str, int]] = {}
+        # Counts recorded since the last save (only kept when there is a file to save to)
+        self._new_patterns: dict[str, dict[str, list[int]]] = {}
+        self._new_outcomes: dict[str, dict[str, int]] = {}
+        self._rng = random.Random()
+        self._saved_at = time.monotonic()
+        self._write_lock = threading.Lock()
+        self.plans = 0
+        self.candidates_pruned = 0
+        self.candidates_explored = 0
+
+    def plan(self, canonical: str) -> CandidatePlan:
+        shape = name_shape(canonical)
+        self.plans += 1
+        if not self.settings.candidate_ordering_enabled or self.learning:
+            return CandidatePlan(shape, list(CANDIDATE_TLDS))
+        rates = {tld: self.hit_rate(shape, tld) for tld in CANDIDATE_TLDS}
+        # sorted() is stable, so ties keep the default preference order.
+        ordered = sorted(CANDIDATE_TLDS, key=lambda tld: -rates[tld])
+        plan = CandidatePlan(shape, [])
+        for tld in ordered:
+            if rates[tld] >= self.settings.candidate_prune_hit_rate:
+                plan.tlds.append(tld)
+            elif self._rng.random() < self.settings.candidate_explore_rate:
+                # Probe a pruned guess now and then (last), so its rate can recover.
+                plan.explored.append(tld)
+            else:
+                plan.pruned.append(tld)
+        plan.tlds.extend(plan.explored)
+        self.candidates_pruned += len(plan.pruned)
+        self.candidates_explored += len(plan.explored)
+        return plan
+
+    @property
+    def learning(self) -> bool:
+        overall = self._patterns.get(ALL_SHAPES, {})
+        return any(overall.get(tld, (0, 0))[0] < self.settings.candidate_min_samples for tld in CANDIDATE_TLDS)
+
+    def hit_rate(self, shape: str, tld: str) -> float:
+        attempts, hits = self._patterns.get(ALL_SHAPES, {}).get(tld, (0, 0))
+        prior = (hits + 1) / (attempts + 2)
+        if shape == ALL_SHAPES:
+            return prior
+        attempts, hits = self._patterns.get(shape, {}).get(tld, (0, 0))
+        weight = self.settings.candidate_prior_weight
+        return (hits + weight * prior) / (attempts + weight) if attempts + weight else prior
+
+    def record_probe(self, shape: str, tld: str, hit: bool) -> None:
+        for key in (ALL_SHAPES, shape):
+            _add_tally(self._patterns, key, tld, 1, int(hit), self.settings.candidate_max_samples)
+            if self.path:
+                _add_tally(self._new_patterns, key, tld, 1, int(hit))
+
+    def record_outcome(self, shape: str, outcome: str) -> None:
+        # outcome: the TLD that answered, OUTCOME_SEARCH or OUTCOME_NOT_FOUND
+        for key in (ALL_SHAPES, shape):
+            _add_outcome(self._outcomes, key, outcome, 1)
+            if self.path:
+                _add_outcome(self._new_outcomes, key, outcome, 1)
+        if self.path and time.monotonic() - self._saved_at >= self.settings.candidate_stats_save_interval_seconds:
+            self._saved_at = time.monotonic()
+            changes = self._take_changes()
+            future = asyncio.get_running_loop().run_in_executor(None, self._merge_into_file, changes)
+            future.add_done_callback(lambda done: self._apply_saved(changes, done.result()))
+
+    def load(self) -> None:
+        if self.path:
+            self._patterns, self._outcomes = self._read()
+
+    def save(self) -> None:
+        if self.path and (self._new_patterns or self._new_outcomes):
+            changes = self._take_changes()
+            self._apply_saved(changes, self._merge_into_file(changes))
+
+    def stats(self) -> CandidateOrderingStats:
+        overall = self._patterns.get(ALL_SHAPES, {})
+        learning = self.learning
+        patterns = []
+        for tld in CANDIDATE_TLDS:
+            attempts, hits = overall.get(tld, (0, 0))
+            rate = self.hit_rate(ALL_SHAPES, tld)
+            patterns.append(
+                CandidatePatternStats(
+                    tld=tld,
+                    attempts=attempts,
+                    hits=hits,
+                    hit_rate=round(hits / attempts, 4) if attempts else 0.0,
+                    pruned=not learning and rate < self.settings.candidate_prune_hit_rate,
+                )
+            )
+        return CandidateOrderingStats(
+            enabled=self.settings.candidate_ordering_enabled,
+            learning=learning,
+            shapes=len(self._patterns) - int(ALL_SHAPES in self._patterns),
+            plans=self.plans,
+            candidates_pruned=self.candidates_pruned,
+            candidates_explored=self.candidates_explored,
+            patterns=patterns,
+            outcomes=dict(self._outcomes.get(ALL_SHAPES, {})),
+        )
+
+    def _take_changes(self) -> tuple[dict, dict]:
+        changes = (self._new_patterns, self._new_outcomes)
+        self._new_patterns, self._new_outcomes = {}, {}
+        return changes
+
+    def _read(self) -> tuple[dict[str, dict[str, list[int]]], dict[str, dict[str, int]]]:
+        patterns: dict[str, dict[str, list[int]]] = {}
+        outcomes: dict[str, dict[str, int]] = {}
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError):
+            # Missing or damaged: only costs the learned order; the next save writes a good file.
+            return patterns, outcomes
+        if not isinstance(payload, dict) or payload.get('version') != _FORMAT_VERSION:
+            return patterns, outcomes
+        for shape, tallies in (payload.get('patterns') or {}).items():
+            for tld, tally in (tallies or {}).items():
+                if tld in CANDIDATE_TLDS and _is_tally(tally):
+                    patterns.setdefault(shape, {})[tld] = [int(tally[0]), int(tally[1])]
+        for shape, counts in (payload.get('outcomes') or {}).items():
+            for outcome, count in (counts or {}).items():
+                if isinstance(count, int) and count >= 0:
+                    outcomes.setdefault(shape, {})[outcome] = count
+        return patterns, outcomes
+
+    def _merge_into_file(self, changes: tuple[dict, dict]) -> tuple[dict, dict] | None:
+        # Runs in a thread. Returns the merged counts, or None when the file couldn't be written.
+        new_patterns, new_outcomes = changes
+        try:
+            with self._write_lock, _file_lock(f'{self.path}.lock'):
+                patterns, outcomes = self._read()
+                _merge(patterns, outcomes, new_patterns, new_outcomes, self.settings.candidate_max_samples)
+                payload = json.dumps({'version': _FORMAT_VERSION, 'patterns': patterns, 'outcomes': outcomes})
+                # A temporary file of our own, renamed into place: readers never see half a file.
+                directory, name = os.path.split(os.path.abspath(self.path))
+                descriptor, temporary = tempfile.mkstemp(prefix=f'{name}.', suffix='.tmp', dir=directory)
+                try:
+                    with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+                        handle.write(payload)
+                    os.replace(temporary, self.path)
+                except OSError:
+                    with suppress(OSError):
+                        os.unlink(temporary)
+                    raise
+        except OSError:
+            return None
+        return patterns, outcomes
+
+    def _apply_saved(self, changes: tuple[dict, dict], merged: tuple[dict, dict] | None) -> None:
+        # On the event loop (or the caller's thread for save()). Counts recorded while the file
+        # was being written are added on top of the merged result.
+        if merged is None:
+            # Keep the changes for the next save.
+            _merge(self._new_patterns, self._new_outcomes, *changes)
+            return
+        patterns, outcomes = merged
+        _merge(patterns, outcomes, self._new_patterns, self._new_outcomes, self.settings.candidate_max_samples)
+        self._patterns, self._outcomes = patterns, outcomes
+
+
+def _add_tally(
+    patterns: dict[str, dict[str, list[int]]],
+    shape: str,
+    tld: str,
+    attempts: int,
+    hits: int,
+    max_samples: int | None = None,
+) -> None:
+    tally = patterns.setdefault(shape, {}).setdefault(tld, [0, 0])
+    tally[0] += attempts
+    tally[1] += hits
+    while max_samples is not None and tally[0] > max_samples:
+        # Halving keeps the rate but lets newer outcomes move it.
+        tally[0] //= 2
+        tally[1] //= 2
+
+
+def _add_outcome(outcomes: dict[str, dict[str, int]], shape: str, outcome: str, count: int) -> None:
+    counts = outcomes.setdefault(shape, {})
+    counts[outcome] = counts.get(outcome, 0) + count
+
+
+def _merge(
+    patterns: dict[str, dict[str, list[int]]],
+    outcomes: dict[str, dict[str, int]],
+    new_patterns: dict[str, dict[str, list[int]]],
+    new_outcomes: dict[str, dict[str, int]],
+    max_samples: int | None = None,
+) -> None:
+    for shape, tallies in new_patterns.items():
+        for tld, (attempts, hits) in tallies.items():
+            _add_tally(patterns, shape, tld, attempts, hits, max_samples)
+    for shape, counts in new_outcomes.items():
+        for outcome, count in counts.items():
+            _add_outcome(outcomes, shape, outcome, count)
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    # Exclusive across processes for the read-merge-write of a save.
+    with open(path, 'a') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _is_tally(value: object) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) == 2
+        and all(isinstance(number, int) for number in value)
+        and 0 <= value[1] <= value[0]
+    )
+
+
+@lru_cache
+def get_candidate_stats() -> CandidateStats:
+    settings = get_settings()
+    stats = CandidateStats(settings, path=settings.candidate_stats_path)
+    stats.load()
+    return stats
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from functools import lru_cache
+
+from app.config import Settings, get_settings
+from app.models import ConcurrencyStats
+from app.utils.metrics import CONCURRENCY_IN_FLIGHT, CONCURRENCY_LIMIT, stage_outcome_listener
+
+# Stage outcomes that mean a provider or the network is struggling, as opposed to a domain that
+# simply doesn't exist.
+OVERLOAD_OUTCOMES = frozenset({'timeout', 'throttled', 'http_5xx'})
+MIN_WINDOW_SAMPLES = 10
+LONG_LATENCY_ALPHA = 0.05
+
+
+def concurrency_bounds(settings: Settings) -> tuple[int, int]:
+    if not settings.adaptive_concurrency_enabled:
+        return settings.max_concurrency, settings.max_concurrency
+    ceiling = max(settings.concurrency_ceiling, settings.concurrency_floor)
+    return settings.concurrency_floor, ceiling
+
+
+class _Lease:
+    __slots__ = ('limiter', 'started', '_token')
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter) -> None:
+        self.limiter = limiter
+
+    async def __aenter__(self) -> _Lease:
+        await self.limiter.acquire()
+        self.started = time.perf_counter()
+        # Stage calls made while the slot is held (HTTP probes, provider APIs) report their outcome.
+        self._token = stage_outcome_listener.set(self.limiter.record_outcome)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        stage_outcome_listener.reset(self._token)
+        cancelled = exc_type is not None and issubclass(exc_type, asyncio.CancelledError)
+        self.limiter.release(None if cancelled else time.perf_counter() - self.started)
+
+
+class AdaptiveConcurrencyLimiter:
+    # Caps companies in flight across every job in the process. The limit is re-evaluated once
+    # per window of roughly `limit` completions (about one round trip of work):
+    # - more than overload_threshold of the stage calls in the window ended in a timeout/429/5xx:
+    #   multiply by backoff_ratio
+    # - otherwise scale by the latency gradient (long-run average / window average, times the
+    #   tolerance, clamped to [0.5, 1]) and, if the limit was actually reached, add sqrt(limit)
+    # so a healthy network climbs from tens to hundreds of lookups in a few dozen windows.
+
+    def __init__(
+        self,
+        floor: int,
+        ceiling: int,
+        initial: int | None = None,
+        backoff_ratio: float = 0.7,
+        latency_tolerance: float = 2.0,
+        overload_threshold: float = 0.05,
+    ) -> None:
+        self.floor = max(floor, 1)
+        self.ceiling = max(ceiling, self.floor)
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.overload_threshold = overload_threshold
+        self._limit = float(min(max(initial or self.floor, self.floor), self.ceiling))
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._window_samples = 0
+        self._window_calls = 0
+        self._window_overloaded = 0
+        self._window_latency = 0.0
+        self._window_peak = 0
+        self._long_latency: float | None = None
+        self._short_latency: float | None = None
+        self._last_overload_ratio = 0.0
+        self.increases = 0
+        self.decreases = 0
+        CONCURRENCY_LIMIT.set(int(self._limit))
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def lease(self) -> _Lease:
+        return _Lease(self)
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit and not self._waiters:
+            self._enter()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on.
+                self._leave()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float | None) -> None:
+        self._leave()
+        if latency is not None:
+            self._record(latency)
+
+    def record_outcome(self, outcome: str) -> None:
+        self._window_calls += 1
+        if outcome in OVERLOAD_OUTCOMES:
+            self._window_overloaded += 1
+
+    def stats(self) -> ConcurrencyStats:
+        return ConcurrencyStats(
+            limit=self.limit,
+            floor=self.floor,
+            ceiling=self.ceiling,
+            in_flight=self.in_flight,
+            waiting=len(self._waiters),
+            increases=self.increases,
+            decreases=self.decreases,
+            window_latency_ms=round((self._short_latency or 0.0) * 1000, 2),
+            long_latency_ms=round((self._long_latency or 0.0) * 1000, 2),
+            last_overload_ratio=round(self._last_overload_ratio, 4),
+        )
+
+    def _enter(self) -> None:
+        self.in_flight += 1
+        self._window_peak = max(self._window_peak, self.in_flight)
+        CONCURRENCY_IN_FLIGHT.set(self.in_flight)
+
+    def _leave(self) -> None:
+        self.in_flight -= 1
+        CONCURRENCY_IN_FLIGHT.set(self.in_flight)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._enter()
+                waiter.set_result(None)
+
+    def _record(self, latency: float) -> None:
+        self._window_samples += 1
+        self._window_latency += latency
+        if self._window_samples >= max(self.limit, MIN_WINDOW_SAMPLES):
+            self._end_window()
+
+    def _end_window(self) -> None:
+        samples = self._window_samples
+        short = self._window_latency / samples
+        overload_ratio = self._window_overloaded / self._window_calls if self._window_calls else 0.0
+        saturated = self._window_peak >= 0.8 * self._limit or bool(self._waiters)
+        self._window_samples = self._window_calls = self._window_overloaded = 0
+        self._window_latency = 0.0
+        self._window_peak = self.in_flight
+        self._short_latency = short
+        self._last_overload_ratio = overload_ratio
+
+        if overload_ratio > self.overload_threshold:
+            new_limit = self._limit * self.backoff_ratio
+        else:
+            long = short if self._long_latency is None else self._long_latency
+            gradient = max(0.5, min(1.0, self.latency_tolerance * long / short)) if short > 0 else 1.0
+            new_limit = self._limit * gradient + (math.sqrt(self._limit) if saturated else 0.0)
+            # Only healthy windows move the baseline, so a slow spell can't become the new normal.
+            self._long_latency = short if self._long_latency is None else (
+                self._long_latency + LONG_LATENCY_ALPHA * (short - self._long_latency)
+            )
+
+        new_limit = min(max(new_limit, float(self.floor)), float(self.ceiling))
+        if int(new_limit) > self.limit:
+            self.increases += 1
+        elif int(new_limit) < self.limit:
+            self.decreases += 1
+        self._limit = new_limit
+        CONCURRENCY_LIMIT.set(self.limit)
+        self._wake()
+
+
+def build_concurrency_limiter(settings: Settings) -> AdaptiveConcurrencyLimiter:
+    floor, ceiling = concurrency_bounds(settings)
+    return AdaptiveConcurrencyLimiter(
+        floor,
+        ceiling,
+        initial=settings.max_concurrency,
+        backoff_ratio=settings.concurrency_backoff_ratio,
+        latency_tolerance=settings.concurrency_latency_tolerance,
+        overload_threshold=settings.concurrency_overload_threshold,
+    )
+
+
+@lru_cache
+def get_concurrency_limiter() -> AdaptiveConcurrencyLimiter:
+    return build_concurrency_limiter(get_settings())
@@ -1,25 +1,35 @@
 from __future__ import annotations
 
 import asyncio
+from functools import partial
 
 import httpx
 
 from app.config import Settings
 from app.models import ContactLookupResult
-from app.services.rate_limiter import AsyncRateLimiter
+from app.services.http_client import HttpClients
+from app.services.rate_limiter import PROVIDER_GOOGLE_PLACES, RateLimiterRegistry
+from app.services.resilience import CircuitBreakerRegistry, is_transient
+from app.utils.metrics import StageTimer, error_outcome
 from app.utils.validators import is_valid_email, is_valid_phone
 
 
 class ContactService:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        rate_limiters: RateLimiterRegistry | None = None,
+        breakers: CircuitBreakerRegistry | None = None,
+    ) -> None:
         self.settings = settings
-        self.rate_limiter = AsyncRateLimiter(settings.rate_limit_per_second)
+        self.rate_limiters = rate_limiters or RateLimiterRegistry(settings)
+        self.breakers = breakers or CircuitBreakerRegistry(settings)
 
-    async def lookup_contact(self, client: httpx.AsyncClient, company: str) -> ContactLookupResult:
+    async def lookup_contact(self, clients: HttpClients, company: str) -> ContactLookupResult:
         if not self.settings.google_places_api_key:
             return ContactLookupResult(source='not_configured')
 
-        place = await self._search_place(client, company)
+        place = await self._search_place(clients, company)
         if not place:
             return ContactLookupResult(source='google_places')
 
@@ -37,40 +47,59 @@ class ContactService:
             source='google_places',
         )
 
-    async def _search_place(self, client: httpx.AsyncClient, company: str) -> dict | None:
-        await self.rate_limiter.wait()
+    async def _search_place(self, clients: HttpClients, company: str) -> dict | None:
+        # Each request retries on its own, so a flaky details call doesn't repeat the text search.
+        place_id = await self.breakers.call(PROVIDER_GOOGLE_PLACES, partial(self._text_search, clients, company))
+        if not place_id:
+            return None
+        return await self.breakers.call(PROVIDER_GOOGLE_PLACES, partial(self._place_details, clients, place_id))
+
+    async def _text_search(self, clients: HttpClients, company: str) -> str | None:
+        limiter = self.rate_limiters.get(PROVIDER_GOOGLE_PLACES)
+        await limiter.wait()
         text_search_url = 'https://maps.googleapis.com/maps/api/place/textsearch/json'
-        try:
-            search_resp = await client.get(
-                text_search_url,
-                params={'query': company, 'key': self.settings.google_places_api_key},
-                timeout=self.settings.request_timeout_seconds,
-            )
-            search_resp.raise_for_status()
-            search_json = search_resp.json()
-            results = search_json.get('results', [])
-            if not results:
-                return None
-            place_id = results[0].get('place_id')
-            if not place_id:
+        with StageTimer(PROVIDER_GOOGLE_PLACES) as timer:
+            try:
+                search_resp = await clients.api.get(
+                    text_search_url,
+                    params={'query': company, 'key': self.settings.google_places_api_key},
+                    timeout=self.settings.request_timeout_seconds,
+                )
+                limiter.record_response(search_resp.status_code, search_resp.headers.get('Retry-After'))
+                search_resp.raise_for_status()
+                search_json = search_resp.json()
+                results = search_json.get('results', [])
+                place_id = results[0].get('place_id') if results else None
+                if not place_id:
+                    timer.outcome = 'no_match'
+                return place_id
+            except (httpx.HTTPError, ValueError, KeyError, TypeError, asyncio.TimeoutError) as exc:
+                timer.outcome = error_outcome(exc)
+                if is_transient(exc):
+                    raise
                 return None
-        except (httpx.HTTPError, ValueError, KeyError, TypeError, asyncio.TimeoutError):
-            return None
 
-        await self.rate_limiter.wait()
+    async def _place_details(self, clients: HttpClients, place_id: str) -> dict | None:
+        limiter = self.rate_limiters.get(PROVIDER_GOOGLE_PLACES)
+        await limiter.wait()
         details_url = 'https://maps.googleapis.com/maps/api/place/details/json'
-        try:
-            details_resp = await client.get(
-                details_url,
-                params={
-                    'place_id': place_id,
-                    'fields': 'formatted_phone_number,international_phone_number,email',
-                    'key': self.settings.google_places_api_key,
-                },
-                timeout=self.settings.request_timeout_seconds,
-            )
-            details_resp.raise_for_status()
-            details_json = details_resp.json()
-            return details_json.get('result')
-        except (httpx.HTTPError, ValueError, KeyError, TypeError, asyncio.TimeoutError):
-            return None
+        with StageTimer(PROVIDER_GOOGLE_PLACES) as timer:
+            try:
+                details_resp = await clients.api.get(
+                    details_url,
+                    params={
+                        'place_id': place_id,
+                        'fields': 'formatted_phone_number,international_phone_number,email',
+                        'key': self.settings.google_places_api_key,
+                    },
+                    timeout=self.settings.request_timeout_seconds,
+                )
+                limiter.record_response(details_resp.status_code, details_resp.headers.get('Retry-After'))
+                details_resp.raise_for_status()
+                details_json = details_resp.json()
+                return details_json.get('result')
+            except (httpx.HTTPError, ValueError, KeyError, TypeError, asyncio.TimeoutError) as exc:
+                timer.outcome = error_outcome(exc)
+                if is_transient(exc):
+                    raise
+                return None
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from app.config import Settings, get_settings
+from app.models import DnsResolverStats
+from app.utils.tracing import trace_span
+
+# getaddrinfo errors that mean "this name has no address", as opposed to a resolver hiccup.
+_NOT_FOUND_ERRNOS = {
+    code
+    for code in (getattr(socket, 'EAI_NONAME', None), getattr(socket, 'EAI_NODATA', None))
+    if code is not None
+}
+
+
+class DnsResolver:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        # Created on first use and dropped by close(), so a restarted app gets a fresh pool.
+        self._executor: ThreadPoolExecutor | None = None
+        self._cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self.lookups = 0
+        self.cache_hits = 0
+        self.resolved = 0
+        self.nxdomain = 0
+        self.errors = 0
+        self.http_probes_skipped = 0
+
+    # True/False when DNS gave a definite answer, None when the lookup itself failed.
+    async def resolves(self, host: str) -> bool | None:
+        host = host.lower()
+        cached = self._cache.get(host)
+        if cached is not None:
+            answer, expires_at = cached
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(host)
+                self.cache_hits += 1
+                return answer
+            del self._cache[host]
+
+        self.lookups += 1
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.settings.dns_resolver_threads, thread_name_prefix='dns'
+            )
+        try:
+            with trace_span('dns'):
+                await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, socket.getaddrinfo, host, 443, 0, socket.SOCK_STREAM),
+                    timeout=self.settings.dns_timeout_seconds,
+                )
+        except socket.gaierror as exc:
+            if exc.errno not in _NOT_FOUND_ERRNOS:
+                self.errors += 1
+                return None
+            self.nxdomain += 1
+            self._remember(host, False, self.settings.dns_negative_ttl_seconds)
+            return False
+        except (OSError, asyncio.TimeoutError, UnicodeError):
+            self.errors += 1
+            return None
+
+        self.resolved += 1
+        self._remember(host, True, self.settings.dns_positive_ttl_seconds)
+        return True
+
+    def record_skipped_probe(self) -> None:
+        self.http_probes_skipped += 1
+
+    def stats(self) -> DnsResolverStats:
+        return DnsResolverStats(
+            lookups=self.lookups,
+            cache_hits=self.cache_hits,
+            resolved=self.resolved,
+            nxdomain=self.nxdomain,
+            errors=self.errors,
+            http_probes_skipped=self.http_probes_skipped,
+            cache_size=len(self._cache),
+        )
+
+    def close(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _remember(self, host: str, answer: bool, ttl_seconds: int) -> None:
+        self._cache[host] = (answer, time.monotonic() + ttl_seconds)
+        self._cache.move_to_end(host)
+        while len(self._cache) > self.settings.dns_cache_max_entries:
+            self._cache.popitem(last=False)
+
+
+@lru_cache
+def get_dns_resolver() -> DnsResolver:
+    return DnsResolver(get_settings())
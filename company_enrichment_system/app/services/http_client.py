@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+from functools import lru_cache
+from typing import AsyncIterator, Callable
+
+import httpx
+
+from app.config import Settings, get_settings
+from app.models import HttpPoolStats
+
+POOL_API = 'api'
+POOL_PROBE = 'probe'
+
+
+class _HostSlot:
+    def __init__(self, limit: int) -> None:
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    # Holds the host slot until the response body is closed, so streamed responses count too.
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class PerHostLimitTransport(httpx.AsyncBaseTransport):
+    # httpx only limits connections per pool; this caps concurrent requests per origin on top.
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host_limit: int) -> None:
+        self.transport = transport
+        self.per_host_limit = per_host_limit
+        self._hosts: dict[tuple[bytes, bytes, int | None], _HostSlot] = {}
+        self.requests = 0
+        self.active_requests = 0
+        self.per_host_waits = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.url.raw_scheme, request.url.raw_host, request.url.port)
+        slot = self._hosts.get(key)
+        if slot is None:
+            slot = self._hosts[key] = _HostSlot(self.per_host_limit)
+        slot.users += 1
+        if slot.semaphore.locked():
+            self.per_host_waits += 1
+        try:
+            await slot.semaphore.acquire()
+        except BaseException:
+            self._leave(key, slot)
+            raise
+
+        self.requests += 1
+        self.active_requests += 1
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self._release(key, slot)
+            raise
+        if isinstance(response.stream, httpx.ByteStream):
+            # Already in memory (mock transports), so nothing is left to hold the slot for.
+            self._release(key, slot)
+        else:
+            response.stream = _ReleasingStream(response.stream, lambda: self._release(key, slot))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    def stats(self, name: str, http2: bool, max_connections: int) -> HttpPoolStats:
+        # The connection list lives on httpcore's pool, which httpx does not expose publicly.
+        connections = getattr(getattr(self.transport, '_pool', None), 'connections', [])
+        return HttpPoolStats(
+            name=name,
+            http2=http2,
+            max_connections=max_connections,
+            per_host_limit=self.per_host_limit,
+            requests=self.requests,
+            active_requests=self.active_requests,
+            per_host_waits=self.per_host_waits,
+            hosts_in_use=len(self._hosts),
+            open_connections=len(connections),
+            idle_connections=sum(1 for connection in connections if connection.is_idle()),
+        )
+
+    def _release(self, key: tuple[bytes, bytes, int | None], slot: _HostSlot) -> None:
+        self.active_requests -= 1
+        slot.semaphore.release()
+        self._leave(key, slot)
+
+    def _leave(self, key: tuple[bytes, bytes, int | None], slot: _HostSlot) -> None:
+        # Drop idle slots so probing thousands of one-off domains doesn't grow the map.
+        slot.users -= 1
+        if slot.users == 0 and self._hosts.get(key) is slot:
+            del self._hosts[key]
+
+
+class HttpClients:
+    # Two long-lived pools: `api` for the few provider hosts (long keep-alive, high reuse) and
+    # `probe` for domain-guess checks (many hosts, short keep-alive, tight per-host cap).
+
+    def __init__(self, settings: Settings, transport: httpx.AsyncBaseTransport | None = None) -> None:
+        self.settings = settings
+        # Replaces the network transport under both pools (e.g. httpx.MockTransport in benchmarks).
+        self._base_transport = transport
+        self.http2 = settings.http2_enabled and importlib.util.find_spec('h2') is not None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._api: httpx.AsyncClient | None = None
+        self._probe: httpx.AsyncClient | None = None
+        self._transports: dict[str, PerHostLimitTransport] = {}
+
+    @property
+    def api(self) -> httpx.AsyncClient:
+        if self._api is None:
+            raise RuntimeError('HTTP clients are not started')
+        return self._api
+
+    @property
+    def probe(self) -> httpx.AsyncClient:
+        if self._probe is None:
+            raise RuntimeError('HTTP clients are not started')
+        return self._probe
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._api is not None and self._loop is loop:
+            return
+        # Connections are bound to the loop that opened them; rebuild after a loop change.
+        self._loop = loop
+        settings = self.settings
+        self._api = self._build_client(
+            POOL_API,
+            max_connections=settings.api_pool_max_connections,
+            max_keepalive=settings.api_pool_max_keepalive,
+            keepalive_expiry=settings.api_pool_keepalive_expiry_seconds,
+            per_host_limit=settings.api_pool_per_host_limit,
+        )
+        self._probe = self._build_client(
+            POOL_PROBE,
+            max_connections=settings.probe_pool_max_connections,
+            max_keepalive=settings.probe_pool_max_keepalive,
+            keepalive_expiry=settings.probe_pool_keepalive_expiry_seconds,
+            per_host_limit=settings.probe_pool_per_host_limit,
+        )
+
+    async def close(self) -> None:
+        clients = [client for client in (self._api, self._probe) if client is not None]
+        self._api = self._probe = None
+        self._transports.clear()
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+    def stats(self) -> list[HttpPoolStats]:
+        max_connections = {
+            POOL_API: self.settings.api_pool_max_connections,
+            POOL_PROBE: self.settings.probe_pool_max_connections,
+        }
+        return [
+            transport.stats(name, self.http2, max_connections[name])
+            for name, transport in self._transports.items()
+        ]
+
+    def _build_client(
+        self,
+        name: str,
+        max_connections: int,
+        max_keepalive: int,
+        keepalive_expiry: float,
+        per_host_limit: int,
+    ) -> httpx.AsyncClient:
+        transport = PerHostLimitTransport(
+            self._base_transport
+            or httpx.AsyncHTTPTransport(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            ),
+            per_host_limit=per_host_limit,
+        )
+        self._transports[name] = transport
+        return httpx.AsyncClient(transport=transport, timeout=self.settings.request_timeout_seconds)
+
+
+@lru_cache
+def get_http_clients() -> HttpClients:
+    return HttpClients(get_settings())
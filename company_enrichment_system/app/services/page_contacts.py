@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import codecs
+import re
+from urllib.parse import unquote, urljoin, urlparse
+
+import httpx
+
+from app.config import Settings
+from app.models import ContactLookupResult
+from app.services.http_client import HttpClients
+from app.services.rate_limiter import PROVIDER_DOMAIN_PROBE, RateLimiterRegistry
+from app.utils.metrics import StageTimer, error_outcome
+from app.utils.validators import is_valid_email, is_valid_phone
+
+PAGE_SOURCE = 'website_page'
+
+_LINK_REGEX = re.compile(r'''href\s*=\s*["']?\s*(tel|mailto):([^"'\s>]+)''', re.IGNORECASE)
+_EMAIL_REGEX = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}')
+# Bare numbers in page text are only trusted in international form; tel: links are trusted as-is.
+_PHONE_TEXT_REGEX = re.compile(r'\+\d[\d\s()-]{7,18}\d')
+_CONTACT_HREF_REGEX = re.compile(r'''href\s*=\s*["']([^"'#]*contact[^"'#]*)["']''', re.IGNORECASE)
+_ASSET_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.css', '.js')
+# Matches ending this close to the end of a chunk may be cut off; they are rescanned with the next one.
+_CHUNK_MARGIN = 64
+_CARRY_CHARS = 512
+
+
+class _PageScanner:
+    # Incremental scan over decoded chunks; keeps a short tail so matches spanning chunks are seen.
+
+    def __init__(self) -> None:
+        self.link_email: str | None = None
+        self.link_phone: str | None = None
+        self.text_email: str | None = None
+        self.text_phone: str | None = None
+        self.contact_href: str | None = None
+        self._carry = ''
+
+    def feed(self, text: str, final: bool = False) -> None:
+        buffer = self._carry + text
+        limit = len(buffer) if final else len(buffer) - _CHUNK_MARGIN
+        for match in _LINK_REGEX.finditer(buffer):
+            if match.end() > limit:
+                break
+            scheme, target = match.group(1).lower(), unquote(match.group(2).split('?', 1)[0])
+            if scheme == 'mailto' and self.link_email is None and is_valid_email(target):
+                self.link_email = target.strip()
+            elif scheme == 'tel' and self.link_phone is None and is_valid_phone(target):
+                self.link_phone = target.strip()
+        if self.text_email is None:
+            self.text_email = _first(_EMAIL_REGEX, buffer, limit, _looks_like_email)
+        if self.text_phone is None:
+            self.text_phone = _first(_PHONE_TEXT_REGEX, buffer, limit, is_valid_phone)
+        if self.contact_href is None:
+            match = _CONTACT_HREF_REGEX.search(buffer)
+            self.contact_href = match.group(1) if match and match.end() <= limit else None
+        self._carry = buffer[-_CARRY_CHARS:]
+
+    @property
+    def email(self) -> str | None:
+        return self.link_email or self.text_email
+
+    @property
+    def phone(self) -> str | None:
+        return self.link_phone or self.text_phone
+
+    def complete(self) -> bool:
+        return self.email is not None and self.phone is not None
+
+
+class PageContactExtractor:
+    def __init__(self, settings: Settings, rate_limiters: RateLimiterRegistry | None = None) -> None:
+        self.settings = settings
+        self.rate_limiters = rate_limiters or RateLimiterRegistry(settings)
+
+    async def extract(self, clients: HttpClients, url: str) -> ContactLookupResult:
+        scanner = _PageScanner()
+        await self._scan(clients, url, scanner)
+        if not scanner.complete() and self.settings.page_contacts_follow_contact_page:
+            contact_url = self._contact_page_url(url, scanner.contact_href)
+            if contact_url is not None:
+                await self._scan(clients, contact_url, scanner)
+
+        return ContactLookupResult(
+            phone=scanner.phone,
+            email=scanner.email,
+            phone_found=scanner.phone is not None,
+            email_found=scanner.email is not None,
+            source=PAGE_SOURCE,
+        )
+
+    async def _scan(self, clients: HttpClients, url: str, scanner: _PageScanner) -> None:
+        await self.rate_limiters.get(PROVIDER_DOMAIN_PROBE).wait()
+        with StageTimer('page_contacts') as timer:
+            try:
+                async with clients.probe.stream(
+                    'GET', url, timeout=self.settings.request_timeout_seconds, follow_redirects=True
+                ) as response:
+                    content_type = response.headers.get('Content-Type', 'text/html')
+                    if response.status_code >= 400 or 'html' not in content_type:
+                        timer.outcome = 'skipped'
+                        return
+                    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='ignore')
+                    remaining = self.settings.page_contacts_max_bytes
+                    capped = False
+                    async for chunk in response.aiter_bytes():
+                        chunk = chunk[:remaining]
+                        remaining -= len(chunk)
+                        scanner.feed(decoder.decode(chunk))
+                        # Stopping at the byte cap is not the end of the page: a match running into
+                        # the cut may be incomplete, so the tail is not scanned as final.
+                        capped = remaining <= 0
+                        if capped or scanner.complete():
+                            break
+                    scanner.feed(decoder.decode(b'', final=True), final=not capped)
+                timer.outcome = 'found' if scanner.email or scanner.phone else 'no_match'
+            except (httpx.HTTPError, LookupError) as exc:
+                timer.outcome = error_outcome(exc)
+
+    @staticmethod
+    def _contact_page_url(url: str, href: str | None) -> str | None:
+        # Only follow a contact link on the same site; otherwise try the conventional /contact path.
+        candidate = urljoin(url, href) if href else urljoin(url, '/contact')
+        if urlparse(candidate).hostname != urlparse(url).hostname:
+            candidate = urljoin(url, '/contact')
+        return candidate if candidate.rstrip('/') != url.rstrip('/') else None
+
+
+def _first(regex: re.Pattern[str], text: str, limit: int, valid) -> str | None:
+    # The whole buffer is searched so a match running past `limit` is seen whole and left for the
+    # next chunk; searching with endpos=limit would cut it short and accept the truncated value.
+    for match in regex.finditer(text):
+        if match.end() > limit:
+            break
+        if valid(match.group(0)):
+            return match.group(0).strip()
+    return None
+
+
+def _looks_like_email(value: str) -> bool:
+    return not value.lower().endswith(_ASSET_SUFFIXES) and is_valid_email(value)
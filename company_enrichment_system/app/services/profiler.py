@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.config import Settings, get_settings
+from app.models import CompanyProfile, JobProfileResponse, StageProfile, TraceSpan
+from app.utils.tracing import RETRY_SPAN_SUFFIX, CompanyTrace
+
+
+class JobProfile:
+    # Stage totals over every traced company of one job, plus the timelines of the
+    # `max_companies` slowest (a min-heap, so memory stays bounded however large the job is).
+
+    def __init__(self, sample_rate: float, max_companies: int, max_spans: int) -> None:
+        self.sample_rate = sample_rate
+        self.max_companies = max_companies
+        self.max_spans = max_spans
+        self.companies_seen = 0
+        self.companies_traced = 0
+        self.total_seconds = 0.0
+        # stage -> [calls, total seconds, max seconds]
+        self._stages: dict[str, list[float]] = {}
+        self._slowest: list[tuple[float, int, CompanyTrace]] = []
+        self._order = itertools.count()
+
+    def start(self, company: str) -> CompanyTrace | None:
+        self.companies_seen += 1
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        return CompanyTrace(company, self.max_spans)
+
+    def record(self, trace: CompanyTrace) -> None:
+        self.companies_traced += 1
+        self.total_seconds += trace.duration
+        for stage, _, duration, _ in trace.spans:
+            totals = self._stages.get(stage)
+            if totals is None:
+                totals = self._stages[stage] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += duration
+            if duration > totals[2]:
+                totals[2] = duration
+        entry = (trace.duration, next(self._order), trace)
+        if len(self._slowest) < self.max_companies:
+            heapq.heappush(self._slowest, entry)
+        elif trace.duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def report(self, job_id: str, top: int) -> JobProfileResponse:
+        stages = [
+            StageProfile(
+                stage=stage,
+                calls=int(calls),
+                total_ms=_ms(total),
+                avg_ms=_ms(total / calls),
+                max_ms=_ms(longest),
+            )
+            for stage, (calls, total, longest) in self._stages.items()
+        ]
+        stages.sort(key=lambda item: -item.total_ms)
+        slowest = sorted(self._slowest, key=lambda entry: -entry[0])[:top]
+        return JobProfileResponse(
+            job_id=job_id,
+            sample_rate=self.sample_rate,
+            companies_seen=self.companies_seen,
+            companies_traced=self.companies_traced,
+            avg_company_ms=_ms(self.total_seconds / self.companies_traced) if self.companies_traced else 0.0,
+            stages=stages,
+            slowest=[_company_profile(trace) for _, _, trace in slowest],
+        )
+
+
+class JobProfiler:
+    # Profiles of the most recent `profile_max_jobs` jobs this process worked on.
+
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self.enabled = settings.profiling_enabled
+        self._jobs: OrderedDict[str, JobProfile] = OrderedDict()
+
+    def start(self, job_id: str, company: str) -> CompanyTrace | None:
+        profile = self._jobs.get(job_id)
+        if profile is None:
+            settings = self.settings
+            profile = self._jobs[job_id] = JobProfile(
+                settings.profile_sample_rate,
+                settings.profile_max_companies,
+                settings.profile_max_spans_per_company,
+            )
+            while len(self._jobs) > settings.profile_max_jobs:
+                self._jobs.popitem(last=False)
+        return profile.start(company)
+
+    def finish(self, job_id: str, trace: CompanyTrace, status: str) -> None:
+        trace.finish(status)
+        profile = self._jobs.get(job_id)
+        if profile is not None:
+            profile.record(trace)
+
+    def get(self, job_id: str) -> JobProfile | None:
+        return self._jobs.get(job_id)
+
+
+def _company_profile(trace: CompanyTrace) -> CompanyProfile:
+    stage_ms: dict[str, float] = {}
+    for stage, _, duration, _ in trace.spans:
+        stage_ms[stage] = stage_ms.get(stage, 0.0) + duration
+    return CompanyProfile(
+        company=trace.company,
+        status=trace.status,
+        duration_ms=_ms(trace.duration),
+        retries=sum(1 for stage, _, _, _ in trace.spans if stage.endswith(RETRY_SPAN_SUFFIX)),
+        stage_ms={stage: _ms(total) for stage, total in stage_ms.items()},
+        spans=[
+            TraceSpan(stage=stage, start_ms=_ms(start), duration_ms=_ms(duration), outcome=outcome)
+            for stage, start, duration, outcome in trace.spans
+        ],
+        dropped_spans=trace.dropped_spans,
+    )
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+@lru_cache
+def get_job_profiler() -> JobProfiler:
+    return JobProfiler(get_settings())
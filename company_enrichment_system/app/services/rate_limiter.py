@@ -2,19 +2,212 @@ from __future__ import annotations
 
 import asyncio
 import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from multiprocessing.context import BaseContext
+from multiprocessing.sharedctypes import SynchronizedArray
+
+from app.config import Settings, get_settings
+from app.models import RateLimiterStats
+from app.utils.metrics import RATE_LIMITER_THROTTLES, RATE_LIMITER_WAIT
+from app.utils.tracing import record_span
+
+PROVIDER_DOMAIN_PROBE = 'domain_probe'
+PROVIDER_SERPAPI = 'serpapi'
+PROVIDER_SEARCH_API = 'search_api'
+PROVIDER_GOOGLE_PLACES = 'google_places'
+
+PROVIDERS = (PROVIDER_DOMAIN_PROBE, PROVIDER_SERPAPI, PROVIDER_SEARCH_API, PROVIDER_GOOGLE_PLACES)
+
+THROTTLE_STATUS_CODES = {429, 503}
 
 
 class AsyncRateLimiter:
-    def __init__(self, rate_per_second: int) -> None:
-        self.rate_per_second = max(rate_per_second, 1)
-        self._lock = asyncio.Lock()
-        self._last_called = 0.0
-
-    async def wait(self) -> None:
-        async with self._lock:
-            now = time.monotonic()
-            min_interval = 1 / self.rate_per_second
-            delta = now - self._last_called
-            if delta < min_interval:
-                await asyncio.sleep(min_interval - delta)
-            self._last_called = time.monotonic()
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: int = 1,
+        name: str = 'default',
+        max_backoff_seconds: float = 60.0,
+        min_rate_fraction: float = 0.1,
+    ) -> None:
+        self.name = name
+        self._wait_metric = RATE_LIMITER_WAIT.labels(name)
+        self._wait_stage = f'{name}_rate_wait'
+        self.rate_per_second = max(float(rate_per_second), 0.001)
+        self.burst = max(burst, 1)
+        self.max_backoff_seconds = max_backoff_seconds
+        self._min_rate = self.rate_per_second * min_rate_fraction
+        self._rate = self.rate_per_second
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+        self.waits = 0
+        self.delayed_waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.throttled = 0
+
+    async def wait(self) -> float:
+        # The token is reserved synchronously, so concurrent callers each sleep for their own
+        # slot instead of queueing behind a lock held across the sleep.
+        delay = self._reserve()
+        if delay > 0:
+            record_span(self._wait_stage, time.perf_counter(), delay)
+            await asyncio.sleep(delay)
+        self.waits += 1
+        self._wait_metric.observe(delay)
+        self.total_wait_seconds += delay
+        if delay > 0:
+            self.delayed_waits += 1
+            self.max_wait_seconds = max(self.max_wait_seconds, delay)
+        return delay
+
+    def record_response(self, status_code: int, retry_after: str | None = None) -> None:
+        if status_code in THROTTLE_STATUS_CODES:
+            self.record_throttle(parse_retry_after(retry_after))
+        else:
+            self.record_success()
+
+    def record_throttle(self, retry_after_seconds: float | None = None) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self.throttled += 1
+        RATE_LIMITER_THROTTLES.labels(self.name).inc()
+        self._rate = max(self._min_rate, self._rate / 2)
+        pause = retry_after_seconds if retry_after_seconds is not None else 1 / self._rate
+        pause = min(max(pause, 0.0), self.max_backoff_seconds)
+        # Drop saved-up burst and hold refills until the provider's pause is over.
+        self._tokens = min(self._tokens, 0.0)
+        self._updated = max(self._updated, now + pause)
+
+    def record_success(self) -> None:
+        if self._rate < self.rate_per_second:
+            self._refill(time.monotonic())
+            self._rate = min(self.rate_per_second, self._rate + self.rate_per_second * 0.05)
+
+    def stats(self) -> RateLimiterStats:
+        return RateLimiterStats(
+            name=self.name,
+            rate_per_second=self.rate_per_second,
+            effective_rate_per_second=round(self._rate, 4),
+            burst=self.burst,
+            waits=self.waits,
+            delayed_waits=self.delayed_waits,
+            total_wait_seconds=round(self.total_wait_seconds, 4),
+            avg_wait_seconds=round(self.total_wait_seconds / self.waits, 4) if self.waits else 0.0,
+            max_wait_seconds=round(self.max_wait_seconds, 4),
+            throttled=self.throttled,
+        )
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        ready_at = self._updated + max(0.0, -self._tokens) / self._rate
+        return max(0.0, ready_at - now)
+
+
+class SharedRateLimiter(AsyncRateLimiter):
+    # The same token bucket, but its tokens, refill time and current rate live in shared memory:
+    # every process built on one `state` draws from a single budget and backs off together when
+    # the provider throttles. time.monotonic() is system-wide, so the refill math holds across
+    # processes. Wait statistics stay per process.
+
+    def __init__(self, state: SynchronizedArray, *args, **kwargs) -> None:
+        self._state = state
+        with state.get_lock():
+            snapshot = state[:]
+            super().__init__(*args, **kwargs)
+            if snapshot[1] > 0:
+                # Another process already started the bucket; keep its tokens and backoff.
+                state[:] = snapshot
+
+    @property
+    def _tokens(self) -> float:
+        return self._state[0]
+
+    @_tokens.setter
+    def _tokens(self, value: float) -> None:
+        self._state[0] = value
+
+    @property
+    def _updated(self) -> float:
+        return self._state[1]
+
+    @_updated.setter
+    def _updated(self, value: float) -> None:
+        self._state[1] = value
+
+    @property
+    def _rate(self) -> float:
+        return self._state[2]
+
+    @_rate.setter
+    def _rate(self, value: float) -> None:
+        self._state[2] = value
+
+    def record_throttle(self, retry_after_seconds: float | None = None) -> None:
+        with self._state.get_lock():
+            super().record_throttle(retry_after_seconds)
+
+    def record_success(self) -> None:
+        with self._state.get_lock():
+            super().record_success()
+
+    def _reserve(self) -> float:
+        with self._state.get_lock():
+            return super()._reserve()
+
+
+def create_shared_rate_states(context: BaseContext) -> dict[str, SynchronizedArray]:
+    # One [tokens, updated, rate] slot per provider, to hand to processes started from `context`.
+    return {provider: context.Array('d', 3) for provider in PROVIDERS}
+
+
+class RateLimiterRegistry:
+    def __init__(self, settings: Settings, shared_states: dict[str, SynchronizedArray] | None = None) -> None:
+        self.settings = settings
+        self._limiters: dict[str, AsyncRateLimiter] = {}
+        for provider in PROVIDERS:
+            rate = getattr(settings, f'{provider}_rate_per_second') or settings.rate_limit_per_second
+            burst = getattr(settings, f'{provider}_burst') or settings.rate_limit_burst
+            options = {'burst': burst, 'name': provider, 'max_backoff_seconds': settings.rate_limit_max_backoff_seconds}
+            if shared_states is not None:
+                self._limiters[provider] = SharedRateLimiter(shared_states[provider], rate, **options)
+            else:
+                self._limiters[provider] = AsyncRateLimiter(rate, **options)
+
+    def get(self, provider: str) -> AsyncRateLimiter:
+        return self._limiters[provider]
+
+    def stats(self) -> list[RateLimiterStats]:
+        return [limiter.stats() for limiter in self._limiters.values()]
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+@lru_cache
+def get_rate_limiter_registry() -> RateLimiterRegistry:
+    return RateLimiterRegistry(get_settings())
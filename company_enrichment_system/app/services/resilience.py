@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+from app.config import Settings, get_settings
+from app.models import CircuitBreakerStats
+from app.services.budget import BudgetExhaustedError, charge_paid_call
+from app.services.rate_limiter import PROVIDERS
+from app.utils.metrics import CIRCUIT_STATE, STAGE_RETRIES, error_outcome
+from app.utils.tracing import RETRY_SPAN_SUFFIX, record_span
+
+T = TypeVar('T')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class StageFailedError(Exception):
+    # A pipeline stage gave up: its retries ran out, or its provider's circuit is open.
+
+    def __init__(self, stage: str, message: str) -> None:
+        super().__init__(f'{stage}: {message}')
+        self.stage = stage
+
+
+class CircuitOpenError(StageFailedError):
+    def __init__(self, stage: str) -> None:
+        super().__init__(stage, 'circuit open')
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def retry_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    # Full jitter: uniform over [0, base * 2^(attempt-1)], so retries from many companies spread out.
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    # Closed: calls pass and outcomes fill a sliding window. Once the window holds min_calls and
+    # the failure rate reaches the threshold, the breaker opens and rejects calls for open_seconds.
+    # Then it lets half_open_max_calls trial calls through; all of them succeeding closes it, any
+    # failure re-opens it.
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 3,
+    ) -> None:
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min(min_calls, window_size)
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = max(half_open_max_calls, 1)
+        self._window: deque[bool] = deque(maxlen=max(window_size, 1))
+        self._state_metric = CIRCUIT_STATE.labels(name)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trials_started = 0
+        self._trials_passed = 0
+        self.times_opened = 0
+        self.rejected_calls = 0
+
+    def before_call(self) -> None:
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name)
+            self._set_state(HALF_OPEN)
+            self._trials_started = self._trials_passed = 0
+        if self.state == HALF_OPEN:
+            if self._trials_started >= self.half_open_max_calls:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name)
+            self._trials_started += 1
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self._trials_passed += 1
+            if self._trials_passed >= self.half_open_max_calls:
+                self._window.clear()
+                self._set_state(CLOSED)
+        elif self.state == CLOSED:
+            self._window.append(True)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._open()
+        elif self.state == CLOSED:
+            self._window.append(False)
+            failures = self._window.count(False)
+            if len(self._window) >= self.min_calls and failures / len(self._window) >= self.failure_rate_threshold:
+                self._open()
+
+    def record_abandoned(self) -> None:
+        # A cancelled call proves nothing either way; give its half-open trial slot back.
+        if self.state == HALF_OPEN and self._trials_started > self._trials_passed:
+            self._trials_started -= 1
+
+    def stats(self) -> CircuitBreakerStats:
+        failures = self._window.count(False)
+        return CircuitBreakerStats(
+            name=self.name,
+            state=self.state,
+            window_calls=len(self._window),
+            window_failure_rate=round(failures / len(self._window), 4) if self._window else 0.0,
+            times_opened=self.times_opened,
+            rejected_calls=self.rejected_calls,
+        )
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self._window.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self._state_metric.set(_STATE_VALUES[state])
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, settings: Settings) -> None:
+        self.settings = settings
+        self._breakers = {
+            provider: CircuitBreaker(
+                provider,
+                failure_rate_threshold=settings.circuit_failure_rate_threshold,
+                window_size=settings.circuit_window_size,
+                min_calls=settings.circuit_min_calls,
+                open_seconds=settings.circuit_open_seconds,
+                half_open_max_calls=settings.circuit_half_open_max_calls,
+            )
+            for provider in PROVIDERS
+        }
+
+    def get(self, provider: str) -> CircuitBreaker:
+        return self._breakers[provider]
+
+    def states(self) -> dict[str, str]:
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    def stats(self) -> list[CircuitBreakerStats]:
+        return [breaker.stats() for breaker in self._breakers.values()]
+
+    async def call(self, stage: str, attempt: Callable[[], Awaitable[T]]) -> T:
+        # Runs one provider call with the stage's breaker and jittered retries. `attempt` handles
+        # answers itself (including "not found" and non-retryable errors) and only lets transient
+        # failures escape: timeouts, transport errors, 429 and 5xx. Every call through here is a
+        # paid provider call, so each attempt is charged to the job's budget first.
+        breaker = self._breakers[stage]
+        settings = self.settings
+        number = 0
+        while True:
+            number += 1
+            breaker.before_call()
+            try:
+                charge_paid_call()
+                result = await attempt()
+            except (asyncio.CancelledError, BudgetExhaustedError):
+                breaker.record_abandoned()
+                raise
+            except Exception as exc:
+                # Anything else that escapes (bad payload, 4xx) still means the provider answered;
+                # a 429 also means it is up, and the rate limiter is already backing off.
+                throttled = isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429
+                if not is_transient(exc) or throttled:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+                if not is_transient(exc):
+                    raise
+                if number >= settings.stage_max_attempts:
+                    raise StageFailedError(stage, f'gave up after {number} attempts: {exc!r}') from exc
+                STAGE_RETRIES.labels(stage).inc()
+                delay = retry_delay(number, settings.stage_retry_base_delay_seconds, settings.stage_retry_max_delay_seconds)
+                record_span(f'{stage}{RETRY_SPAN_SUFFIX}', time.perf_counter(), delay, error_outcome(exc))
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+
+@lru_cache
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    return CircuitBreakerRegistry(get_settings())
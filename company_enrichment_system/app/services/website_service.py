@@ -1,102 +1,433 @@
 from __future__ import annotations
 
 import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from functools import lru_cache, partial
 from urllib.parse import urlparse
 
 import httpx
 
 from app.config import Settings
-from app.models import DomainLookupResult
-from app.services.rate_limiter import AsyncRateLimiter
+from app.models import DomainLookupResult, WebsiteProbeStats
+from app.services.candidate_stats import (
+    OUTCOME_NOT_FOUND,
+    OUTCOME_SEARCH,
+    CandidatePlan,
+    CandidateStats,
+)
+from app.services.dns_resolver import DnsResolver
+from app.services.http_client import HttpClients
+from app.services.rate_limiter import (
+    PROVIDER_DOMAIN_PROBE,
+    PROVIDER_SEARCH_API,
+    PROVIDER_SERPAPI,
+    AsyncRateLimiter,
+    RateLimiterRegistry,
+)
+from app.services.resilience import CircuitBreakerRegistry, CircuitOpenError, StageFailedError, is_transient
+from app.utils.metrics import (
+    DOMAIN_CANDIDATES_PRUNED,
+    DOMAIN_PROBES_PER_LOOKUP,
+    STAGE_OUTCOMES,
+    StageTimer,
+    error_outcome,
+)
+from app.utils.validators import canonicalize_company_name
+
+# Statuses that usually mean "this server does not do HEAD" rather than "this site is down".
+HEAD_REJECTED_STATUSES = {400, 403, 404, 405, 406, 501}
+
+
+@dataclass
+class _Probe:
+    requests: int = 0
+    head_requests: int = 0
+    get_fallback: bool = False
+    redirects: int = 0
+    redirect_limit_hit: bool = False
+    header_bytes: int = 0
+    body_bytes: int = 0
+
+
+@dataclass
+class _LookupTrace:
+    # HTTP probes one detect_website call actually sent (DNS-skipped candidates don't count).
+    probes: int = 0
+    # Guesses skipped because the probe circuit was open
+    skipped: int = 0
+
+
+class ProbeCounters:
+    def __init__(self) -> None:
+        self.probes = 0
+        self.requests = 0
+        self.head_requests = 0
+        self.get_fallbacks = 0
+        self.redirects_followed = 0
+        self.redirect_limit_hits = 0
+        self.header_bytes = 0
+        self.body_bytes = 0
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.lookups = 0
+        self.lookup_probes = 0
+
+    def record(self, probe: _Probe, latency_seconds: float) -> None:
+        self.probes += 1
+        self.requests += probe.requests
+        self.head_requests += probe.head_requests
+        self.get_fallbacks += int(probe.get_fallback)
+        self.redirects_followed += probe.redirects
+        self.redirect_limit_hits += int(probe.redirect_limit_hit)
+        self.header_bytes += probe.header_bytes
+        self.body_bytes += probe.body_bytes
+        self.total_latency_seconds += latency_seconds
+        self.max_latency_seconds = max(self.max_latency_seconds, latency_seconds)
+
+    def record_lookup(self, probes: int) -> None:
+        self.lookups += 1
+        self.lookup_probes += probes
+
+    def stats(self) -> WebsiteProbeStats:
+        probes = self.probes or 1
+        return WebsiteProbeStats(
+            probes=self.probes,
+            requests=self.requests,
+            head_requests=self.head_requests,
+            get_fallbacks=self.get_fallbacks,
+            redirects_followed=self.redirects_followed,
+            redirect_limit_hits=self.redirect_limit_hits,
+            header_bytes=self.header_bytes,
+            body_bytes=self.body_bytes,
+            avg_bytes_per_probe=round((self.header_bytes + self.body_bytes) / probes, 1),
+            avg_latency_ms=round(self.total_latency_seconds * 1000 / probes, 2),
+            max_latency_ms=round(self.max_latency_seconds * 1000, 2),
+            lookups=self.lookups,
+            avg_probes_per_lookup=round(self.lookup_probes / (self.lookups or 1), 3),
+        )
 
 
 class WebsiteService:
-    def __init__(self, settings: Settings) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        dns_resolver: DnsResolver | None = None,
+        rate_limiters: RateLimiterRegistry | None = None,
+        probe_counters: ProbeCounters | None = None,
+        breakers: CircuitBreakerRegistry | None = None,
+        candidate_stats: CandidateStats | None = None,
+    ) -> None:
         self.settings = settings
-        self.rate_limiter = AsyncRateLimiter(settings.rate_limit_per_second)
-
-    async def detect_website(self, client: httpx.AsyncClient, company: str) -> DomainLookupResult:
-        base = company.replace(' ', '').replace('&', 'and')
-        candidates = [
-            f'https://{base}.com',
-            f'https://{base}.in',
-            f'https://{base}.co.in',
-        ]
+        self.dns_resolver = dns_resolver if settings.dns_prefilter_enabled else None
+        self.rate_limiters = rate_limiters or RateLimiterRegistry(settings)
+        self.probe_counters = probe_counters or ProbeCounters()
+        self.breakers = breakers or CircuitBreakerRegistry(settings)
+        self.candidate_stats = candidate_stats or CandidateStats(settings)
 
-        for url in candidates:
-            found = await self._check_url(client, url)
+    async def detect_website(self, clients: HttpClients, company: str) -> DomainLookupResult:
+        canonical = canonicalize_company_name(company)
+        base = canonical.replace(' ', '')
+        # Guesses are ordered (and the hopeless ones skipped) by what answered for similar names before.
+        plan = self.candidate_stats.plan(canonical)
+        for tld in plan.pruned:
+            DOMAIN_CANDIDATES_PRUNED.labels(tld).inc()
+        candidates = [f'https://{base}{tld}' for tld in plan.tlds]
+        trace = _LookupTrace()
+        try:
+            if self.settings.domain_probe_mode == 'concurrent':
+                result = await self._detect_concurrent(clients, company, plan, candidates, trace)
+            else:
+                result = await self._detect_sequential(clients, company, plan, candidates, trace)
+        finally:
+            self.probe_counters.record_lookup(trace.probes)
+            DOMAIN_PROBES_PER_LOOKUP.observe(trace.probes)
+
+        if not result.website_found and trace.skipped:
+            # Nothing found, but some guesses were never tried: that is an outage, not an answer,
+            # so it must not be cached, counted as not found or reported as a success.
+            raise CircuitOpenError(PROVIDER_DOMAIN_PROBE)
+        if result.source == 'domain_guess':
+            outcome = plan.tlds[candidates.index(result.website_url)]
+        else:
+            outcome = OUTCOME_SEARCH if result.website_found else OUTCOME_NOT_FOUND
+        self.candidate_stats.record_outcome(plan.shape, outcome)
+        return result
+
+    async def _detect_sequential(
+        self,
+        clients: HttpClients,
+        company: str,
+        plan: CandidatePlan,
+        candidates: list[str],
+        trace: _LookupTrace,
+    ) -> DomainLookupResult:
+        for tld, url in zip(plan.tlds, candidates):
+            found = await self._check_candidate(clients, plan, tld, url, trace)
             if found:
                 return DomainLookupResult(website_found=True, website_url=url, source='domain_guess')
 
-        search_result = await self._search_official_api(client, company)
+        return await self._search_fallback(clients, company)
+
+    async def _detect_concurrent(
+        self,
+        clients: HttpClients,
+        company: str,
+        plan: CandidatePlan,
+        candidates: list[str],
+        trace: _LookupTrace,
+    ) -> DomainLookupResult:
+        probes = [
+            asyncio.create_task(self._check_candidate(clients, plan, tld, url, trace))
+            for tld, url in zip(plan.tlds, candidates)
+        ]
+        fallback: asyncio.Task[DomainLookupResult] | None = None
+        probes_failed = asyncio.Event()
+        if self.settings.search_fallback_delay_seconds is not None:
+            fallback = asyncio.create_task(
+                self._delayed_search_fallback(
+                    clients, company, self.settings.search_fallback_delay_seconds, probes_failed
+                )
+            )
+
+        try:
+            url = await self._first_preferred_success(probes, candidates)
+            if url:
+                return DomainLookupResult(website_found=True, website_url=url, source='domain_guess')
+            if fallback is None:
+                return await self._search_fallback(clients, company)
+            # Every guess failed: a fallback still waiting out its delay starts now.
+            probes_failed.set()
+            return await fallback
+        finally:
+            leftovers = [task for task in [*probes, fallback] if task is not None and not task.done()]
+            for task in leftovers:
+                task.cancel()
+            if leftovers:
+                await asyncio.gather(*leftovers, return_exceptions=True)
+
+    @staticmethod
+    async def _first_preferred_success(probes: list[asyncio.Task[bool]], candidates: list[str]) -> str | None:
+        # A probe only wins once every candidate ahead of it in preference order has failed,
+        # so a fast answer never overrides a slower one from a more likely guess.
+        pending = set(probes)
+        while True:
+            for task, url in zip(probes, candidates):
+                if not task.done():
+                    break
+                if task.result():
+                    return url
+            else:
+                return None
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+    async def _delayed_search_fallback(
+        self, clients: HttpClients, company: str, delay: float, probes_failed: asyncio.Event
+    ) -> DomainLookupResult:
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(probes_failed.wait(), delay)
+        return await self._search_fallback(clients, company)
+
+    async def _search_fallback(self, clients: HttpClients, company: str) -> DomainLookupResult:
+        search_result = await self._search_official_api(clients, company)
         if search_result:
             return DomainLookupResult(website_found=True, website_url=search_result, source='search_api')
 
         return DomainLookupResult(website_found=False)
 
-    async def _check_url(self, client: httpx.AsyncClient, url: str) -> bool:
-        await self.rate_limiter.wait()
+    async def _check_candidate(
+        self,
+        clients: HttpClients,
+        plan: CandidatePlan,
+        tld: str,
+        url: str,
+        trace: _LookupTrace,
+    ) -> bool:
+        # Cancelled probes raise past this, so they never count as misses.
         try:
-            response = await client.get(url, timeout=self.settings.request_timeout_seconds, follow_redirects=True)
-            return response.status_code < 400
-        except (httpx.HTTPError, asyncio.TimeoutError):
+            alive = await self._check_url(clients, url, trace)
+        except CircuitOpenError:
+            # Probe timeouts are normal for parked or firewalled guesses, so an open probe
+            # circuit only skips the guess (uncounted); the search fallback still runs.
+            STAGE_OUTCOMES.labels(PROVIDER_DOMAIN_PROBE, 'circuit_open').inc()
+            trace.skipped += 1
             return False
+        self.candidate_stats.record_probe(plan.shape, tld, alive)
+        return alive
+
+    async def _check_url(self, clients: HttpClients, url: str, trace: _LookupTrace | None = None) -> bool:
+        if self.dns_resolver is not None:
+            host = urlparse(url).hostname
+            if host and await self.dns_resolver.resolves(host) is False:
+                self.dns_resolver.record_skipped_probe()
+                STAGE_OUTCOMES.labels(PROVIDER_DOMAIN_PROBE, 'dns_skipped').inc()
+                return False
+
+        # Probes are not retried: a dead or slow site is an answer. Only timeouts count against
+        # the breaker, since refused connections are what most wrong guesses look like.
+        breaker = self.breakers.get(PROVIDER_DOMAIN_PROBE)
+        breaker.before_call()
+        limiter = self.rate_limiters.get(PROVIDER_DOMAIN_PROBE)
+        probe = _Probe()
+        try:
+            await limiter.wait()
+        except asyncio.CancelledError:
+            breaker.record_abandoned()
+            raise
+        if trace is not None:
+            trace.probes += 1
+        started = time.monotonic()
+        with StageTimer(PROVIDER_DOMAIN_PROBE) as timer:
+            try:
+                alive = await self._probe(clients, limiter, url, probe)
+                timer.outcome = 'alive' if alive else 'dead'
+                breaker.record_success()
+                return alive
+            except httpx.TooManyRedirects:
+                probe.redirect_limit_hit = True
+                timer.outcome = 'redirect_limit'
+                breaker.record_success()
+                return False
+            except (httpx.HTTPError, asyncio.TimeoutError) as exc:
+                timer.outcome = error_outcome(exc)
+                if timer.outcome == 'timeout':
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                return False
+            except asyncio.CancelledError:
+                breaker.record_abandoned()
+                raise
+            finally:
+                self.probe_counters.record(probe, time.monotonic() - started)
+
+    async def _probe(self, clients: HttpClients, limiter: AsyncRateLimiter, url: str, probe: _Probe) -> bool:
+        if self.settings.probe_method == 'head':
+            try:
+                status = await self._probe_status(clients.probe, 'HEAD', url, probe)
+            except (httpx.TimeoutException, httpx.ConnectError, httpx.TooManyRedirects):
+                raise
+            except httpx.HTTPError:  # e.g. the server drops the connection on HEAD
+                status = None
+            if status is not None and status not in HEAD_REJECTED_STATUSES:
+                return status < 400
+            probe.get_fallback = True
+            await limiter.wait()
+        return await self._probe_status(clients.probe, 'GET', url, probe) < 400
+
+    async def _probe_status(self, client: httpx.AsyncClient, method: str, url: str, probe: _Probe) -> int:
+        # Redirects are followed by hand so every hop is streamed and closed after its headers.
+        request = client.build_request(method, url, timeout=self.settings.request_timeout_seconds)
+        for hop in range(self.settings.probe_max_redirects + 1):
+            if hop:
+                probe.redirects += 1
+            response = await client.send(request, stream=True, follow_redirects=False)
+            probe.requests += 1
+            if method == 'HEAD':
+                probe.head_requests += 1
+            probe.header_bytes += _header_size(response)
+            try:
+                if not response.is_redirect or response.next_request is None:
+                    return response.status_code
+                request = response.next_request
+            finally:
+                await self._release(response, probe)
+        raise httpx.TooManyRedirects('Exceeded maximum allowed redirects.', request=request)
+
+    async def _release(self, response: httpx.Response, probe: _Probe) -> None:
+        # Closing a response with an unread body drops its connection; short bodies are
+        # cheaper to drain so the connection goes back to the pool.
+        try:
+            length = response.headers.get('Content-Length', '')
+            if response.request.method != 'HEAD' and length.isdigit() and int(length) <= self.settings.probe_drain_max_bytes:
+                await response.aread()
+        except httpx.HTTPError:
+            pass
+        finally:
+            probe.body_bytes += response.num_bytes_downloaded
+            await response.aclose()
 
-    async def _search_official_api(self, client: httpx.AsyncClient, company: str) -> str | None:
-        serp_candidate = await self._search_serpapi(client, company)
+    async def _search_official_api(self, clients: HttpClients, company: str) -> str | None:
+        serp_failure: StageFailedError | None = None
+        try:
+            serp_candidate = await self._search_serpapi(clients, company)
+        except StageFailedError as exc:
+            serp_failure, serp_candidate = exc, None
         if serp_candidate:
             return serp_candidate
 
-        generic_candidate = await self._search_generic_official_api(client, company)
+        generic_candidate = await self._search_generic_official_api(clients, company)
+        # "Not found" is only trustworthy if SerpApi actually answered.
+        if generic_candidate is None and serp_failure is not None:
+            raise serp_failure
         return generic_candidate
 
-    async def _search_serpapi(self, client: httpx.AsyncClient, company: str) -> str | None:
+    async def _search_serpapi(self, clients: HttpClients, company: str) -> str | None:
         if not self.settings.serpapi_api_key:
             return None
+        return await self.breakers.call(PROVIDER_SERPAPI, partial(self._serpapi_request, clients, company))
 
-        await self.rate_limiter.wait()
-        try:
-            response = await client.get(
-                self.settings.serpapi_url,
-                params={
-                    'engine': 'google',
-                    'q': f'{company} official website',
-                    'api_key': self.settings.serpapi_api_key,
-                    'num': 5,
-                },
-                timeout=self.settings.request_timeout_seconds,
-            )
-            response.raise_for_status()
-            payload = response.json()
-            organic_results = payload.get('organic_results', [])
-            for entry in organic_results:
-                link = entry.get('link')
-                if isinstance(link, str) and self._looks_like_company_site(link, company):
-                    return link
-        except (httpx.HTTPError, ValueError, TypeError):
-            return None
+    async def _serpapi_request(self, clients: HttpClients, company: str) -> str | None:
+        limiter = self.rate_limiters.get(PROVIDER_SERPAPI)
+        await limiter.wait()
+        with StageTimer(PROVIDER_SERPAPI) as timer:
+            try:
+                response = await clients.api.get(
+                    self.settings.serpapi_url,
+                    params={
+                        'engine': 'google',
+                        'q': f'{company} official website',
+                        'api_key': self.settings.serpapi_api_key,
+                        'num': 5,
+                    },
+                    timeout=self.settings.request_timeout_seconds,
+                )
+                limiter.record_response(response.status_code, response.headers.get('Retry-After'))
+                response.raise_for_status()
+                payload = response.json()
+                organic_results = payload.get('organic_results', [])
+                for entry in organic_results:
+                    link = entry.get('link')
+                    if isinstance(link, str) and self._looks_like_company_site(link, company):
+                        return link
+                timer.outcome = 'no_match'
+            except (httpx.HTTPError, ValueError, TypeError) as exc:
+                timer.outcome = error_outcome(exc)
+                if is_transient(exc):
+                    raise
+                return None
 
         return None
 
-    async def _search_generic_official_api(self, client: httpx.AsyncClient, company: str) -> str | None:
+    async def _search_generic_official_api(self, clients: HttpClients, company: str) -> str | None:
         if not self.settings.search_api_url or not self.settings.search_api_key:
             return None
+        return await self.breakers.call(PROVIDER_SEARCH_API, partial(self._search_api_request, clients, company))
 
-        await self.rate_limiter.wait()
-        try:
-            response = await client.get(
-                self.settings.search_api_url,
-                params={'q': company},
-                headers={'Authorization': f'Bearer {self.settings.search_api_key}'},
-                timeout=self.settings.request_timeout_seconds,
-            )
-            response.raise_for_status()
-            payload = response.json()
-            candidate = payload.get('website')
-            if isinstance(candidate, str) and candidate.startswith('http'):
-                return candidate
-        except (httpx.HTTPError, ValueError, TypeError):
-            return None
+    async def _search_api_request(self, clients: HttpClients, company: str) -> str | None:
+        limiter = self.rate_limiters.get(PROVIDER_SEARCH_API)
+        await limiter.wait()
+        with StageTimer(PROVIDER_SEARCH_API) as timer:
+            try:
+                response = await clients.api.get(
+                    self.settings.search_api_url,
+                    params={'q': company},
+                    headers={'Authorization': f'Bearer {self.settings.search_api_key}'},
+                    timeout=self.settings.request_timeout_seconds,
+                )
+                limiter.record_response(response.status_code, response.headers.get('Retry-After'))
+                response.raise_for_status()
+                payload = response.json()
+                candidate = payload.get('website')
+                if isinstance(candidate, str) and candidate.startswith('http'):
+                    return candidate
+                timer.outcome = 'no_match'
+            except (httpx.HTTPError, ValueError, TypeError) as exc:
+                timer.outcome = error_outcome(exc)
+                if is_transient(exc):
+                    raise
+                return None
 
         return None
 
@@ -121,10 +452,22 @@ class WebsiteService:
             if any(host.endswith(excluded) for excluded in excluded_hosts):
                 return False
 
-            tokens = [token for token in company.lower().replace('&', ' ').split() if len(token) > 2]
+            tokens = [
+                token for token in canonicalize_company_name(company).split() if len(token) > 2 and token != 'and'
+            ]
             if not tokens:
                 return True
 
             return any(token in host for token in tokens)
         except Exception:
             return False
+
+
+def _header_size(response: httpx.Response) -> int:
+    # Approximate wire size of the status line and headers.
+    return 15 + len(response.reason_phrase) + sum(len(key) + len(value) + 4 for key, value in response.headers.raw)
+
+
+@lru_cache
+def get_probe_counters() -> ProbeCounters:
+    return ProbeCounters()
@@ -1,60 +1,144 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
 import csv
+import hashlib
 import io
-from collections import OrderedDict
+from typing import AsyncIterator, BinaryIO, Iterator
 
 from fastapi import HTTPException, UploadFile
 from openpyxl import load_workbook
 
-from app.utils.validators import normalize_company_name
+from app.utils.validators import canonicalize_company_name, clean_company_name
 
 ALLOWED_SUFFIXES = {'.csv', '.xlsx'}
 
-
-def _deduplicate_preserve_order(rows: list[str]) -> list[str]:
-    return list(OrderedDict.fromkeys(rows))
+CSV_READ_CHUNK_BYTES = 256 * 1024
+XLSX_ROWS_PER_BATCH = 2000
 
 
 async def load_company_names(file: UploadFile) -> list[str]:
-    suffix = None
-    if file.filename and '.' in file.filename:
-        suffix = file.filename[file.filename.rfind('.'):].lower()
+    return [name async for name in await open_company_name_stream(file)]
 
-    if suffix not in ALLOWED_SUFFIXES:
-        raise HTTPException(status_code=400, detail='Only .csv and .xlsx files are supported')
-
-    raw_bytes = await file.read()
-    if not raw_bytes:
-        raise HTTPException(status_code=400, detail='Uploaded file is empty')
 
-    if suffix == '.csv':
-        names = _parse_csv(raw_bytes)
-    else:
-        names = _parse_xlsx(raw_bytes)
+async def open_company_name_stream(file: UploadFile) -> AsyncIterator[str]:
+    suffix = _validated_suffix(file)
+    source = _detach_upload(file)
 
-    cleaned = [normalize_company_name(name) for name in names if name and normalize_company_name(name)]
-    deduped = _deduplicate_preserve_order(cleaned)
+    if await asyncio.to_thread(_is_empty, source):
+        source.close()
+        raise HTTPException(status_code=400, detail='Uploaded file is empty')
 
-    if not deduped:
+    names = _iter_unique_names(source, suffix)
+    first = await anext(names, None)
+    if first is None:
         raise HTTPException(status_code=400, detail='No valid company names found in first column')
 
-    return deduped
+    return _prepend(first, names)
 
 
-def _parse_csv(raw_bytes: bytes) -> list[str]:
-    decoded = raw_bytes.decode('utf-8-sig', errors='ignore')
-    reader = csv.reader(io.StringIO(decoded))
-    return [row[0] for row in reader if row and row[0] and row[0].strip()]
-
-
-def _parse_xlsx(raw_bytes: bytes) -> list[str]:
-    buffer = io.BytesIO(raw_bytes)
-    workbook = load_workbook(buffer, read_only=True, data_only=True)
-    sheet = workbook.active
-    rows: list[str] = []
+def _validated_suffix(file: UploadFile) -> str:
+    suffix = None
+    if file.filename and '.' in file.filename:
+        suffix = file.filename[file.filename.rfind('.'):].lower()
 
-    for row in sheet.iter_rows(min_col=1, max_col=1, values_only=True):
+    if suffix not in ALLOWED_SUFFIXES:
+        raise HTTPException(status_code=400, detail='Only .csv and .xlsx files are supported')
+    return suffix
+
+
+def _detach_upload(file: UploadFile) -> BinaryIO:
+    # FastAPI closes the request's UploadFiles as soon as the handler returns, while parsing
+    # carries on in the background. Take ownership of the spooled file and leave a stand-in.
+    source = file.file
+    file.file = io.BytesIO()
+    return source
+
+
+def _is_empty(source: BinaryIO) -> bool:
+    source.seek(0, io.SEEK_END)
+    empty = source.tell() == 0
+    source.seek(0)
+    return empty
+
+
+def name_fingerprint(key: str) -> int:
+    # 64-bit digests keep the dedup set a fraction of the size of the names themselves;
+    # a collision needs ~4 billion distinct names before it becomes likely.
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+async def _iter_unique_names(source: BinaryIO, suffix: str) -> AsyncIterator[str]:
+    seen: set[int] = set()
+    rows = _iter_csv_rows(source) if suffix == '.csv' else _iter_xlsx_rows(source)
+    try:
+        async for raw in rows:
+            # Duplicates are judged on the canonical key, but the first spelling seen is what's kept.
+            key = canonicalize_company_name(raw)
+            if not key:
+                continue
+            fingerprint = name_fingerprint(key)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            yield clean_company_name(raw)
+    finally:
+        await rows.aclose()
+        source.close()
+
+
+async def _prepend(first: str, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    yield first
+    async for name in rest:
+        yield name
+
+
+async def _iter_csv_rows(source: BinaryIO) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='ignore')
+    pending = ''
+    while True:
+        chunk = await asyncio.to_thread(source.read, CSV_READ_CHUNK_BYTES)
+        pending += decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            complete, pending = pending, ''
+        else:
+            cut = pending.rfind('\n') + 1
+            complete = pending[:cut]
+            if complete.count('"') % 2:
+                # A quoted field runs past the last newline; wait for the rest of it.
+                continue
+            pending = pending[cut:]
+
+        for value in _parse_csv(complete):
+            yield value
+
+        if not chunk:
+            return
+
+
+def _parse_csv(text: str) -> Iterator[str]:
+    reader = csv.reader(io.StringIO(text))
+    return (row[0] for row in reader if row and row[0] and row[0].strip())
+
+
+async def _iter_xlsx_rows(source: BinaryIO) -> AsyncIterator[str]:
+    workbook = await asyncio.to_thread(load_workbook, source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(min_col=1, max_col=1, values_only=True)
+        while True:
+            batch = await asyncio.to_thread(_next_xlsx_batch, rows)
+            if not batch:
+                return
+            for value in batch:
+                yield value
+    finally:
+        workbook.close()
+
+
+def _next_xlsx_batch(rows: Iterator[tuple]) -> list[str]:
+    batch: list[str] = []
+    for row in rows:
         if not row:
             continue
         value = row[0]
@@ -62,7 +146,7 @@ def _parse_xlsx(raw_bytes: bytes) -> list[str]:
             continue
         value_str = str(value).strip()
         if value_str:
-            rows.append(value_str)
-
-    workbook.close()
-    return rows
+            batch.append(value_str)
+        if len(batch) >= XLSX_ROWS_PER_BATCH:
+            break
+    return batch
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+import httpx
+
+from app.utils.tracing import current_trace
+
+# Minimal in-process Prometheus registry. Everything runs on the event loop thread, so
+# updates are plain attribute writes; label children are cached so the hot path is a dict
+# lookup plus an add.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Set around each company by the adaptive concurrency limiter so stage outcomes reach it.
+stage_outcome_listener: ContextVar[Callable[[str], None] | None] = ContextVar('stage_outcome_listener', default=None)
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric(ABC):
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+        if not labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> object: ...
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for values, child in self._children.items():
+            yield from self._render_child(_label_text(self.labelnames, values), child)
+
+    def _render_child(self, labels: str, child) -> Iterator[str]:
+        yield f'{self.name}{{{labels}}} {_number(child.value)}' if labels else f'{self.name} {_number(child.value)}'
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.buckets = buckets
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, labels: str, child: _HistogramChild) -> Iterator[str]:
+        prefix = f'{labels},' if labels else ''
+        cumulative = 0
+        for bound, count in zip(child.buckets, child.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{{prefix}le="{_number(bound)}"}} {cumulative}'
+        yield f'{self.name}_bucket{{{prefix}le="+Inf"}} {child.count}'
+        suffix = f'{{{labels}}}' if labels else ''
+        yield f'{self.name}_sum{suffix} {_number(child.sum)}'
+        yield f'{self.name}_count{suffix} {child.count}'
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = [line for metric in self._metrics.values() for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class StageTimer:
+    # `with StageTimer('serpapi') as timer: ...; timer.outcome = 'throttled'` records latency,
+    # the outcome and the in-flight gauge for one call of a pipeline stage.
+    __slots__ = ('stage', 'outcome', '_started')
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.outcome = 'ok'
+
+    def __enter__(self) -> StageTimer:
+        STAGE_IN_FLIGHT.labels(self.stage).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._started
+        STAGE_DURATION.labels(self.stage).observe(duration)
+        STAGE_IN_FLIGHT.labels(self.stage).dec()
+        if exc_type is not None:
+            self.outcome = 'cancelled' if issubclass(exc_type, asyncio.CancelledError) else 'error'
+        STAGE_OUTCOMES.labels(self.stage, self.outcome).inc()
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(self.stage, self._started, duration, self.outcome)
+        listener = stage_outcome_listener.get()
+        if listener is not None:
+            listener(self.outcome)
+
+
+def response_outcome(status_code: int) -> str:
+    if status_code in (429, 503):
+        return 'throttled'
+    if status_code >= 500:
+        return 'http_5xx'
+    if status_code >= 400:
+        return 'http_4xx'
+    return 'ok'
+
+
+def error_outcome(exc: BaseException) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return response_outcome(exc.response.status_code)
+    if isinstance(exc, (httpx.TimeoutException, asyncio.TimeoutError)):
+        return 'timeout'
+    if isinstance(exc, httpx.HTTPError):
+        return 'transport_error'
+    return 'bad_payload'
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'enrichment_stage_duration_seconds', 'Latency of one call of a pipeline stage.', ('stage',)
+)
+STAGE_OUTCOMES = REGISTRY.counter(
+    'enrichment_stage_outcomes_total', 'Finished pipeline stage calls by outcome.', ('stage', 'outcome')
+)
+STAGE_IN_FLIGHT = REGISTRY.gauge('enrichment_stage_in_flight', 'Pipeline stage calls currently running.', ('stage',))
+RATE_LIMITER_WAIT = REGISTRY.histogram(
+    'enrichment_rate_limiter_wait_seconds', 'Time spent waiting for a rate-limiter token.', ('provider',)
+)
+RATE_LIMITER_THROTTLES = REGISTRY.counter(
+    'enrichment_rate_limiter_throttles_total', '429/503 responses that slowed a provider down.', ('provider',)
+)
+CONCURRENCY_WAIT = REGISTRY.histogram(
+    'enrichment_concurrency_wait_seconds', 'Time a company waited for a processor concurrency slot.'
+)
+CONCURRENCY_LIMIT = REGISTRY.gauge('enrichment_concurrency_limit', 'Current adaptive limit on companies in flight.')
+CONCURRENCY_IN_FLIGHT = REGISTRY.gauge('enrichment_concurrency_in_flight', 'Companies currently holding a slot.')
+DOMAIN_PROBES_PER_LOOKUP = REGISTRY.histogram(
+    'enrichment_domain_probes_per_lookup', 'HTTP probes sent for one domain-guess lookup.', buckets=(0, 1, 2, 3, 4, 6)
+)
+DOMAIN_CANDIDATES_PRUNED = REGISTRY.counter(
+    'enrichment_domain_candidates_pruned_total', 'Domain guesses skipped for their low learned hit rate.', ('tld',)
+)
+DOMAIN_CANDIDATE_HIT_RATE = REGISTRY.gauge(
+    'enrichment_domain_candidate_hit_rate', 'Learned share of probes per TLD that found a live site.', ('tld',)
+)
+COMPANY_RETRIES = REGISTRY.counter('enrichment_company_retries_total', 'Company lookups retried after an error.')
+STAGE_RETRIES = REGISTRY.counter(
+    'enrichment_stage_retries_total', 'Provider calls retried after a transient failure.', ('stage',)
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    'enrichment_circuit_state', 'Circuit breaker state per provider (0 closed, 1 half-open, 2 open).', ('provider',)
+)
+COMPANIES_PROCESSED = REGISTRY.counter(
+    'enrichment_companies_processed_total', 'Companies finished, by result status.', ('status',)
+)
+SCHEDULER_QUEUE_DEPTH = REGISTRY.gauge('enrichment_scheduler_queue_depth', 'Work items queued across active jobs.')
+SCHEDULER_BUSY_WORKERS = REGISTRY.gauge('enrichment_scheduler_busy_workers', 'Scheduler workers handling an item.')
+SCHEDULER_ACTIVE_JOBS = REGISTRY.gauge('enrichment_scheduler_active_jobs', 'Jobs with a lane in the scheduler.')
+HTTP_POOL_ACTIVE_REQUESTS = REGISTRY.gauge(
+    'enrichment_http_pool_active_requests', 'Requests in flight per HTTP pool.', ('pool',)
+)
+HTTP_POOL_OPEN_CONNECTIONS = REGISTRY.gauge(
+    'enrichment_http_pool_open_connections', 'Open connections per HTTP pool.', ('pool',)
+)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+# Per-company span timelines for /job/{job_id}/profile. The processor sets `current_trace` for
+# the companies it samples; everything else leaves it unset, so an untraced stage call costs one
+# ContextVar lookup. Spans are plain tuples: (stage, start offset, duration, outcome), in seconds.
+
+# Backoff sleeps before another attempt are recorded as `<stage>_retry` spans.
+RETRY_SPAN_SUFFIX = '_retry'
+
+
+class CompanyTrace:
+    __slots__ = ('company', 'started', 'spans', 'max_spans', 'dropped_spans', 'duration', 'status')
+
+    def __init__(self, company: str, max_spans: int) -> None:
+        self.company = company
+        self.started = time.perf_counter()
+        self.spans: list[tuple[str, float, float, str]] = []
+        self.max_spans = max_spans
+        self.dropped_spans = 0
+        self.duration = 0.0
+        self.status = ''
+
+    def add(self, stage: str, started: float, duration: float, outcome: str = 'ok') -> None:
+        if len(self.spans) < self.max_spans:
+            self.spans.append((stage, started - self.started, duration, outcome))
+        else:
+            self.dropped_spans += 1
+
+    def finish(self, status: str) -> None:
+        self.duration = time.perf_counter() - self.started
+        self.status = status
+
+
+current_trace: ContextVar[CompanyTrace | None] = ContextVar('current_trace', default=None)
+
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'started')
+
+    def __init__(self, trace: CompanyTrace, stage: str) -> None:
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self) -> _Span:
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.trace.add(self.stage, self.started, time.perf_counter() - self.started, 'ok' if exc_type is None else 'error')
+
+
+_NO_SPAN = nullcontext()
+
+
+def trace_span(stage: str) -> _Span | nullcontext:
+    # `with trace_span('dns'): ...` times the block when the current company is traced.
+    trace = current_trace.get()
+    return _NO_SPAN if trace is None else _Span(trace, stage)
+
+
+def record_span(stage: str, started: float, duration: float, outcome: str = 'ok') -> None:
+    # For spans measured anyway (metrics timers, known sleeps); `started` is a perf_counter value.
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, started, duration, outcome)
@@ -1,11 +1,40 @@
 import re
+import unicodedata
 
 EMAIL_REGEX = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
 PHONE_REGEX = re.compile(r'^\+?[1-9]\d{7,14}$')
 
+# Canonicalization: marks left over from NFKD, characters dropped inside words (A.B.C., O'Neil),
+# and everything else that isn't a letter or digit, which becomes a word break.
+_COMBINING_MARKS_REGEX = re.compile(r'[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+_JOINER_REGEX = re.compile(r"[.'\u2019`]")
+# Vowel signs and other marks (Devanagari, Tamil, ...) are part of a word even though \\w skips them.
+_MARK_CHARS = ''.join(chr(code) for code in range(0x10000) if unicodedata.category(chr(code)).startswith('M'))
+_SEPARATOR_REGEX = re.compile(f'(?:[^\\w{re.escape(_MARK_CHARS)}]|_)+')
+LEGAL_SUFFIXES = frozenset({
+    'pvt', 'private', 'ltd', 'limited', 'inc', 'incorporated', 'llp', 'llc', 'corp', 'corporation',
+    'co', 'company', 'plc', 'gmbh', 'pte', 'opc',
+})
 
-def normalize_company_name(value: str) -> str:
-    return value.strip().lower()
+
+def clean_company_name(value: str) -> str:
+    # Display form: the original spelling with whitespace collapsed.
+    return ' '.join(value.split())
+
+
+def canonicalize_company_name(value: str) -> str:
+    # Lookup/dedup key: 'Acme Pvt. Ltd.', 'ACME Private Limited' and 'acme pvt ltd' all become 'acme'.
+    text = _COMBINING_MARKS_REGEX.sub('', unicodedata.normalize('NFKD', value)).casefold()
+    text = _SEPARATOR_REGEX.sub(' ', _JOINER_REGEX.sub('', text.replace('&', ' and ')))
+    tokens = text.split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+        # 'Acme & Co', 'Acme and Company Ltd': the joining word goes with the suffix.
+        if len(tokens) > 1 and tokens[-1] == 'and':
+            tokens.pop()
+    key = ' '.join(tokens)
+    # Put non-Latin scripts back into composed form so slugs stay valid IDN labels.
+    return key if key.isascii() else unicodedata.normalize('NFC', key)
 
 
 def is_valid_email(email: str | None) -> bool:
@@ -0,0 +1,78 @@
+"""Compare the memory held by a job's results as pydantic objects vs CompactResultStore.
+
+    cd company_enrichment_system
+    python -m benchmarks.result_memory --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Callable
+
+from app.jobs.result_store import CompactResultStore
+from app.models import CompanyResult
+
+SOURCES = ['domain_guess', 'serpapi', 'search_api', 'google_places', None]
+
+
+def make_result(index: int, rng: random.Random) -> CompanyResult:
+    name = f'company {index} pvt ltd'
+    roll = rng.random()
+    if roll < 0.6:
+        return CompanyResult(
+            company=name,
+            website=f'https://company{index}.com',
+            website_found=True,
+            source=rng.choice(SOURCES[:3]),
+        )
+    if roll < 0.8:
+        return CompanyResult(
+            company=name,
+            phone=f'+9198{index:08d}',
+            phone_found=True,
+            email=f'info@company{index}.in' if rng.random() < 0.3 else None,
+            email_found=rng.random() < 0.3,
+            source='google_places',
+        )
+    return CompanyResult(company=name, source=None, status='FAILED')
+
+
+def measure(label: str, rows: int, build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<24} {current / rows:>8.1f} B/row  {current / 2**20:>9.1f} MiB held  {peak / 2**20:>9.1f} MiB peak')
+    del container
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    def as_models() -> list[CompanyResult]:
+        rng = random.Random(args.seed)
+        return [make_result(index, rng) for index in range(args.rows)]
+
+    def as_compact() -> CompactResultStore:
+        rng = random.Random(args.seed)
+        store = CompactResultStore()
+        for index in range(args.rows):
+            store.append(make_result(index, rng))
+        return store
+
+    print(f'{args.rows:,} results')
+    models = measure('list[CompanyResult]', args.rows, as_models)
+    compact = measure('CompactResultStore', args.rows, as_compact)
+    print(f'compact store uses {compact / models:.1%} of the pydantic list')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""Offline throughput benchmark: the real JobProcessor pipeline against a simulated internet.
+
+    cd company_enrichment_system
+    python -m benchmarks.throughput --sizes 100,1000,10000 --output throughput.json
+    python -m benchmarks.throughput --sizes 1000 --baseline throughput.json
+
+Every HTTP request goes through httpx.MockTransport, which adds lognormal latency and
+injects DNS failures, timeouts and 429s at the configured rates. Each job size runs in a
+fresh process so peak RSS is measured per size.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import time
+from array import array
+from dataclasses import asdict, dataclass
+
+import httpx
+
+from app.config import Settings
+from app.jobs.job_manager import JobManager
+from app.jobs.processor import JobProcessor
+from app.jobs.scheduler import JobScheduler
+from app.services.candidate_stats import CandidateStats
+from app.services.concurrency import build_concurrency_limiter, concurrency_bounds
+from app.services.http_client import HttpClients
+from app.services.profiler import JobProfiler
+from app.services.rate_limiter import RateLimiterRegistry
+from app.services.resilience import CircuitBreakerRegistry
+from app.services.singleflight import SingleFlight
+from app.services.website_service import ProbeCounters
+from app.utils.validators import canonicalize_company_name
+
+SERPAPI_HOST = 'serpapi.com'
+PLACES_HOST = 'maps.googleapis.com'
+
+
+@dataclass
+class Scenario:
+    latency_median_ms: float = 40.0
+    latency_sigma: float = 0.6
+    # Share of companies whose website answers on .com / .in, or is only found via search.
+    com_share: float = 0.45
+    in_share: float = 0.15
+    search_share: float = 0.15
+    # Share of the remaining companies that Places knows a phone number for.
+    places_share: float = 0.5
+    dns_failure_rate: float = 0.9
+    timeout_rate: float = 0.01
+    timeout_seconds: float = 0.5
+    throttle_rate: float = 0.01
+    seed: int = 1
+
+
+class SimulatedInternet:
+    # Company fates are a pure function of the domain slug, so runs are reproducible; only
+    # latency, timeouts and 429s are random (and seeded).
+
+    def __init__(self, scenario: Scenario) -> None:
+        self.scenario = scenario
+        self.rng = random.Random(scenario.seed)
+        self._mu = math.log(scenario.latency_median_ms / 1000)
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        scenario = self.scenario
+        await asyncio.sleep(self.rng.lognormvariate(self._mu, scenario.latency_sigma))
+        if self.rng.random() < scenario.timeout_rate:
+            await asyncio.sleep(scenario.timeout_seconds)
+            raise httpx.ReadTimeout('simulated timeout', request=request)
+
+        host = request.url.host
+        if host == SERPAPI_HOST:
+            return self._throttled() or self._serpapi(request)
+        if host == PLACES_HOST:
+            return self._throttled() or self._places(request)
+        return self._website(request, host)
+
+    def _throttled(self) -> httpx.Response | None:
+        if self.rng.random() < self.scenario.throttle_rate:
+            return httpx.Response(429, headers={'Retry-After': '1'})
+        return None
+
+    def _website(self, request: httpx.Request, host: str) -> httpx.Response:
+        slug, _, tld = host.partition('.')
+        fate = self._fate(slug)
+        if host.endswith('-group.com') or (tld in ('com', 'in') and fate == tld):
+            return httpx.Response(200, headers={'Content-Length': '0'})
+        if self._roll(slug, tld) < self.scenario.dns_failure_rate:
+            raise httpx.ConnectError('[Errno -2] Name or service not known', request=request)
+        return httpx.Response(404)
+
+    def _serpapi(self, request: httpx.Request) -> httpx.Response:
+        slug = canonicalize_company_name(request.url.params['q'].removesuffix(' official website')).replace(' ', '')
+        results = [{'link': 'https://www.linkedin.com/company/' + slug}]
+        if self._fate(slug) == 'search':
+            results.append({'link': f'https://{slug}-group.com/'})
+        return httpx.Response(200, json={'organic_results': results})
+
+    def _places(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith('/textsearch/json'):
+            slug = canonicalize_company_name(request.url.params['query']).replace(' ', '')
+            known = self._roll(slug, 'places') < self.scenario.places_share
+            return httpx.Response(200, json={'results': [{'place_id': slug}] if known else []})
+        return httpx.Response(200, json={'result': {'international_phone_number': '+91 98765 43210'}})
+
+    def _fate(self, slug: str) -> str:
+        roll = self._roll(slug, 'fate')
+        scenario = self.scenario
+        for fate, share in (('com', scenario.com_share), ('in', scenario.in_share), ('search', scenario.search_share)):
+            if roll < share:
+                return fate
+            roll -= share
+        return 'none'
+
+    def _roll(self, *parts: str) -> float:
+        digest = hashlib.blake2b('|'.join((str(self.scenario.seed), *parts)).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') / 2**64
+
+
+class TimedProcessor(JobProcessor):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.latencies = array('d')
+
+    async def _process_company(self, job_id: str, company: str, input_position: int | None = None) -> None:
+        started = time.perf_counter()
+        try:
+            await super()._process_company(job_id, company, input_position)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def run_size(size: int, scenario: Scenario, overrides: dict) -> dict:
+    return asyncio.run(_run_size(size, scenario, overrides))
+
+
+async def _run_size(size: int, scenario: Scenario, overrides: dict) -> dict:
+    settings = Settings(
+        serpapi_api_key='benchmark',
+        google_places_api_key='benchmark',
+        dns_prefilter_enabled=False,
+        cache_enabled=False,
+        job_store_path=None,
+        request_timeout_seconds=scenario.timeout_seconds,
+        **overrides,
+    )
+    internet = SimulatedInternet(scenario)
+    http_clients = HttpClients(settings, transport=httpx.MockTransport(internet))
+    workers = settings.scheduler_workers or concurrency_bounds(settings)[1]
+    scheduler = JobScheduler(workers=workers, queue_size=settings.batch_size)
+    limiter = build_concurrency_limiter(settings)
+    manager = JobManager()
+    probe_counters = ProbeCounters()
+    candidate_stats = CandidateStats(settings)
+    profiler = JobProfiler(settings)
+    processor = TimedProcessor(
+        settings,
+        manager,
+        rate_limiters=RateLimiterRegistry(settings),
+        scheduler=scheduler,
+        probe_counters=probe_counters,
+        http_clients=http_clients,
+        singleflight=SingleFlight(),
+        concurrency_limiter=limiter,
+        breakers=CircuitBreakerRegistry(settings),
+        candidate_stats=candidate_stats,
+        profiler=profiler,
+    )
+
+    companies = (f'Benchmark Company {index} Pvt Ltd' for index in range(size))
+    metadata = await manager.create_job()
+    await manager.set_total(metadata.job_id, size, ingest_complete=True)
+    await scheduler.start()
+    started = time.perf_counter()
+    await processor.start(metadata.job_id, companies)
+    elapsed = time.perf_counter() - started
+    await scheduler.stop()
+    await http_clients.close()
+
+    job = await manager.get_job(metadata.job_id)
+    latencies = sorted(processor.latencies)
+    profile = profiler.get(metadata.job_id)
+    return {
+        'size': size,
+        'status': job.metadata.status.value,
+        'processed': job.metadata.processed,
+        'success_count': job.metadata.success_count,
+        'failure_count': job.metadata.failure_count,
+        'websites_found': sum(1 for result in job.results if result.website_found),
+        'http_requests': internet.requests,
+        'probes_per_lookup': probe_counters.stats().avg_probes_per_lookup,
+        'candidates_pruned': candidate_stats.candidates_pruned,
+        'final_concurrency_limit': limiter.limit,
+        'elapsed_seconds': round(elapsed, 3),
+        'companies_per_second': round(size / elapsed, 2),
+        'latency_ms': {
+            name: round(_percentile(latencies, q) * 1000, 2) for name, q in (('p50', 50), ('p95', 95), ('p99', 99))
+        },
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        'stage_ms': {stage.stage: stage.total_ms for stage in profile.report(metadata.job_id, 0).stages} if profile else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10), 1),
+    }
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def compare(runs: list[dict], baseline_path: str, tolerance: float) -> list[str]:
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = {run['size']: run for run in json.load(handle)['runs']}
+    regressions = []
+    for run in runs:
+        before = baseline.get(run['size'])
+        if before and run['companies_per_second'] < before['companies_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"size {run['size']}: {run['companies_per_second']} companies/s vs {before['companies_per_second']} baseline"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000', help='comma-separated job sizes')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON from an earlier run; exit 1 when throughput regresses')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed throughput drop against the baseline')
+    parser.add_argument('--max-concurrency', type=int, default=100, help='starting (or, with --fixed-concurrency, fixed) limit')
+    parser.add_argument('--concurrency-ceiling', type=int, default=400)
+    parser.add_argument('--fixed-concurrency', action='store_true', help='disable adaptive concurrency')
+    parser.add_argument('--fixed-candidate-order', action='store_true', help='disable learned domain-candidate ordering')
+    parser.add_argument('--profile', action='store_true', help='trace every company and report time per stage')
+    parser.add_argument('--rate-per-second', type=int, default=10_000, help='rate limit for every provider')
+    for name, default in asdict(Scenario()).items():
+        parser.add_argument(f'--{name.replace("_", "-")}', type=type(default), default=default)
+    args = parser.parse_args()
+
+    scenario = Scenario(**{name: getattr(args, name) for name in asdict(Scenario())})
+    overrides = {
+        'max_concurrency': args.max_concurrency,
+        'adaptive_concurrency_enabled': not args.fixed_concurrency,
+        'concurrency_ceiling': args.concurrency_ceiling,
+        'candidate_ordering_enabled': not args.fixed_candidate_order,
+        'profiling_enabled': args.profile,
+        'rate_limit_per_second': args.rate_per_second,
+        'rate_limit_burst': args.rate_per_second,
+    }
+    runs = []
+    context = multiprocessing.get_context('spawn')
+    for size in (int(value) for value in args.sizes.split(',')):
+        with context.Pool(1) as pool:
+            run = pool.apply(run_size, (size, scenario, overrides))
+        runs.append(run)
+        print(
+            f"{run['size']:>9,} companies  {run['companies_per_second']:>9.1f}/s  "
+            f"p50 {run['latency_ms']['p50']:>8.1f} ms  p95 {run['latency_ms']['p95']:>8.1f} ms  "
+            f"p99 {run['latency_ms']['p99']:>8.1f} ms  probes/lookup {run['probes_per_lookup']:>5.2f}  peak RSS {run['peak_rss_mb']:>7.1f} MiB  {run['status']}"
+        )
+        for stage, total_ms in (run['stage_ms'] or {}).items():
+            print(f'    {stage:<28} {total_ms / 1000:>10.1f} s')
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenario': asdict(scenario),
+        'settings': overrides,
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        regressions = compare(runs, args.baseline, args.tolerance)
+        for line in regressions:
+            print('REGRESSION', line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
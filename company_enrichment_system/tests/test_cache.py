@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.config import Settings
+from app.models import DomainLookupResult
+from app.services.cache import EnrichmentCache
+
+
+def test_close_releases_the_connection_and_a_later_lookup_reopens_it(tmp_path) -> None:
+    cache = EnrichmentCache(Settings(candidate_stats_path=None, cache_path=str(tmp_path / 'cache.sqlite3')))
+    found = DomainLookupResult(website_found=True, website_url='https://acme.example', source='domain_guess')
+
+    async def scenario() -> tuple[bool, DomainLookupResult | None]:
+        await cache.set_domain('Acme Pvt Ltd', found)
+        cache.close()
+        closed = cache._conn is None
+        return closed, await cache.get_domain('ACME')
+
+    closed, cached = asyncio.run(scenario())
+    cache.close()
+    assert closed
+    assert cached == found
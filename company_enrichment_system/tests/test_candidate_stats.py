@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import os
+
+from app.config import Settings
+from app.services.candidate_stats import ALL_SHAPES, CandidateStats
+
+
+def _settings(**overrides) -> Settings:
+    return Settings(**{'candidate_stats_path': None, 'candidate_max_samples': 10_000, **overrides})
+
+
+def _stats(path: str, **overrides) -> CandidateStats:
+    stats = CandidateStats(_settings(**overrides), path=path)
+    stats.load()
+    return stats
+
+
+def _record(stats: CandidateStats, hits: int, misses: int) -> None:
+    for hit in [True] * hits + [False] * misses:
+        stats.record_probe('w1-short', '.com', hit)
+    stats.record_outcome('w1-short', '.com')
+
+
+def _tally(stats: CandidateStats, shape: str = ALL_SHAPES) -> tuple[int, int]:
+    return tuple(stats._patterns[shape]['.com'])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    stats = _stats(path)
+    _record(stats, hits=3, misses=2)
+    stats.save()
+
+    loaded = _stats(path)
+    assert _tally(loaded) == (5, 3)
+    assert _tally(loaded, 'w1-short') == (5, 3)
+    assert loaded.stats().outcomes == {'.com': 1}
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_save_without_changes_leaves_the_file_alone(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    _stats(path).save()
+    assert not os.path.exists(path)
+
+
+def test_saves_from_two_instances_add_up(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    first, second = _stats(path), _stats(path)
+    _record(first, hits=1, misses=1)
+    _record(second, hits=2, misses=0)
+    first.save()
+    second.save()
+    # The second save merges the first one's counts in, and learns them itself.
+    assert _tally(second) == (4, 3)
+    _record(first, hits=0, misses=1)
+    first.save()
+
+    assert _tally(_stats(path)) == (5, 3)
+    assert _stats(path).stats().outcomes == {'.com': 3}
+
+
+def test_merge_halves_past_max_samples(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    first, second = _stats(path, candidate_max_samples=10), _stats(path, candidate_max_samples=10)
+    _record(first, hits=8, misses=0)
+    _record(second, hits=0, misses=8)
+    first.save()
+    second.save()
+    assert _tally(_stats(path)) == (8, 4)
+
+
+def test_damaged_file_is_ignored_and_replaced(tmp_path):
+    path = tmp_path / 'stats.json'
+    path.write_text('{"version": 1, "patterns": {"*": {".com": [2, ')
+    stats = _stats(str(path))
+    assert stats._patterns == {}
+    _record(stats, hits=1, misses=0)
+    stats.save()
+    assert json.loads(path.read_text())['patterns'][ALL_SHAPES]['.com'] == [1, 1]
+
+
+def test_invalid_tallies_are_dropped(tmp_path):
+    path = tmp_path / 'stats.json'
+    payload = {'version': 1, 'patterns': {ALL_SHAPES: {'.com': [1, 2], '.in': [4, 1], '.xyz': [3, 3]}}, 'outcomes': {}}
+    path.write_text(json.dumps(payload))
+    assert _stats(str(path))._patterns == {ALL_SHAPES: {'.in': [4, 1]}}
+
+
+def test_failed_save_keeps_the_changes(tmp_path):
+    path = tmp_path / 'missing' / 'stats.json'
+    stats = _stats(str(path))
+    _record(stats, hits=1, misses=0)
+    stats.save()
+    path.parent.mkdir()
+    stats.save()
+    assert _tally(_stats(str(path))) == (1, 1)
+
+
+def _worker(path: str, hits: int) -> None:
+    stats = _stats(path)
+    for _ in range(20):
+        _record(stats, hits=hits, misses=1)
+        stats.save()
+
+
+def test_concurrent_processes_lose_no_counts(tmp_path):
+    path = str(tmp_path / 'stats.json')
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_worker, args=(path, hits)) for hits in (1, 2, 3, 4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    # 20 rounds per worker of (hits + 1) probes each
+    assert _tally(_stats(path)) == (20 * (2 + 3 + 4 + 5), 20 * (1 + 2 + 3 + 4))
+    assert _stats(path).stats().outcomes == {'.com': 80}
+
+
+def test_periodic_save_keeps_counts_recorded_meanwhile(tmp_path):
+    path = str(tmp_path / 'stats.json')
+
+    async def scenario() -> CandidateStats:
+        stats = _stats(path, candidate_stats_save_interval_seconds=0.001)
+        await asyncio.sleep(0.01)
+        _record(stats, hits=1, misses=0)  # starts a save in a thread
+        stats.record_probe('w1-short', '.com', False)
+        for _ in range(100):
+            if not os.path.exists(path):
+                await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert _tally(stats) == (2, 1)
+    assert _tally(_stats(path)) == (1, 1)
+    stats.save()
+    assert _tally(_stats(path)) == (2, 1)
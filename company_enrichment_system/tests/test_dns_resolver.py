@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.config import Settings
+from app.services.dns_resolver import DnsResolver
+
+
+def test_close_shuts_the_pool_down_and_a_later_lookup_starts_a_new_one() -> None:
+    resolver = DnsResolver(Settings(candidate_stats_path=None))
+
+    async def scenario() -> tuple[bool | None, bool, bool | None]:
+        first = await resolver.resolves('127.0.0.1')
+        executor = resolver._executor
+        resolver.close()
+        closed = resolver._executor is None and executor._shutdown
+        return first, closed, await resolver.resolves('localhost')
+
+    first, closed, second = asyncio.run(scenario())
+    resolver.close()
+    assert first is True
+    assert closed
+    assert second is True
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.jobs.job_manager import RESULT_COLUMNS, JobManager
+from app.models import CompanyResult, JobStatus
+from app.routers import jobs as jobs_router
+
+
+@pytest.fixture
+def running_job(monkeypatch: pytest.MonkeyPatch) -> tuple[TestClient, JobManager, str]:
+    # A job with 5 of its 8 companies done, still PROCESSING.
+    manager = JobManager()
+
+    async def setup() -> str:
+        metadata = await manager.create_job([f'Company {index}' for index in range(8)])
+        await manager.set_status(metadata.job_id, JobStatus.PROCESSING)
+        for index in range(5):
+            await manager.append_result(metadata.job_id, CompanyResult(company=f'Company {index}'))
+        return metadata.job_id
+
+    job_id = asyncio.run(setup())
+    monkeypatch.setattr(jobs_router, 'job_manager', manager)
+    app = FastAPI()
+    app.include_router(jobs_router.router)
+    return TestClient(app), manager, job_id
+
+
+def _companies(response) -> list[str]:
+    if response.headers['content-type'].startswith('application/x-ndjson'):
+        return [json.loads(line)['company'] for line in response.text.splitlines()]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    if rows and rows[0] == RESULT_COLUMNS:
+        rows = rows[1:]
+    return [row[0] for row in rows]
+
+
+def test_running_job_download_reports_where_to_resume(running_job) -> None:
+    client, _, job_id = running_job
+    response = client.get(f'/download/{job_id}')
+    assert response.status_code == 200
+    assert response.headers['X-Job-Status'] == 'PROCESSING'
+    assert response.headers['X-Next-Offset'] == '5'
+    assert response.text.splitlines()[0] == ','.join(RESULT_COLUMNS)
+    assert _companies(response) == [f'Company {index}' for index in range(5)]
+
+
+@pytest.mark.parametrize(
+    ('query', 'expected', 'next_offset'),
+    [
+        ('offset=1&limit=2', [1, 2], '3'),
+        ('offset=3', [3, 4], '5'),
+        ('offset=4&limit=10', [4], '5'),
+        ('offset=5', [], '5'),
+        ('offset=9&limit=2', [], '5'),
+    ],
+)
+def test_offset_and_limit_window(running_job, query: str, expected: list[int], next_offset: str) -> None:
+    client, _, job_id = running_job
+    response = client.get(f'/download/{job_id}?format=ndjson&{query}')
+    assert response.headers['X-Next-Offset'] == next_offset
+    assert _companies(response) == [f'Company {index}' for index in expected]
+
+
+def test_csv_tail_has_no_header(running_job) -> None:
+    client, _, job_id = running_job
+    response = client.get(f'/download/{job_id}?offset=3')
+    assert _companies(response) == ['Company 3', 'Company 4']
+    assert not response.text.startswith('company,')
+
+
+def test_tailing_picks_up_new_rows_until_the_job_finishes(running_job) -> None:
+    client, manager, job_id = running_job
+    first = client.get(f'/download/{job_id}?format=ndjson')
+    offset = first.headers['X-Next-Offset']
+
+    async def finish() -> None:
+        for index in range(5, 8):
+            await manager.append_result(job_id, CompanyResult(company=f'Company {index}'))
+        await manager.finish(job_id, JobStatus.COMPLETED)
+
+    asyncio.run(finish())
+    second = client.get(f'/download/{job_id}?format=ndjson&offset={offset}')
+    assert second.headers['X-Job-Status'] == 'COMPLETED'
+    assert second.headers['X-Next-Offset'] == '8'
+    assert _companies(first) + _companies(second) == [f'Company {index}' for index in range(8)]
+
+
+def test_unknown_job_and_bad_window_are_rejected(running_job) -> None:
+    client, _, job_id = running_job
+    assert client.get('/download/missing').status_code == 404
+    assert client.get(f'/download/{job_id}?offset=-1').status_code == 422
+    assert client.get(f'/download/{job_id}?limit=0').status_code == 422
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app.jobs.events import iter_job_events
+from app.jobs.job_manager import JobManager
+from app.models import CompanyResult, JobStatus
+
+# Characters str.splitlines() breaks on but the NDJSON writer leaves inside a row
+ODD_NAMES = ['Acme Labs', 'Nel\x85son', 'Line\u2028Break', 'Para\u2029Graph', 'Plain']
+
+
+def _events(payload: bytes) -> list[tuple[str, str | None, list[str]]]:
+    events = []
+    for block in payload.decode('utf-8').split('\n\n'):
+        name, event_id, data = None, None, []
+        for line in block.split('\n'):
+            field, _, value = line.partition(': ')
+            if field == 'event':
+                name = value
+            elif field == 'id':
+                event_id = value
+            elif field == 'data':
+                data.append(value)
+        if name is not None:
+            events.append((name, event_id, data))
+    return events
+
+
+def _stream(companies: list[str], offset: int = 0) -> list[tuple[str, str | None, list[str]]]:
+    async def scenario() -> bytes:
+        manager = JobManager()
+        metadata = await manager.create_job(companies)
+        for company in companies:
+            await manager.append_result(metadata.job_id, CompanyResult(company=company, status='SUCCESS'))
+        await manager.finish(metadata.job_id, JobStatus.COMPLETED)
+        chunks = []
+        async for chunk in iter_job_events(manager, metadata.job_id, True, offset, 0, 1, 100):
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    return _events(asyncio.run(scenario()))
+
+
+def test_row_offsets_count_rows_not_unicode_line_breaks() -> None:
+    rows = [event for event in _stream(ODD_NAMES) if event[0] == 'rows']
+    assert rows[-1][1] == str(len(ODD_NAMES))
+    sent = [json.loads(line)['company'] for _, _, data in rows for line in data]
+    assert sent == ODD_NAMES
+
+
+def test_resume_from_an_offset_sends_only_the_later_rows() -> None:
+    rows = [event for event in _stream(ODD_NAMES, offset=2) if event[0] == 'rows']
+    assert rows[-1][1] == str(len(ODD_NAMES))
+    assert [json.loads(line)['company'] for _, _, data in rows for line in data] == ODD_NAMES[2:]
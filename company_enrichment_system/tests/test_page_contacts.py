@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import Settings
+from app.services.http_client import HttpClients
+from app.services.page_contacts import _CHUNK_MARGIN, PageContactExtractor, _PageScanner
+
+
+def _feed_split(page: str, split_at: int) -> _PageScanner:
+    scanner = _PageScanner()
+    scanner.feed(page[:split_at])
+    scanner.feed(page[split_at:], final=True)
+    return scanner
+
+
+@pytest.mark.parametrize('offset', range(-4, 16))
+def test_phone_across_the_chunk_margin_is_read_whole(offset: int) -> None:
+    filler = 'x ' * 200
+    page = f'<p>{filler}Call +91 98765 43210 today</p>' + 'y' * 300
+    # Put the split so the number straddles the end of the first chunk's scan window.
+    start = page.index('+91')
+    scanner = _feed_split(page, start + _CHUNK_MARGIN + offset)
+    assert scanner.text_phone == '+91 98765 43210'
+
+
+@pytest.mark.parametrize('offset', range(-4, 18))
+def test_email_across_the_chunk_margin_is_read_whole(offset: int) -> None:
+    page = '<p>' + 'x ' * 200 + 'Write to info@acmecorp.com now</p>' + 'y' * 300
+    start = page.index('info@')
+    scanner = _feed_split(page, start + _CHUNK_MARGIN + offset)
+    assert scanner.text_email == 'info@acmecorp.com'
+
+
+def test_match_split_across_chunks_is_found() -> None:
+    page = '<a href="mailto:sales@acme.com">mail</a> <a href="tel:+14155550123">call</a>'
+    for split_at in range(1, len(page)):
+        scanner = _feed_split(page, split_at)
+        assert scanner.link_email == 'sales@acme.com', split_at
+        assert scanner.link_phone == '+14155550123', split_at
+
+
+def test_contact_page_link_is_found_across_chunks() -> None:
+    page = 'z' * 400 + '<a href="/contact-us">Contact</a>' + 'z' * 400
+    for split_at in range(350, 500, 7):
+        assert _feed_split(page, split_at).contact_href == '/contact-us'
+
+
+def test_first_match_wins_over_later_chunks() -> None:
+    scanner = _PageScanner()
+    scanner.feed('hello first@acme.com ' + 'p' * 200)
+    scanner.feed('second@acme.com', final=True)
+    assert scanner.text_email == 'first@acme.com'
+
+
+def _extract_capped(page: str, cut: int) -> tuple[str | None, str | None]:
+    settings = Settings(
+        candidate_stats_path=None,
+        page_contacts_max_bytes=cut,
+        page_contacts_follow_contact_page=False,
+        rate_limit_per_second=10_000,
+        rate_limit_burst=10_000,
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=page.encode(), headers={'Content-Type': 'text/html'})
+
+    async def scenario() -> tuple[str | None, str | None]:
+        clients = HttpClients(settings, transport=httpx.MockTransport(handler))
+        await clients.start()
+        try:
+            result = await PageContactExtractor(settings).extract(clients, 'https://acme.example/')
+        finally:
+            await clients.close()
+        return result.phone, result.email
+
+    return asyncio.run(scenario())
+
+
+def test_byte_cap_inside_a_phone_does_not_accept_the_cut_number() -> None:
+    page = '<p>' + 'x ' * 600 + 'Call +91 98765 43210 today</p>'
+    phone, _ = _extract_capped(page, page.index('+91') + len('+91 98765 43'))
+    assert phone is None
+
+
+def test_byte_cap_inside_an_email_does_not_accept_the_cut_address() -> None:
+    page = '<p>' + 'x ' * 600 + 'Write to x@acme.com now</p>'
+    _, email = _extract_capped(page, page.index('x@acme') + len('x@acme.co'))
+    assert email is None
+
+
+def test_contacts_well_before_the_byte_cap_are_found() -> None:
+    page = '<p>Call +91 98765 43210 or write to info@acme.com</p>' + 'x ' * 1000
+    assert _extract_capped(page, 1024) == ('+91 98765 43210', 'info@acme.com')
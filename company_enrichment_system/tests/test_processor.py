@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from app.jobs.processor import JobProcessor
+from app.models import ContactLookupResult, DomainLookupResult
+
+
+def _website(checked_at: float | None) -> DomainLookupResult:
+    return DomainLookupResult(website_found=True, website_url='https://acme.example', source='domain_guess', checked_at=checked_at)
+
+
+def _contact(checked_at: float | None) -> ContactLookupResult:
+    return ContactLookupResult(phone='+919876543210', phone_found=True, source='google_places', checked_at=checked_at)
+
+
+def test_row_is_as_old_as_its_oldest_lookup():
+    result = JobProcessor._build_result('Acme', _website(200.0), _contact(100.0))
+    assert result.enriched_at == 100.0
+    assert JobProcessor._build_result('Acme', _website(200.0), None).enriched_at == 200.0
+
+
+def test_undated_lookup_leaves_the_row_undated():
+    # Cache entries written before lookups carried checked_at must not pass as fresh.
+    assert JobProcessor._build_result('Acme', _website(None), None).enriched_at is None
+    assert JobProcessor._build_result('Acme', _website(200.0), _contact(None)).enriched_at is None
+    assert JobProcessor._build_result('Acme', _website(None), _contact(100.0)).enriched_at is None
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import Settings
+from app.services.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    StageFailedError,
+)
+
+
+def _breaker(**overrides) -> CircuitBreaker:
+    options = dict(failure_rate_threshold=0.5, window_size=4, min_calls=4, open_seconds=60.0, half_open_max_calls=2)
+    options.update(overrides)
+    return CircuitBreaker('test', **options)
+
+
+def _call(breaker: CircuitBreaker, ok: bool) -> None:
+    breaker.before_call()
+    if ok:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+
+def test_opens_once_the_window_failure_rate_reaches_the_threshold() -> None:
+    breaker = _breaker()
+    for ok in (True, False, True):
+        _call(breaker, ok)
+    assert breaker.state == CLOSED  # only 3 of min_calls=4 seen
+    _call(breaker, False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.rejected_calls == 1
+
+
+def test_half_open_trials_close_or_reopen() -> None:
+    breaker = _breaker(open_seconds=0.0)
+    for _ in range(4):
+        _call(breaker, False)
+    assert breaker.state == OPEN
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # both trial slots are taken
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+    for _ in range(4):
+        _call(breaker, False)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    breaker.record_failure()  # a failed trial re-opens at once
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 3
+
+
+def test_abandoned_half_open_trial_gives_its_slot_back() -> None:
+    breaker = _breaker(open_seconds=0.0, half_open_max_calls=1)
+    for _ in range(4):
+        _call(breaker, False)
+    breaker.before_call()
+    breaker.record_abandoned()
+    breaker.before_call()  # would raise if the cancelled trial still held the slot
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_call_retries_transient_failures_then_gives_up() -> None:
+    settings = Settings(stage_max_attempts=3, stage_retry_base_delay_seconds=0, circuit_min_calls=100)
+    registry = CircuitBreakerRegistry(settings)
+    attempts = 0
+
+    async def flaky() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise httpx.ReadTimeout('slow')
+        return 'ok'
+
+    assert asyncio.run(registry.call('serpapi', flaky)) == 'ok'
+    assert attempts == 3
+
+    async def down() -> str:
+        raise httpx.ConnectError('refused')
+
+    with pytest.raises(StageFailedError):
+        asyncio.run(registry.call('serpapi', down))
+
+
+def test_non_transient_errors_are_not_retried() -> None:
+    registry = CircuitBreakerRegistry(Settings(stage_retry_base_delay_seconds=0))
+    attempts = 0
+
+    async def bad_payload() -> str:
+        nonlocal attempts
+        attempts += 1
+        raise ValueError('not json')
+
+    with pytest.raises(ValueError):
+        asyncio.run(registry.call('serpapi', bad_payload))
+    assert attempts == 1
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+
+from app.jobs import job_manager as job_manager_module
+from app.jobs.job_manager import RESULT_COLUMNS, JobManager
+from app.jobs.result_store import CompactResultStore
+from app.models import CompanyResult, ExportFormat
+
+ROWS = [
+    CompanyResult(
+        company='Acme',
+        website='https://acme.example',
+        website_found=True,
+        phone='+919876543210',
+        phone_found=True,
+        email='info@acme.example',
+        email_found=True,
+        source='domain_guess',
+        enriched_at=1_700_000_000.5,
+    ),
+    # Missing values stay None; empty strings stay empty.
+    CompanyResult(company='Blank', website='', phone=None, email='', source=None, status='FAILED'),
+    CompanyResult(company='Ünïcødé 株式会社', website='https://xn--d1acufc.example', website_found=True, source='search_api'),
+    CompanyResult(company='', status='SUCCESS', enriched_at=0.0),
+]
+
+
+def _store(count: int) -> CompactResultStore:
+    return CompactResultStore(CompanyResult(company=f'Company {index}', source=f'source {index % 3}') for index in range(count))
+
+
+def test_rows_read_back_as_written() -> None:
+    store = CompactResultStore(ROWS)
+    assert len(store) == len(ROWS)
+    assert list(store) == ROWS
+    assert store[-1] == ROWS[-1]
+    assert list(store.companies()) == [row.company for row in ROWS]
+    with pytest.raises(IndexError):
+        store[len(ROWS)]
+
+
+@pytest.mark.parametrize(
+    ('start', 'stop'),
+    [(0, 10), (3, 7), (7, 3), (8, 100), (100, 200), (-3, 10), (0, 0)],
+)
+def test_slice_matches_list_slicing(start: int, stop: int) -> None:
+    store = _store(10)
+    assert store.slice(start, stop) == list(store)[start:stop]
+
+
+def test_many_distinct_sources_still_read_back() -> None:
+    # More than 255 interned values widens the code column.
+    rows = [CompanyResult(company=str(index), source=f'source-{index}') for index in range(300)]
+    store = CompactResultStore(rows)
+    assert [row.source for row in store] == [row.source for row in rows]
+
+
+def _render(results: CompactResultStore, start: int, stop: int, output_format: ExportFormat) -> bytes:
+    async def scenario() -> bytes:
+        manager = JobManager()
+        metadata = await manager.create_job()
+        for result in results:
+            await manager.append_result(metadata.job_id, result)
+        chunks = [chunk async for chunk in manager.iter_result_chunks(metadata.job_id, start, stop, output_format)]
+        return b''.join(chunks)
+
+    return asyncio.run(scenario())
+
+
+def test_ndjson_round_trips_every_field() -> None:
+    lines = _render(CompactResultStore(ROWS), 0, len(ROWS), ExportFormat.NDJSON).decode('utf-8').splitlines()
+    assert [CompanyResult.model_validate(json.loads(line)) for line in lines] == ROWS
+
+
+def test_csv_has_a_header_only_from_the_start_and_keeps_empty_fields() -> None:
+    store = CompactResultStore(ROWS)
+    rows = list(csv.reader(io.StringIO(_render(store, 0, len(ROWS), ExportFormat.CSV).decode('utf-8'))))
+    assert rows[0] == RESULT_COLUMNS
+    assert [row[0] for row in rows[1:]] == [row.company for row in ROWS]
+    assert rows[2][1:3] == ['', 'False']
+    assert rows[1][-1] == '2023-11-14T22:13:20+00:00'
+
+    tail = list(csv.reader(io.StringIO(_render(store, 2, len(ROWS), ExportFormat.CSV).decode('utf-8'))))
+    assert [row[0] for row in tail] == [row.company for row in ROWS[2:]]
+
+
+@pytest.mark.parametrize(('start', 'stop'), [(0, 25), (4, 11), (9, 10), (10, 25), (24, 25)])
+def test_windows_across_chunk_boundaries(monkeypatch: pytest.MonkeyPatch, start: int, stop: int) -> None:
+    monkeypatch.setattr(job_manager_module, 'DOWNLOAD_CHUNK_ROWS', 4)
+    lines = _render(_store(25), start, stop, ExportFormat.NDJSON).decode('utf-8').splitlines()
+    assert [json.loads(line)['company'] for line in lines] == [f'Company {index}' for index in range(start, stop)]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.jobs.job_manager import JobManager
+from app.jobs.job_store import SqliteJobStore
+from app.jobs.scheduler import JobScheduler, JobStoppedError
+from app.models import CompanyResult, JobStatus
+
+COMPANIES = [f'Company {index}' for index in range(23)]
+
+
+async def _process(manager: JobManager, job_id: str, companies, runs: Counter, stop_after: int | None = None) -> None:
+    scheduler = JobScheduler(workers=3, queue_size=4)
+
+    async def handler(company: str) -> None:
+        runs[company] += 1
+        await manager.append_result(job_id, CompanyResult(company=company))
+        if stop_after is not None and sum(runs.values()) >= stop_after:
+            scheduler.cancel_job(job_id, 'crash', cancel_in_flight=False)
+
+    try:
+        await scheduler.run_job(job_id, companies, handler)
+    except JobStoppedError:
+        pass
+    finally:
+        await scheduler.stop()
+
+
+def test_restart_runs_every_remaining_input_exactly_once(tmp_path) -> None:
+    path = str(tmp_path / 'jobs.sqlite3')
+    runs: Counter[str] = Counter()
+
+    async def before_crash() -> str:
+        manager = JobManager(store=SqliteJobStore(path))
+        metadata = await manager.create_job(COMPANIES)
+        await manager.set_status(metadata.job_id, JobStatus.PROCESSING)
+        await _process(manager, metadata.job_id, COMPANIES, runs, stop_after=9)
+        # The process dies here: whatever was flushed is all that survives.
+        await manager.close()
+        return metadata.job_id
+
+    async def after_restart(job_id: str) -> tuple[list[str], JobStatus, list[str]]:
+        manager = JobManager(store=SqliteJobStore(path))
+        resumable = await manager.restore()
+        await _process(manager, job_id, manager.iter_unprocessed_inputs(job_id), runs)
+        await manager.finish(job_id, JobStatus.COMPLETED)
+        job = await manager.get_job(job_id)
+        await manager.close()
+        return resumable, job.metadata.status, list(job.results.companies())
+
+    job_id = asyncio.run(before_crash())
+    first_run = sum(runs.values())
+    assert 9 <= first_run < len(COMPANIES)
+    resumable, status, results = asyncio.run(after_restart(job_id))
+
+    assert resumable == [job_id]
+    assert status == JobStatus.COMPLETED
+    assert runs == Counter(COMPANIES)
+    assert sorted(results) == sorted(COMPANIES)
+
+
+def test_restart_of_a_finished_job_resumes_nothing(tmp_path) -> None:
+    path = str(tmp_path / 'jobs.sqlite3')
+
+    async def scenario() -> tuple[list[str], list[str]]:
+        manager = JobManager(store=SqliteJobStore(path))
+        metadata = await manager.create_job(COMPANIES[:3])
+        await _process(manager, metadata.job_id, COMPANIES[:3], Counter())
+        await manager.finish(metadata.job_id, JobStatus.COMPLETED)
+        await manager.close()
+
+        restarted = JobManager(store=SqliteJobStore(path))
+        resumable = await restarted.restore()
+        job = await restarted.get_job(metadata.job_id)
+        await restarted.close()
+        return resumable, list(job.results.companies())
+
+    resumable, results = asyncio.run(scenario())
+    assert resumable == []
+    assert results == COMPANIES[:3]
+
+
+@pytest.mark.parametrize('received', [0, 5])
+def test_upload_cut_off_mid_parse_resumes_with_the_rows_received(tmp_path, received: int) -> None:
+    path = str(tmp_path / 'jobs.sqlite3')
+    runs: Counter[str] = Counter()
+
+    async def before_crash() -> str:
+        manager = JobManager(store=SqliteJobStore(path))
+        metadata = await manager.create_job()
+        await manager.set_status(metadata.job_id, JobStatus.PROCESSING)
+
+        async def upload():
+            for company in COMPANIES:
+                yield company
+
+        ingest = manager.track_ingest(metadata.job_id, upload())
+        for _ in range(received):
+            await ingest.__anext__()
+        await ingest.aclose()
+        await manager.close()
+        return metadata.job_id
+
+    async def after_restart(job_id: str) -> tuple[int, bool]:
+        manager = JobManager(store=SqliteJobStore(path))
+        await manager.restore()
+        await _process(manager, job_id, manager.iter_unprocessed_inputs(job_id), runs)
+        job = await manager.get_job(job_id)
+        await manager.close()
+        return job.metadata.total, job.metadata.ingest_complete
+
+    job_id = asyncio.run(before_crash())
+    assert asyncio.run(after_restart(job_id)) == (received, True)
+    assert runs == Counter(COMPANIES[:received])
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import time
+
+import pytest
+
+from app.jobs.job_manager import JobManager
+from app.jobs.result_store import CompactResultStore
+from app.jobs.reuse import NEW, REFRESHED, REUSED, PreviousResults, read_previous_results
+from app.models import CompanyResult
+
+DAY = 24 * 3600
+
+
+def _previous(max_age_seconds: float = 30 * DAY) -> PreviousResults:
+    now = time.time()
+    rows = [
+        CompanyResult(company='Acme Pvt Ltd', website='https://acme.example', website_found=True, enriched_at=now - DAY),
+        CompanyResult(company='Stale Corp', website='https://stale.example', website_found=True, enriched_at=now - 40 * DAY),
+        CompanyResult(company='Undated Inc', website='https://undated.example', website_found=True, enriched_at=None),
+        CompanyResult(company='Broken LLC', status='FAILED', enriched_at=now - DAY),
+        # Retried in the previous run: the later row wins.
+        CompanyResult(company='Retried', status='FAILED', enriched_at=now - DAY),
+        CompanyResult(company='Retried', website='https://retried.example', website_found=True, enriched_at=now - DAY),
+    ]
+    return PreviousResults(CompactResultStore(rows), max_age_seconds)
+
+
+def test_fresh_successful_row_is_reused_under_the_new_spelling() -> None:
+    kind, row = _previous().match('ACME Private Limited')
+    assert kind == REUSED
+    assert row.company == 'ACME Private Limited'
+    assert row.website == 'https://acme.example'
+
+
+@pytest.mark.parametrize('company', ['Stale Corp', 'Undated Inc', 'Broken LLC'])
+def test_stale_undated_and_failed_rows_are_refreshed(company: str) -> None:
+    assert _previous().match(company) == (REFRESHED, None)
+
+
+def test_max_age_decides_what_counts_as_stale() -> None:
+    assert _previous(max_age_seconds=50 * DAY).match('Stale Corp')[0] == REUSED
+    assert _previous(max_age_seconds=3600).match('Acme')[0] == REFRESHED
+
+
+def test_later_row_of_a_retried_company_wins() -> None:
+    kind, row = _previous().match('Retried')
+    assert kind == REUSED
+    assert row.website == 'https://retried.example'
+
+
+def test_unknown_company_is_new() -> None:
+    assert _previous().match('Globex') == (NEW, None)
+
+
+def test_ingest_counts_reused_refreshed_and_new() -> None:
+    companies = ['Acme', 'Stale Corp', 'Globex', 'Undated Inc', 'Initech', 'Retried']
+
+    async def scenario() -> tuple[list[str], object, list[str]]:
+        manager = JobManager()
+        metadata = await manager.create_job()
+
+        async def upload():
+            for company in companies:
+                yield company
+
+        looked_up = [company async for company in manager.track_ingest(metadata.job_id, upload(), _previous())]
+        job = await manager.get_job(metadata.job_id)
+        return looked_up, job.metadata, list(job.results.companies())
+
+    looked_up, metadata, carried = asyncio.run(scenario())
+    assert looked_up == ['Stale Corp', 'Globex', 'Undated Inc', 'Initech']
+    assert carried == ['Acme', 'Retried']
+    assert (metadata.reused_count, metadata.refreshed_count, metadata.new_count) == (2, 2, 2)
+    assert metadata.total == len(companies)
+    assert metadata.processed == 2
+
+
+def test_previous_results_read_from_csv_and_ndjson_downloads() -> None:
+    csv_file = (
+        'company,website,website_found,phone,phone_found,email,email_found,source,status,enriched_at\n'
+        'Acme,https://acme.example,True,,False,,False,domain_guess,SUCCESS,2024-01-02T03:04:05+00:00\n'
+        'Undated,,False,,False,,False,,SUCCESS,\n'
+    )
+    rows = read_previous_results(io.BytesIO(csv_file.encode()), 'results.csv')
+    assert [row.enriched_at for row in rows] == [1704164645.0, None]
+    assert rows[0].website_found and not rows[1].website_found
+
+    ndjson_file = json.dumps({'company': 'Acme', 'status': 'SUCCESS', 'enriched_at': 1704164645.5}) + '\n\n'
+    rows = read_previous_results(io.BytesIO(ndjson_file.encode()), 'results.ndjson')
+    assert [(row.company, row.enriched_at) for row in rows] == [('Acme', 1704164645.5)]
+
+
+@pytest.mark.parametrize(
+    ('content', 'filename', 'message'),
+    [
+        (b'company\n', 'results.xlsx', '.csv or .ndjson'),
+        (b'name\nAcme\n', 'results.csv', 'company column'),
+        (b'{"company": "Acme"}\nnot json\n', 'results.ndjson', 'line 2'),
+        (b'company\n\n', 'results.csv', 'No rows'),
+    ],
+)
+def test_unusable_previous_results_are_rejected(content: bytes, filename: str, message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        read_previous_results(io.BytesIO(content), filename)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.jobs.scheduler import JobScheduler, JobStoppedError
+
+
+def test_run_job_processes_every_item() -> None:
+    async def scenario() -> list[int]:
+        scheduler = JobScheduler(workers=4, queue_size=2)
+        seen: list[int] = []
+
+        async def handler(item: int) -> None:
+            await asyncio.sleep(0)
+            seen.append(item)
+
+        await scheduler.run_job('job', range(20), handler)
+        await scheduler.stop()
+        return seen
+
+    assert sorted(asyncio.run(scenario())) == list(range(20))
+
+
+def test_cancel_job_drops_queued_work_and_cancels_in_flight() -> None:
+    async def scenario() -> tuple[str, int, int]:
+        scheduler = JobScheduler(workers=2, queue_size=10)
+        started = asyncio.Event()
+        finished = 0
+        cancelled = 0
+
+        async def handler(item: int) -> None:
+            nonlocal finished, cancelled
+            started.set()
+            try:
+                await asyncio.sleep(10)
+                finished += 1
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+
+        run = asyncio.create_task(scheduler.run_job('job', range(10), handler))
+        await started.wait()
+        assert scheduler.cancel_job('job', 'cancelled')
+        with pytest.raises(JobStoppedError) as stopped:
+            await asyncio.wait_for(run, timeout=1)
+        await scheduler.stop()
+        return stopped.value.reason, finished, cancelled
+
+    reason, finished, cancelled = asyncio.run(scenario())
+    assert reason == 'cancelled'
+    assert finished == 0
+    assert cancelled == 2
+
+
+def test_cancel_job_lets_in_flight_items_finish_when_asked() -> None:
+    async def scenario() -> tuple[list[int], str]:
+        scheduler = JobScheduler(workers=2, queue_size=10)
+        done: list[int] = []
+        started = asyncio.Event()
+
+        async def handler(item: int) -> None:
+            started.set()
+            await asyncio.sleep(0.05)
+            done.append(item)
+
+        run = asyncio.create_task(scheduler.run_job('job', range(10), handler))
+        await started.wait()
+        scheduler.cancel_job('job', 'budget', cancel_in_flight=False)
+        with pytest.raises(JobStoppedError) as stopped:
+            await asyncio.wait_for(run, timeout=1)
+        await scheduler.stop()
+        return done, stopped.value.reason
+
+    done, reason = asyncio.run(scenario())
+    assert reason == 'budget'
+    assert len(done) == 2
+
+
+def test_stop_requested_before_the_lane_exists_applies_on_entry() -> None:
+    async def scenario() -> tuple[bool, int]:
+        scheduler = JobScheduler(workers=2, queue_size=10)
+        calls = 0
+
+        async def handler(item: int) -> None:
+            nonlocal calls
+            calls += 1
+
+        found = scheduler.cancel_job('job', 'cancelled')
+        with pytest.raises(JobStoppedError):
+            await scheduler.run_job('job', range(5), handler)
+        await scheduler.stop()
+        return found, calls
+
+    assert asyncio.run(scenario()) == (False, 0)
+
+
+def test_handler_error_fails_only_its_job() -> None:
+    async def scenario() -> list[int]:
+        scheduler = JobScheduler(workers=2, queue_size=10)
+        healthy: list[int] = []
+
+        async def broken(item: int) -> None:
+            raise RuntimeError('boom')
+
+        async def handler(item: int) -> None:
+            healthy.append(item)
+
+        failing = asyncio.create_task(scheduler.run_job('bad', range(3), broken))
+        await scheduler.run_job('good', range(5), handler)
+        with pytest.raises(RuntimeError):
+            await failing
+        await scheduler.stop()
+        return healthy
+
+    assert sorted(asyncio.run(scenario())) == list(range(5))
+
+
+def test_workers_survive_a_cancelled_item() -> None:
+    async def scenario() -> list[int]:
+        scheduler = JobScheduler(workers=1, queue_size=10)
+        started = asyncio.Event()
+        done: list[int] = []
+
+        async def stuck(item: int) -> None:
+            started.set()
+            await asyncio.sleep(10)
+
+        async def handler(item: int) -> None:
+            done.append(item)
+
+        run = asyncio.create_task(scheduler.run_job('stuck', range(3), stuck))
+        await started.wait()
+        scheduler.cancel_job('stuck', 'cancelled')
+        with pytest.raises(JobStoppedError):
+            await asyncio.wait_for(run, timeout=1)
+        # The only worker must still be alive to run the next job.
+        await asyncio.wait_for(scheduler.run_job('next', range(3), handler), timeout=1)
+        await scheduler.stop()
+        return done
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+
+
+def test_stop_cancels_workers_with_items_in_flight() -> None:
+    async def scenario() -> bool:
+        scheduler = JobScheduler(workers=1, queue_size=10)
+        started = asyncio.Event()
+
+        async def stuck(item: int) -> None:
+            started.set()
+            await asyncio.sleep(10)
+
+        run = asyncio.create_task(scheduler.run_job('job', range(3), stuck))
+        await started.wait()
+        await asyncio.wait_for(scheduler.stop(), timeout=1)
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        return True
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.config import Settings
+from app.jobs.scheduler import JobScheduler
+from app.jobs.shared_queue import SharedWorkPuller
+
+
+class _BlockingProcessor:
+    def __init__(self) -> None:
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.processed: list[tuple[int, str]] = []
+
+    async def process_claimed(self, job_id: str, item: tuple[int, str]) -> None:
+        self.started.set()
+        await self.release.wait()
+        self.processed.append(item)
+
+
+def _puller(scheduler: JobScheduler) -> SharedWorkPuller:
+    return SharedWorkPuller(Settings(candidate_stats_path=None), None, scheduler, lambda: None)
+
+
+def _claim(puller: SharedWorkPuller, processor: _BlockingProcessor, job_id: str, count: int) -> asyncio.Task[None]:
+    # What _run does with one claimed batch
+    items = [(position, f'Company {position}') for position in range(count)]
+    puller._outstanding += len(items)
+    return asyncio.create_task(puller._run_batch(processor, job_id, items))
+
+
+def test_cancelled_shared_job_releases_its_dropped_claims() -> None:
+    async def scenario() -> tuple[list[int], int]:
+        scheduler = JobScheduler(workers=1, queue_size=2)
+        puller = _puller(scheduler)
+        leaked: list[int] = []
+        for round_number in range(3):
+            processor = _BlockingProcessor()
+            job_id = f'job-{round_number}'
+            # One item running, two queued, the rest not yet fed to the lane.
+            batch = _claim(puller, processor, job_id, 6)
+            await processor.started.wait()
+            scheduler.cancel_job(job_id, 'cancelled', pending=False)
+            await asyncio.wait_for(batch, timeout=1)
+            leaked.append(puller._outstanding)
+        await scheduler.stop()
+        return leaked, puller.max_outstanding - puller._outstanding
+
+    leaked, room = asyncio.run(scenario())
+    assert leaked == [0, 0, 0]
+    assert room == 2
+
+
+def test_finished_batch_releases_each_item_once() -> None:
+    async def scenario() -> tuple[int, int]:
+        scheduler = JobScheduler(workers=2, queue_size=2)
+        puller = _puller(scheduler)
+        processor = _BlockingProcessor()
+        processor.release.set()
+        await asyncio.wait_for(_claim(puller, processor, 'job', 5), timeout=1)
+        await scheduler.stop()
+        return puller._outstanding, len(processor.processed)
+
+    assert asyncio.run(scenario()) == (0, 5)
+
+
+def test_item_still_running_when_the_puller_stops_is_released_once() -> None:
+    async def scenario() -> int:
+        scheduler = JobScheduler(workers=1, queue_size=2)
+        puller = _puller(scheduler)
+        processor = _BlockingProcessor()
+        batch = _claim(puller, processor, 'job', 3)
+        puller._batches.add(batch)
+        await processor.started.wait()
+        await puller.stop()
+        await scheduler.stop()
+        await asyncio.sleep(0)
+        return puller._outstanding
+
+    assert asyncio.run(scenario()) == 0
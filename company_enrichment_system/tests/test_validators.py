@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import pytest
+
+from app.utils.validators import canonicalize_company_name
+
+
+@pytest.mark.parametrize(
+    'name',
+    [
+        'Acme',
+        'ACME Pvt. Ltd.',
+        'Acme Private Limited',
+        'acme pvt ltd',
+        'Acme & Co',
+        'Acme & Co.',
+        'Acme and Co Pvt Ltd',
+        'Acme and Company Limited',
+        '  Acme,  Inc. ',
+    ],
+)
+def test_legal_suffixes_are_dropped(name):
+    assert canonicalize_company_name(name) == 'acme'
+
+
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    [
+        ('Smith & Sons', 'smith and sons'),
+        ('Smith and Sons Ltd', 'smith and sons'),
+        ('Johnson & Johnson Pvt Ltd', 'johnson and johnson'),
+        ('Procter & Gamble Co', 'procter and gamble'),
+    ],
+)
+def test_ampersand_inside_a_name_is_kept(name, expected):
+    assert canonicalize_company_name(name) == expected
+
+
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    [
+        ('Company', 'company'),
+        ('And Co', 'and'),
+        ('Limited & Co', 'limited'),
+    ],
+)
+def test_a_name_is_never_stripped_to_nothing(name, expected):
+    assert canonicalize_company_name(name) == expected
+
+
+@pytest.mark.parametrize(
+    ('name', 'expected'),
+    [
+        ("O'Neil Foods", 'oneil foods'),
+        ('A.B.C. Traders', 'abc traders'),
+        ('Café Coffee Day', 'cafe coffee day'),
+        ('  Tata   Steel ', 'tata steel'),
+    ],
+)
+def test_punctuation_and_accents(name, expected):
+    assert canonicalize_company_name(name) == expected
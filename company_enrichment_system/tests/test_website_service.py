@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.config import Settings
+from app.services.candidate_stats import CandidateStats
+from app.services.http_client import HttpClients
+from app.services.rate_limiter import PROVIDER_DOMAIN_PROBE
+from app.services.resilience import OPEN, CircuitBreakerRegistry, StageFailedError
+from app.services.website_service import WebsiteService
+
+
+def _settings(**overrides) -> Settings:
+    return Settings(
+        serpapi_api_key='test',
+        dns_prefilter_enabled=False,
+        cache_enabled=False,
+        candidate_stats_path=None,
+        rate_limit_per_second=10_000,
+        rate_limit_burst=10_000,
+        **overrides,
+    )
+
+
+def _serpapi_only(request: httpx.Request) -> httpx.Response:
+    if request.url.host == 'serpapi.com':
+        return httpx.Response(200, json={'organic_results': [{'link': 'https://acmewidgets.example/'}]})
+    raise AssertionError(f'unexpected probe to {request.url}')
+
+
+async def _detect(settings: Settings, handler, breakers: CircuitBreakerRegistry | None = None):
+    clients = HttpClients(settings, transport=httpx.MockTransport(handler))
+    service = WebsiteService(settings, breakers=breakers)
+    await clients.start()
+    try:
+        return await service.detect_website(clients, 'Acme Widgets')
+    finally:
+        await clients.close()
+
+
+@pytest.mark.parametrize('mode', ['sequential', 'concurrent'])
+def test_open_probe_circuit_skips_guesses_and_still_searches(mode: str) -> None:
+    settings = _settings(domain_probe_mode=mode)
+    breakers = CircuitBreakerRegistry(settings)
+    probe_breaker = breakers.get(PROVIDER_DOMAIN_PROBE)
+    for _ in range(settings.circuit_min_calls):
+        probe_breaker.before_call()
+        probe_breaker.record_failure()
+    assert probe_breaker.state == OPEN
+
+    result = asyncio.run(_detect(settings, _serpapi_only, breakers))
+
+    assert result.website_found
+    assert result.source == 'search_api'
+    assert result.website_url == 'https://acmewidgets.example/'
+
+
+def _probes_refused(request: httpx.Request) -> httpx.Response:
+    if request.url.host == 'serpapi.com':
+        return httpx.Response(200, json={'organic_results': [{'link': 'https://acmewidgets.example/'}]})
+    raise httpx.ConnectError('refused', request=request)
+
+
+def test_fallback_starts_once_every_probe_failed_without_waiting_out_its_delay() -> None:
+    settings = _settings(domain_probe_mode='concurrent', search_fallback_delay_seconds=30)
+
+    started = time.perf_counter()
+    result = asyncio.run(_detect(settings, _probes_refused))
+
+    assert time.perf_counter() - started < 5
+    assert result.source == 'search_api'
+
+
+def _nothing_found(request: httpx.Request) -> httpx.Response:
+    if request.url.host == 'serpapi.com':
+        return httpx.Response(200, json={'organic_results': []})
+    raise AssertionError(f'unexpected probe to {request.url}')
+
+
+@pytest.mark.parametrize('mode', ['sequential', 'concurrent'])
+def test_open_probe_circuit_without_a_search_hit_fails_the_stage(mode: str) -> None:
+    # Skipped guesses are not a "no website" answer: it must not be cached or learned from.
+    settings = _settings(domain_probe_mode=mode)
+    breakers = CircuitBreakerRegistry(settings)
+    probe_breaker = breakers.get(PROVIDER_DOMAIN_PROBE)
+    for _ in range(settings.circuit_min_calls):
+        probe_breaker.before_call()
+        probe_breaker.record_failure()
+    stats = CandidateStats(settings)
+
+    async def scenario() -> None:
+        clients = HttpClients(settings, transport=httpx.MockTransport(_nothing_found))
+        service = WebsiteService(settings, breakers=breakers, candidate_stats=stats)
+        await clients.start()
+        try:
+            await service.detect_website(clients, 'Acme Widgets')
+        finally:
+            await clients.close()
+
+    with pytest.raises(StageFailedError):
+        asyncio.run(scenario())
+    assert stats.stats().outcomes == {}